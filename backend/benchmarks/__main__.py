@@ -0,0 +1,127 @@
+"""
+Benchmark the parsers over a synthetic PDF corpus.
+
+Run from the ``backend`` directory::
+
+    uv run python -m benchmarks --output benchmarks/results/current.json
+    uv run python -m benchmarks --baseline benchmarks/results/baseline.json
+
+The results are written as JSON. With ``--baseline`` the run is compared to
+an earlier one and the exit status is 1 if any metric regressed by more than
+the tolerance.
+"""
+
+import argparse
+import json
+import sys
+from pathlib import Path
+
+from loguru import logger
+
+from .compare import corpus_matches, find_regressions
+from .corpus import build_corpus
+from .runner import run_benchmarks
+
+
+def _parse_args(argv):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description=__doc__.split("\n\n")[0])
+    parser.add_argument(
+        "--parsers",
+        help="Comma-separated parsers to benchmark (default: all)",
+    )
+    parser.add_argument(
+        "--corpus-dir",
+        default=str(Path(__file__).parent / "corpus"),
+        help="Where the synthetic corpus is generated and cached",
+    )
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the corpus")
+    parser.add_argument(
+        "--scale",
+        type=float,
+        default=1.0,
+        help="Multiplier of the page count of every corpus document",
+    )
+    parser.add_argument(
+        "--repeat", type=int, default=3, help="Timed passes over each document"
+    )
+    parser.add_argument("--output", help="Write the JSON results here instead of stdout")
+    parser.add_argument("--baseline", help="Earlier results to compare against")
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.15,
+        help="Relative change allowed before a metric counts as regressed",
+    )
+    parser.add_argument(
+        "--log-level", default="WARNING", help="Log level of the parsers while timed"
+    )
+    return parser.parse_args(argv)
+
+
+def _select_parsers(requested):
+    from src.parsers import get_available_parsers
+
+    available = {name.lower(): name for name in get_available_parsers()}
+    if not requested:
+        return list(available.values())
+    selected = []
+    for name in requested.split(","):
+        name = name.strip().lower()
+        if name not in available:
+            raise SystemExit(
+                f"Unknown parser '{name}'. Choose from: {', '.join(available)}"
+            )
+        selected.append(available[name])
+    return selected
+
+
+def _format_summary(results):
+    lines = [f"{'parser':<10} {'pages/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'peak RSS MB':>12}"]
+    for name, result in results["parsers"].items():
+        if "error" in result:
+            lines.append(f"{name:<10} error: {result['error']}")
+            continue
+        lines.append(
+            f"{name:<10} {result['pages_per_sec']:>9.1f} {result['p50_ms']:>9.2f}"
+            f" {result['p95_ms']:>9.2f} {result['peak_rss_mb']:>12.1f}"
+        )
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    args = _parse_args(argv)
+    logger.remove()
+    logger.add(sys.stderr, level="INFO")
+
+    parser_names = _select_parsers(args.parsers)
+    manifest = build_corpus(args.corpus_dir, seed=args.seed, scale=args.scale)
+    results = run_benchmarks(manifest, parser_names, args.repeat, args.log_level)
+
+    output = json.dumps(results, indent=2)
+    if args.output:
+        Path(args.output).parent.mkdir(parents=True, exist_ok=True)
+        Path(args.output).write_text(output)
+        logger.info(f"Wrote results to {args.output}")
+    else:
+        print(output)
+    print(_format_summary(results), file=sys.stderr)
+
+    if not args.baseline:
+        return 0
+    baseline = json.loads(Path(args.baseline).read_text())
+    if not corpus_matches(results, baseline):
+        logger.warning("The baseline was measured on a different corpus")
+    regressions = find_regressions(results, baseline, args.tolerance)
+    for regression in regressions:
+        logger.error(
+            f"{regression['parser']} {regression['metric']} regressed: "
+            f"{regression['baseline']:.2f} -> {regression['current']:.2f} "
+            f"({regression['change']:+.0%})"
+        )
+    if not regressions:
+        logger.info(f"No regressions beyond {args.tolerance:.0%} of the baseline")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,59 @@
+"""
+Comparing benchmark results against a saved baseline.
+"""
+
+# Metrics checked for regressions, mapped to True if higher values are better
+METRICS = {
+    "pages_per_sec": True,
+    "p50_ms": False,
+    "p95_ms": False,
+    "peak_rss_mb": False,
+}
+
+
+def corpus_matches(results, baseline):
+    """Return True if both runs used byte-identical corpora."""
+
+    def digests(run):
+        return {d["name"]: d["sha256"] for d in run["corpus"]["documents"]}
+
+    return digests(results) == digests(baseline)
+
+
+def find_regressions(results, baseline, tolerance=0.15):
+    """
+    Find metrics that got worse than the baseline by more than ``tolerance``.
+
+    Parsers missing from either run, or that failed in either run, are skipped.
+
+    Args:
+        results (dict): Output of `runner.run_benchmarks`
+        baseline (dict): Earlier output of `runner.run_benchmarks`
+        tolerance (float): Allowed relative change, e.g. 0.15 for 15%
+
+    Returns:
+        list: One dict per regression with the ``parser``, ``metric``,
+            ``baseline`` and ``current`` values and the relative ``change``
+    """
+    regressions = []
+    for parser_name, current in results["parsers"].items():
+        previous = baseline["parsers"].get(parser_name)
+        if previous is None or "error" in previous or "error" in current:
+            continue
+        for metric, higher_is_better in METRICS.items():
+            old, new = previous.get(metric), current.get(metric)
+            if not old or new is None:
+                continue
+            change = (new - old) / old
+            worse = -change if higher_is_better else change
+            if worse > tolerance:
+                regressions.append(
+                    {
+                        "parser": parser_name,
+                        "metric": metric,
+                        "baseline": old,
+                        "current": new,
+                        "change": change,
+                    }
+                )
+    return regressions
@@ -0,0 +1,219 @@
+"""
+Synthetic PDF corpus for the parser benchmarks.
+
+Every document is generated with PyMuPDF from a seeded random generator, so
+the same seed always produces the same text, layout, tables and images. The
+corpus is written once to a directory and reused by later runs as long as
+its manifest matches the requested seed and scale.
+"""
+
+import hashlib
+import json
+import random
+from pathlib import Path
+
+from loguru import logger
+
+# Bump when the generated documents change, so stale corpora are rebuilt
+CORPUS_VERSION = 1
+
+PAGE_WIDTH, PAGE_HEIGHT = 595, 842  # A4 in points
+MARGIN = 56
+
+WORDS = (
+    "analysis annual balance budget capital contract customer data delivery "
+    "department document estimate figure finance growth income index invoice "
+    "market method model operating order page parser payment period policy "
+    "process product quarter rate record report result revenue review risk "
+    "sales section service source statement summary supplier table tax total "
+    "transfer update value volume warehouse year"
+).split()
+
+# name: (generator, pages at scale 1)
+DOCUMENTS = {
+    "sparse-text": ("_sparse_text", 20),
+    "dense-text": ("_dense_text", 50),
+    "two-column": ("_two_column", 20),
+    "tables": ("_tables", 10),
+    "images": ("_images", 10),
+    "long-mixed": ("_mixed", 200),
+}
+
+
+def _sentence(rng, words=12):
+    text = " ".join(rng.choice(WORDS) for _ in range(words))
+    return text.capitalize() + "."
+
+
+def _paragraph(rng, sentences=5):
+    return " ".join(_sentence(rng, rng.randint(8, 16)) for _ in range(sentences))
+
+
+def _sparse_text(doc, rng, page_number):
+    page = doc.new_page(width=PAGE_WIDTH, height=PAGE_HEIGHT)
+    page.insert_text((MARGIN, MARGIN), f"Section {page_number}", fontsize=16)
+    for i in range(rng.randint(3, 6)):
+        page.insert_text((MARGIN, MARGIN + 40 + i * 18), _sentence(rng), fontsize=10)
+
+
+def _dense_text(doc, rng, page_number):
+    page = doc.new_page(width=PAGE_WIDTH, height=PAGE_HEIGHT)
+    rect = (MARGIN, MARGIN, PAGE_WIDTH - MARGIN, PAGE_HEIGHT - MARGIN)
+    text = "\n\n".join(_paragraph(rng, 6) for _ in range(8))
+    page.insert_textbox(rect, text, fontsize=9)
+
+
+def _two_column(doc, rng, page_number):
+    page = doc.new_page(width=PAGE_WIDTH, height=PAGE_HEIGHT)
+    gutter = 20
+    column_width = (PAGE_WIDTH - 2 * MARGIN - gutter) / 2
+    for column in range(2):
+        x0 = MARGIN + column * (column_width + gutter)
+        rect = (x0, MARGIN, x0 + column_width, PAGE_HEIGHT - MARGIN)
+        text = "\n\n".join(_paragraph(rng, 4) for _ in range(6))
+        page.insert_textbox(rect, text, fontsize=9)
+
+
+def _draw_table(page, rng, top, rows, columns):
+    """Draw a ruled table with text in every cell; returns the bottom edge."""
+    cell_width = (PAGE_WIDTH - 2 * MARGIN) / columns
+    cell_height = 18
+    for row in range(rows + 1):
+        y = top + row * cell_height
+        page.draw_line((MARGIN, y), (PAGE_WIDTH - MARGIN, y))
+    for column in range(columns + 1):
+        x = MARGIN + column * cell_width
+        page.draw_line((x, top), (x, top + rows * cell_height))
+    for row in range(rows):
+        for column in range(columns):
+            if row == 0:
+                text = rng.choice(WORDS).capitalize()
+            else:
+                text = f"{rng.uniform(0, 10000):.2f}"
+            page.insert_text(
+                (MARGIN + column * cell_width + 4, top + row * cell_height + 13),
+                text,
+                fontsize=8,
+            )
+    return top + rows * cell_height
+
+
+def _tables(doc, rng, page_number):
+    page = doc.new_page(width=PAGE_WIDTH, height=PAGE_HEIGHT)
+    page.insert_text((MARGIN, MARGIN), f"Table set {page_number}", fontsize=14)
+    top = MARGIN + 30
+    for _ in range(2):
+        top = _draw_table(page, rng, top, rng.randint(8, 14), rng.randint(4, 6)) + 30
+        page.insert_text((MARGIN, top), _sentence(rng), fontsize=9)
+        top += 30
+
+
+def _make_image(fitz, rng, width=160, height=120):
+    """A deterministic RGB test pattern, encoded as PNG."""
+    base = [rng.randrange(256) for _ in range(3)]
+    samples = bytearray()
+    for y in range(height):
+        for x in range(width):
+            samples += bytes(
+                ((base[0] + x) % 256, (base[1] + y) % 256, (base[2] + x * y) % 256)
+            )
+    pixmap = fitz.Pixmap(fitz.csRGB, width, height, bytes(samples), False)
+    return pixmap.tobytes("png")
+
+
+def _images(doc, rng, page_number):
+    import fitz
+
+    page = doc.new_page(width=PAGE_WIDTH, height=PAGE_HEIGHT)
+    page.insert_text((MARGIN, MARGIN), f"Figures {page_number}", fontsize=14)
+    for i in range(3):
+        top = MARGIN + 30 + i * 240
+        rect = fitz.Rect(MARGIN, top, MARGIN + 240, top + 180)
+        page.insert_image(rect, stream=_make_image(fitz, rng))
+        page.insert_text((MARGIN + 260, top + 20), _sentence(rng), fontsize=9)
+
+
+def _mixed(doc, rng, page_number):
+    generator = (_dense_text, _two_column, _tables, _sparse_text)[page_number % 4]
+    generator(doc, rng, page_number)
+
+
+def generate_document(path, kind, pages, seed):
+    """
+    Write one synthetic document.
+
+    Args:
+        path (Path): Where to write the PDF
+        kind (str): One of the names in `DOCUMENTS`
+        pages (int): Number of pages
+        seed (int): Seed of the random generator
+    """
+    import fitz
+
+    generator = globals()[DOCUMENTS[kind][0]]
+    rng = random.Random(f"{seed}:{kind}")
+    doc = fitz.open()
+    doc.set_metadata({"title": f"Benchmark {kind}", "author": "ppp benchmarks"})
+    for page_number in range(1, pages + 1):
+        generator(doc, rng, page_number)
+    # Fixed IDs and no timestamps keep the output byte-for-byte reproducible
+    doc.save(str(path), garbage=3, deflate=True, no_new_id=True)
+    doc.close()
+
+
+def _sha256(path):
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def build_corpus(directory, seed=0, scale=1.0):
+    """
+    Generate the corpus, or reuse the one already in ``directory``.
+
+    Args:
+        directory (str | Path): Directory of the corpus
+        seed (int): Seed of the random generators
+        scale (float): Multiplier applied to the page count of every document
+
+    Returns:
+        dict: The manifest, listing every document with its path, page count,
+            size and SHA-256 digest
+    """
+    directory = Path(directory)
+    manifest_path = directory / "manifest.json"
+    settings = {"version": CORPUS_VERSION, "seed": seed, "scale": scale}
+
+    if manifest_path.exists():
+        manifest = json.loads(manifest_path.read_text())
+        if {key: manifest.get(key) for key in settings} == settings and all(
+            (directory / document["file"]).exists() for document in manifest["documents"]
+        ):
+            logger.info(f"Reusing benchmark corpus in {directory}")
+            return _resolve(manifest, directory)
+
+    directory.mkdir(parents=True, exist_ok=True)
+    documents = []
+    for kind, (_, base_pages) in DOCUMENTS.items():
+        pages = max(1, round(base_pages * scale))
+        path = directory / f"{kind}.pdf"
+        logger.info(f"Generating {path.name} ({pages} pages)")
+        generate_document(path, kind, pages, seed)
+        documents.append(
+            {
+                "name": kind,
+                "file": path.name,
+                "pages": pages,
+                "bytes": path.stat().st_size,
+                "sha256": _sha256(path),
+            }
+        )
+
+    manifest = {**settings, "documents": documents}
+    manifest_path.write_text(json.dumps(manifest, indent=2))
+    return _resolve(manifest, directory)
+
+
+def _resolve(manifest, directory):
+    for document in manifest["documents"]:
+        document["path"] = str(directory / document["file"])
+    return manifest
@@ -0,0 +1,198 @@
+"""
+Running the parsers over the benchmark corpus.
+
+Each parser is benchmarked in its own freshly spawned process, so its peak
+RSS is not inflated by libraries or models loaded for another parser, and is
+warmed up (``PDFParser.warm_up``) before anything is timed.
+"""
+
+import os
+import platform
+import resource
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from multiprocessing import get_context
+
+from loguru import logger
+
+# Bump when the layout of the results changes
+RESULTS_VERSION = 1
+
+
+def percentile(values, q):
+    """
+    Linearly interpolated percentile.
+
+    Args:
+        values (list): Sample values
+        q (float): Percentile between 0 and 100
+
+    Returns:
+        float: The percentile, or None if there are no values
+    """
+    if not values:
+        return None
+    ordered = sorted(values)
+    position = (len(ordered) - 1) * q / 100
+    lower = int(position)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+
+def _peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    if sys.platform == "darwin":
+        return peak / (1024 * 1024)
+    return peak / 1024
+
+
+def _time_document(parser, path, pages):
+    """
+    Extract every page of a document once.
+
+    The latency of a page is the time from the previous page (or from the
+    start, for the first page) until the parser yields it, so the cost of
+    opening the document is charged to the first page.
+
+    Returns:
+        tuple: (total seconds, list of per-page latencies in ms)
+    """
+    latencies = []
+    start = last = time.perf_counter()
+    for _ in parser.iter_pages(path, 1, pages):
+        now = time.perf_counter()
+        latencies.append((now - last) * 1000)
+        last = now
+    return time.perf_counter() - start, latencies
+
+
+def benchmark_parser(parser_name, documents, repeat, log_level="WARNING"):
+    """
+    Benchmark one parser. Runs in a dedicated worker process.
+
+    Args:
+        parser_name (str): Internal parser name
+        documents (list): Documents of the corpus manifest
+        repeat (int): Number of timed passes over each document
+        log_level (str): Level of the parser logs; the per-page logs at INFO
+            and below would otherwise dominate the timings of fast parsers
+
+    Returns:
+        dict: Throughput, latency percentiles and peak RSS of the parser
+    """
+    logger.remove()
+    logger.add(sys.stderr, level=log_level)
+
+    from src.parsers import get_parser
+    from src.parsers.errors import ParserError
+
+    parser = get_parser(parser_name)
+    result = {"version": parser.version, "documents": {}}
+    try:
+        warm_up_start = time.perf_counter()
+        parser.warm_up()
+        result["warm_up_ms"] = (time.perf_counter() - warm_up_start) * 1000
+    except Exception as e:
+        result["error"] = f"Warm-up failed: {str(e)}"
+        return result
+
+    all_latencies = []
+    total_pages = 0
+    total_seconds = 0.0
+    for document in documents:
+        try:
+            # An untimed first page pulls in lazily imported modules and the file
+            for _ in parser.iter_pages(document["path"], 1, 1):
+                pass
+            runs = [
+                _time_document(parser, document["path"], document["pages"])
+                for _ in range(repeat)
+            ]
+        except ParserError as e:
+            result["documents"][document["name"]] = {"error": e.message}
+            continue
+        latencies = [latency for _, run_latencies in runs for latency in run_latencies]
+        seconds = sorted(seconds for seconds, _ in runs)[len(runs) // 2]
+        pages = len(runs[0][1])
+        result["documents"][document["name"]] = {
+            "pages": pages,
+            "seconds": seconds,
+            "pages_per_sec": pages / seconds if seconds else None,
+            "p50_ms": percentile(latencies, 50),
+            "p95_ms": percentile(latencies, 95),
+        }
+        all_latencies.extend(latencies)
+        total_pages += pages
+        total_seconds += seconds
+
+    if total_pages:
+        result["pages_per_sec"] = total_pages / total_seconds
+        result["p50_ms"] = percentile(all_latencies, 50)
+        result["p95_ms"] = percentile(all_latencies, 95)
+    else:
+        result["error"] = "No document could be parsed"
+    result["peak_rss_mb"] = _peak_rss_mb()
+    return result
+
+
+def _environment():
+    from importlib import metadata
+
+    try:
+        pymupdf_version = metadata.version("pymupdf")
+    except metadata.PackageNotFoundError:
+        pymupdf_version = None
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "cpu_count": os.cpu_count(),
+        # The corpus is written by PyMuPDF, so its version affects the bytes
+        "pymupdf": pymupdf_version,
+    }
+
+
+def run_benchmarks(manifest, parser_names, repeat=3, log_level="WARNING"):
+    """
+    Benchmark parsers over a corpus.
+
+    Args:
+        manifest (dict): Corpus manifest from `corpus.build_corpus`
+        parser_names (list): Internal names of the parsers to benchmark
+        repeat (int): Number of timed passes over each document
+        log_level (str): Level of the parser logs in the benchmark processes
+
+    Returns:
+        dict: JSON-serialisable results
+    """
+    results = {}
+    context = get_context("spawn")
+    for parser_name in parser_names:
+        logger.info(f"Benchmarking {parser_name}")
+        with ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+            try:
+                results[parser_name] = executor.submit(
+                    benchmark_parser, parser_name, manifest["documents"], repeat, log_level
+                ).result()
+            except Exception as e:
+                logger.error(f"Benchmark of {parser_name} failed: {str(e)}")
+                results[parser_name] = {"error": str(e)}
+
+    return {
+        "version": RESULTS_VERSION,
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "environment": _environment(),
+        "repeat": repeat,
+        "corpus": {
+            **{key: manifest[key] for key in ("version", "seed", "scale")},
+            # Paths are local to this machine; the digests identify the documents
+            "documents": [
+                {key: value for key, value in document.items() if key != "path"}
+                for document in manifest["documents"]
+            ],
+        },
+        "parsers": results,
+    }
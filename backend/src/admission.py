@@ -0,0 +1,335 @@
+"""
+Cost-based admission control of parse requests.
+
+Every parse request is given an estimated cost in worker milliseconds before
+it runs (see `src.analysis`). A request costing more than the per-request
+budget is rejected outright. Requests are otherwise admitted while the total
+cost of the admitted requests stays within the global budget; the others
+wait, in order of arrival, for earlier requests to finish, and are rejected
+with an estimated wait if that would take too long. This keeps a few
+expensive requests from holding up every other client.
+"""
+
+import asyncio
+import math
+import time
+from collections import deque
+
+from loguru import logger
+
+from src import analysis, config, metrics
+from src.workers import get_pool
+
+
+class CostBudgetExceededError(Exception):
+    """Raised when a single request costs more than the per-request budget."""
+
+    def __init__(self, cost_ms, budget_ms):
+        super().__init__(
+            f"Request is estimated to cost {cost_ms:.0f} ms of parsing, "
+            f"more than the limit of {budget_ms} ms per request"
+        )
+        self.cost_ms = cost_ms
+        self.budget_ms = budget_ms
+
+
+class AdmissionRejectedError(Exception):
+    """Raised when a request cannot be admitted within the longest allowed wait."""
+
+    def __init__(self, cost_ms, retry_after):
+        super().__init__(
+            f"Server is at capacity; a request costing {cost_ms:.0f} ms of parsing "
+            f"could start in about {retry_after} s"
+        )
+        self.cost_ms = cost_ms
+        self.retry_after = retry_after
+
+
+class Ticket:
+    """
+    An admitted request. Release it (once) when the request has finished.
+
+    Attributes:
+        cost_ms (float): Estimated cost of the request
+        wait_ms (float): Time the request waited to be admitted
+    """
+
+    def __init__(self, controller, cost_ms, wait_ms):
+        self.cost_ms = cost_ms
+        self.wait_ms = wait_ms
+        self.admitted_at = time.monotonic()
+        self._controller = controller
+        self._released = False
+
+    def release(self):
+        if not self._released:
+            self._released = True
+            self._controller._release(self)
+
+    def to_dict(self):
+        return {"cost_ms": round(self.cost_ms), "wait_ms": round(self.wait_ms, 1)}
+
+
+class AdmissionController:
+    """
+    Admits requests within a per-request and a global cost budget.
+
+    Only used from the event loop.
+    """
+
+    def __init__(self, request_budget_ms, global_budget_ms, max_wait_seconds):
+        """
+        Args:
+            request_budget_ms (int): Largest cost of a single request (0: no limit)
+            global_budget_ms (int): Largest total cost of the admitted requests
+                (0: no limit)
+            max_wait_seconds (float): Longest a request may wait to be admitted
+        """
+        self.request_budget_ms = request_budget_ms
+        self.global_budget_ms = global_budget_ms
+        self.max_wait_seconds = max_wait_seconds
+        self._admitted = set()
+        self._cost_ms = 0.0
+        # (future, cost, start time) of the requests waiting, in order of arrival
+        self._waiters = deque()
+
+    @property
+    def cost_ms(self):
+        """Total estimated cost of the admitted requests."""
+        return self._cost_ms
+
+    @property
+    def waiting(self):
+        return len(self._waiters)
+
+    def _fits(self, cost_ms):
+        # A request costing more than the whole budget runs alone
+        return (
+            not self.global_budget_ms
+            or not self._admitted
+            or self._cost_ms + cost_ms <= self.global_budget_ms
+        )
+
+    def estimate_wait(self, cost_ms):
+        """
+        Estimate how long a request would wait to be admitted.
+
+        Admitted requests are assumed to finish when their estimated cost has
+        elapsed, and the requests already waiting to be admitted first.
+
+        Returns:
+            float: Seconds
+        """
+        if not self.global_budget_ms:
+            return 0.0
+        now = time.monotonic()
+        finishing = sorted(
+            (max(0.0, ticket.admitted_at + ticket.cost_ms / 1000 - now), ticket.cost_ms)
+            for ticket in self._admitted
+        )
+        needed = min(cost_ms, self.global_budget_ms) + sum(waiter[1] for waiter in self._waiters)
+        remaining = self._cost_ms
+        for seconds, cost in [(0.0, 0.0), *finishing]:
+            remaining -= cost
+            if remaining + needed <= self.global_budget_ms:
+                return seconds
+        return finishing[-1][0] if finishing else 0.0
+
+    def affordable(self, cost_ms):
+        """Whether a request would be admitted right away."""
+        within_request_budget = not self.request_budget_ms or cost_ms <= self.request_budget_ms
+        return within_request_budget and not self._waiters and self._fits(cost_ms)
+
+    def check(self, cost_ms):
+        """
+        Raises:
+            CostBudgetExceededError: If the cost exceeds the per-request budget
+        """
+        if self.request_budget_ms and cost_ms > self.request_budget_ms:
+            metrics.ADMISSION_REJECTIONS.inc(reason="request_budget")
+            raise CostBudgetExceededError(cost_ms, self.request_budget_ms)
+
+    async def admit(self, cost_ms, check_request_budget=True):
+        """
+        Wait until a request fits in the global budget and admit it.
+
+        Args:
+            cost_ms (float): Estimated cost of the request
+            check_request_budget (bool): Whether to enforce the per-request
+                budget (parts of a larger request, such as the chunks of a
+                batch, are only held to the global budget)
+
+        Returns:
+            Ticket: The admitted request
+
+        Raises:
+            CostBudgetExceededError: If the cost exceeds the per-request budget
+            AdmissionRejectedError: If the request would wait longer than
+                ``max_wait_seconds`` to be admitted
+        """
+        if check_request_budget:
+            self.check(cost_ms)
+
+        start_time = time.perf_counter()
+        if not self._waiters and self._fits(cost_ms):
+            return self._admit(cost_ms, start_time)
+
+        estimated = self.estimate_wait(cost_ms)
+        if estimated > self.max_wait_seconds:
+            metrics.ADMISSION_REJECTIONS.inc(reason="global_budget")
+            raise AdmissionRejectedError(cost_ms, max(1, math.ceil(estimated)))
+
+        waiter = (asyncio.get_running_loop().create_future(), cost_ms, start_time)
+        self._waiters.append(waiter)
+        logger.info(
+            f"Deferring request costing {cost_ms:.0f} ms "
+            f"({self._cost_ms:.0f} ms admitted, about {estimated:.1f} s to wait)"
+        )
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter[0]), self.max_wait_seconds)
+        except asyncio.TimeoutError:
+            if waiter[0].done():
+                # Admitted just as the wait ran out
+                return waiter[0].result()
+            self._waiters.remove(waiter)
+            # Requests behind this one may fit now
+            self._wake()
+            metrics.ADMISSION_REJECTIONS.inc(reason="global_budget")
+            raise AdmissionRejectedError(cost_ms, max(1, math.ceil(self.estimate_wait(cost_ms))))
+        except BaseException:
+            # Cancelled, e.g. because the client went away
+            if waiter in self._waiters:
+                self._waiters.remove(waiter)
+                self._wake()
+            elif waiter[0].done() and not waiter[0].cancelled():
+                waiter[0].result().release()
+            raise
+        return waiter[0].result()
+
+    def _admit(self, cost_ms, start_time):
+        ticket = Ticket(self, cost_ms, (time.perf_counter() - start_time) * 1000)
+        self._admitted.add(ticket)
+        self._cost_ms += cost_ms
+        return ticket
+
+    def _release(self, ticket):
+        self._admitted.discard(ticket)
+        self._cost_ms = max(0.0, self._cost_ms - ticket.cost_ms)
+        self._wake()
+
+    def _wake(self):
+        """Admit waiting requests, in order of arrival, while they fit."""
+        while self._waiters:
+            future, cost_ms, start_time = self._waiters[0]
+            if future.done():
+                self._waiters.popleft()
+                continue
+            if not self._fits(cost_ms):
+                break
+            self._waiters.popleft()
+            future.set_result(self._admit(cost_ms, start_time))
+
+    def stats(self):
+        return {
+            "admitted": len(self._admitted),
+            "waiting": len(self._waiters),
+            "cost_ms": round(self._cost_ms),
+            "request_budget_ms": self.request_budget_ms,
+            "global_budget_ms": self.global_budget_ms,
+        }
+
+
+_controller = None
+
+
+def get_admission_controller():
+    """
+    Get the process-wide admission controller, creating it from the configuration.
+
+    Returns:
+        AdmissionController: The controller
+    """
+    global _controller
+    if _controller is None:
+        _controller = AdmissionController(
+            request_budget_ms=config.ADMISSION_REQUEST_BUDGET_MS,
+            global_budget_ms=config.ADMISSION_GLOBAL_BUDGET_MS,
+            max_wait_seconds=config.ADMISSION_MAX_WAIT_SECONDS,
+        )
+    return _controller
+
+
+def request_cost_ms(parser_name, max_pages, size, page_count=None):
+    """
+    Estimate the cost of parsing up to ``max_pages`` pages of a document.
+
+    Args:
+        parser_name (str): Internal parser name
+        max_pages (int): Pages requested
+        size (int): Size of the document in bytes
+        page_count (int): Pages in the document, if known
+
+    Returns:
+        float: Estimated milliseconds
+    """
+    pages = max(1, max_pages)
+    if page_count is not None:
+        pages = max(1, min(pages, page_count))
+    return analysis.estimate_cost_ms(parser_name, pages, size)
+
+
+async def _count_pages(source):
+    """
+    Count the pages of a document on the PyMuPDF workers, within a short deadline.
+
+    Returns:
+        int: Number of pages, or None if they cannot be counted in time
+    """
+    from src.parsers import get_parser
+
+    deadline = time.time() + config.ADMISSION_COUNT_TIMEOUT_SECONDS
+    try:
+        parser = get_parser("PyMuPDF")
+        return await get_pool("PyMuPDF").run(parser.count_pages, source, deadline=deadline)
+    except Exception as e:
+        logger.warning(f"Cannot count pages for the cost estimate: {str(e)}")
+        return None
+
+
+async def estimate_request_costs(parser_names, max_pages, size, source=None):
+    """
+    Estimate the cost of a request for each of its parsers.
+
+    The estimate assumes the document has all ``max_pages`` pages. When that
+    estimate would not be admitted right away and the document is at hand,
+    its pages are counted (a cheap PyMuPDF open, run on the PyMuPDF workers)
+    to avoid turning away a request for more pages than a short document has.
+    If they cannot be counted within ``PPP_ADMISSION_COUNT_TIMEOUT_SECONDS``,
+    e.g. because the workers are busy, the first estimate is kept.
+
+    Args:
+        parser_names (list): Internal names of the parsers the request runs
+        max_pages (int): Pages requested
+        size (int): Size of the document in bytes
+        source (str | bytes): The document, to count its pages if needed
+
+    Returns:
+        dict: Estimated milliseconds by parser name
+    """
+    costs = {name: request_cost_ms(name, max_pages, size) for name in parser_names}
+    if source is not None and not get_admission_controller().affordable(sum(costs.values())):
+        page_count = await _count_pages(source)
+        if page_count is not None:
+            costs = {
+                name: request_cost_ms(name, max_pages, size, page_count) for name in parser_names
+            }
+    return costs
+
+
+def _collect_admission_metrics():
+    if _controller is not None:
+        metrics.ADMISSION_COST.set(_controller.cost_ms)
+        metrics.ADMISSION_WAITING.set(_controller.waiting)
+
+
+metrics.REGISTRY.add_collector(_collect_admission_metrics)
@@ -0,0 +1,86 @@
+"""
+Pre-flight analysis of documents and estimates of what parsing them costs.
+
+`/api/v1/analyze` probes every page of a document with PyMuPDF (see
+`PyMuPDFParser.analyze`) and estimates the worker time each parser would
+need, so clients can pick a parser and plan capacity before committing to
+an expensive parse. Estimates come from the ``PPP_COST_*`` settings: a cost
+per page for each parser and a cost per MiB of document.
+"""
+
+from src import config
+from src.cache import make_cache_key
+from src.routing import AUTO_PARSER_TYPE, FAST_PARSER, LAYOUT_PARSER
+
+# Bump whenever a change to the analysis alters its output
+ANALYSIS_REVISION = 1
+
+
+def analysis_cache_key(digest, parser):
+    """
+    Build the cache key of the analysis of a document.
+
+    The key covers the analysing parser's version and the routing thresholds,
+    which decide the route reported for each page.
+
+    Args:
+        digest (str): SHA-256 hex digest of the document
+        parser (PyMuPDFParser): The parser performing the analysis
+
+    Returns:
+        str: A hex digest identifying the analysis
+    """
+    thresholds = (config.AUTO_MIN_CHARS, config.AUTO_MIN_RULINGS, config.AUTO_IMAGE_COVERAGE)
+    version = f"{ANALYSIS_REVISION}/{parser.version}/{thresholds}"
+    return make_cache_key(digest, "analysis", 0, 0, version)
+
+
+def page_cost_ms(parser_name):
+    """
+    Returns:
+        int: Estimated worker milliseconds per page of a parser
+    """
+    return config.COST_PAGE_MS.get(parser_name.lower(), config.COST_DEFAULT_PAGE_MS)
+
+
+def estimate_cost_ms(parser_name, pages, size):
+    """
+    Estimate the worker time needed to parse a range of pages.
+
+    Args:
+        parser_name (str): Internal parser name
+        pages (int): Number of pages to parse
+        size (int): Size of the document in bytes
+
+    Returns:
+        float: Estimated milliseconds
+    """
+    return page_cost_ms(parser_name) * pages + config.COST_MB_MS * size / (1024 * 1024)
+
+
+def estimate_costs(analysis, size, parser_names):
+    """
+    Estimate the cost of parsing a whole analysed document with each parser.
+
+    The ``auto`` parser is estimated from the pages the analysis routes to
+    layout analysis: all pages with the fast parser, plus those with the
+    layout parser.
+
+    Args:
+        analysis (dict): Result of `PyMuPDFParser.analyze`
+        size (int): Size of the document in bytes
+        parser_names (list): Internal names of the available parsers
+
+    Returns:
+        dict: Estimated milliseconds by API parser type
+    """
+    pages = analysis["page_count"]
+    estimates = {
+        name.lower(): round(estimate_cost_ms(name, pages, size)) for name in parser_names
+    }
+    if FAST_PARSER in parser_names and LAYOUT_PARSER in parser_names:
+        cost = estimate_cost_ms(FAST_PARSER, pages, size)
+        if analysis["layout_pages"]:
+            cost += estimate_cost_ms(LAYOUT_PARSER, analysis["layout_pages"], size)
+        estimates[AUTO_PARSER_TYPE] = round(cost)
+    return estimates
@@ -0,0 +1,260 @@
+"""
+Parsing many small PDFs in one request.
+
+The documents of a batch, uploaded as separate files or inside zip archives,
+are grouped into chunks that each run as a single worker job: a worker parses
+every document of its chunk in turn, so small documents do not each pay for a
+round-trip to the pool and the pickling of their result on their own. Chunks
+run concurrently on all the workers of the parser's pool, and a failing
+document only fails its own record.
+"""
+
+import hashlib
+import io
+import math
+import time
+import traceback
+import zipfile
+
+from fastapi.concurrency import run_in_threadpool
+from loguru import logger
+
+from src import config
+from src.parsers.errors import ParserError
+from src.uploads import ReceivedUpload, UploadTooLargeError, receive_upload
+
+
+class BatchTooLargeError(Exception):
+    """
+    Raised when a batch holds more documents than ``config.BATCH_MAX_FILES``,
+    or more bytes than ``config.BATCH_MAX_BYTES``.
+    """
+
+    def __init__(self, limit, unit="documents"):
+        super().__init__(f"Batch exceeds the limit of {limit} {unit}")
+        self.limit = limit
+
+
+def is_zip(upload):
+    """Whether an upload is a zip archive rather than a PDF."""
+    if upload.path is not None:
+        return zipfile.is_zipfile(upload.path)
+    return bytes(upload.source[:4]) == b"PK\x03\x04"
+
+
+def unpack_zip(upload, document_count=0, total_bytes=0):
+    """
+    Read the PDFs of an uploaded zip archive into memory.
+
+    Members are matched by their ``.pdf`` extension; directories and other
+    files are skipped. The batch limits are checked against the sizes listed
+    in the archive before anything is decompressed, so an archive cannot
+    expand without bound. Blocking: run it in a thread.
+
+    Args:
+        upload (ReceivedUpload): The uploaded archive
+        document_count (int): Documents already in the batch
+        total_bytes (int): Bytes of the documents already in the batch
+
+    Returns:
+        list: A `ReceivedUpload` per PDF, named ``<archive>/<member>``, or the
+            `UploadTooLargeError` of a member above ``config.UPLOAD_MAX_BYTES``
+
+    Raises:
+        zipfile.BadZipFile: If the archive cannot be read
+        BatchTooLargeError: If the archive takes the batch over its limits
+    """
+    source = upload.path if upload.path is not None else io.BytesIO(upload.source)
+    documents = []
+    with zipfile.ZipFile(source) as archive:
+        members = [
+            member
+            for member in archive.infolist()
+            if not member.is_dir() and member.filename.lower().endswith(".pdf")
+        ]
+        if document_count + len(members) > config.BATCH_MAX_FILES:
+            raise BatchTooLargeError(config.BATCH_MAX_FILES)
+        for member in members:
+            name = f"{upload.filename}/{member.filename}"
+            max_bytes = config.UPLOAD_MAX_BYTES
+            if max_bytes and member.file_size > max_bytes:
+                documents.append((name, UploadTooLargeError(max_bytes)))
+                continue
+            # Reading a member never yields more than its listed size
+            total_bytes += member.file_size
+            if config.BATCH_MAX_BYTES and total_bytes > config.BATCH_MAX_BYTES:
+                raise BatchTooLargeError(config.BATCH_MAX_BYTES, "bytes")
+            data = archive.read(member)
+            document = ReceivedUpload(
+                name, len(data), hashlib.sha256(data).hexdigest(), data=data
+            )
+            documents.append((name, document))
+    return documents
+
+
+async def receive_documents(files):
+    """
+    Receive the uploads of a batch, unpacking zip archives.
+
+    Failures limited to one file (an oversized upload or an unreadable archive)
+    are returned in place of its document, so they fail only that record.
+
+    Args:
+        files (list): The uploaded files
+
+    Returns:
+        list: ``(name, document)`` in upload order, where ``document`` is a
+            `ReceivedUpload`, which the caller must close, or an exception
+
+    Raises:
+        BatchTooLargeError: If the batch holds too many documents or bytes;
+            every upload is closed first
+    """
+    documents = []
+    total_bytes = 0
+    try:
+        for file in files:
+            try:
+                upload = await receive_upload(file)
+            except UploadTooLargeError as e:
+                logger.warning(f"Rejecting batch upload {file.filename}: {str(e)}")
+                documents.append((file.filename, e))
+                continue
+            if not is_zip(upload):
+                documents.append((file.filename, upload))
+                total_bytes += upload.size
+            else:
+                try:
+                    unpacked = await run_in_threadpool(
+                        unpack_zip, upload, len(documents), total_bytes
+                    )
+                    documents.extend(unpacked)
+                    total_bytes += sum(
+                        document.size
+                        for _, document in unpacked
+                        if isinstance(document, ReceivedUpload)
+                    )
+                except zipfile.BadZipFile as e:
+                    logger.warning(f"Cannot read zip archive {file.filename}: {str(e)}")
+                    documents.append((file.filename, e))
+                finally:
+                    upload.close()
+            if len(documents) > config.BATCH_MAX_FILES:
+                raise BatchTooLargeError(config.BATCH_MAX_FILES)
+            if config.BATCH_MAX_BYTES and total_bytes > config.BATCH_MAX_BYTES:
+                raise BatchTooLargeError(config.BATCH_MAX_BYTES, "bytes")
+    except BaseException:
+        close_documents(documents)
+        raise
+    return documents
+
+
+def close_documents(documents):
+    """Close the uploads of ``(name, document)`` pairs."""
+    for _, document in documents:
+        if isinstance(document, ReceivedUpload):
+            document.close()
+
+
+def plan_chunks(documents, max_files, max_bytes, size=lambda document: document.size):
+    """
+    Group documents into chunks parsed by one worker job each.
+
+    Documents are taken in order; a chunk is closed once it holds
+    ``max_files`` documents or ``max_bytes`` bytes. A document larger than
+    ``max_bytes`` gets a chunk of its own.
+
+    Args:
+        documents (list): The documents, or items holding them
+        max_files (int): Maximum documents per chunk
+        max_bytes (int): Maximum total size of a chunk
+        size (callable): Size in bytes of an item
+
+    Returns:
+        list: Lists of documents
+    """
+    chunks = []
+    chunk = []
+    chunk_bytes = 0
+    for document in documents:
+        if chunk and (len(chunk) >= max_files or chunk_bytes + size(document) > max_bytes):
+            chunks.append(chunk)
+            chunk = []
+            chunk_bytes = 0
+        chunk.append(document)
+        chunk_bytes += size(document)
+    if chunk:
+        chunks.append(chunk)
+    return chunks
+
+
+def parse_documents(parse, sources, start_page, max_pages, timeout=None):
+    """
+    Parse several documents in turn on a worker.
+
+    Every document is given ``timeout`` seconds from when its parse starts
+    (see the ``deadline`` of `PDFParser.parse`).
+
+    Args:
+        parse (callable): ``PDFParser.parse`` of the parser to use
+        sources (list): Paths or contents of the documents
+        start_page (int): Page to start extraction from (1-indexed)
+        max_pages (int): Maximum number of pages to extract
+        timeout (float): Seconds allowed per document, or None
+
+    Returns:
+        list: Per document, its `ParseResult` or the `ParserError` it failed
+            with, and its duration in ms
+    """
+    outcomes = []
+    for source in sources:
+        start_time = time.perf_counter()
+        deadline = time.time() + timeout if timeout else None
+        try:
+            outcome = parse(source, start_page, max_pages, None, deadline)
+        except ParserError as e:
+            outcome = e
+        except Exception as e:
+            # Returned rather than raised so the rest of the chunk is still parsed
+            outcome = ParserError(f"Parsing failed: {str(e)}", traceback.format_exc())
+        outcomes.append((outcome, (time.perf_counter() - start_time) * 1000))
+    return outcomes
+
+
+async def run_chunk(pool, parser, chunk, start_page, max_pages, timeout=None):
+    """
+    Parse a chunk of documents as a single job of ``pool``.
+
+    With a ``timeout``, each document is given that many seconds, and the
+    job is stopped if the chunk overruns the sum of them by more than the
+    grace period (``config.PARSE_TIMEOUT_GRACE_SECONDS``).
+
+    Returns:
+        list: As `parse_documents`
+
+    Raises:
+        PoolSaturatedError: If the pool rejects the job
+        DeadlineExceededError: If the job was stopped
+    """
+    logger.info(
+        f"Parsing a chunk of {len(chunk)} documents "
+        f"({sum(document.size for document in chunk)} bytes) with {parser.name}"
+    )
+    sources = [document.source for document in chunk]
+    deadline = None
+    if timeout:
+        deadline = time.time() + timeout * len(chunk) + config.PARSE_TIMEOUT_GRACE_SECONDS
+    return await pool.run(
+        parse_documents, parser.parse, sources, start_page, max_pages, timeout, deadline=deadline
+    )
+
+
+def chunk_limits(pool, document_count):
+    """
+    Size the chunks of a batch so that every worker of ``pool`` gets some.
+
+    Returns:
+        tuple: (maximum documents, maximum bytes) of a chunk
+    """
+    max_files = min(config.BATCH_CHUNK_FILES, math.ceil(document_count / pool.size))
+    return max(1, max_files), max(1, config.BATCH_CHUNK_BYTES)
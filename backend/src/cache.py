@@ -0,0 +1,249 @@
+"""
+Content-addressed cache for parse results.
+
+Results are keyed on the SHA-256 of the uploaded bytes together with the parser,
+page range and parser version, so re-submitting the same PDF with the same options
+returns the stored result instead of running the parser again.
+
+The cache has two tiers:
+
+* an in-memory LRU tier bounded by the total size of the stored entries
+* an on-disk tier (one JSON file per entry) that survives restarts, also bounded
+  by size and evicted least-recently-used first
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+from loguru import logger
+
+from src import config
+
+# Bump when the layout of cached entries changes, so older entries are ignored
+ENTRY_FORMAT = 2
+
+
+def make_cache_key(digest, parser_name, start_page, max_pages, parser_version):
+    """
+    Build the cache key for a parse request.
+
+    Args:
+        digest (str): SHA-256 hex digest of the uploaded file
+        parser_name (str): Internal parser name
+        start_page (int): Page to start extraction from (1-indexed)
+        max_pages (int): Maximum number of pages to extract
+        parser_version (str): Version string of the parser
+
+    Returns:
+        str: A hex digest identifying the request
+    """
+    raw = json.dumps(
+        [ENTRY_FORMAT, digest, parser_name, start_page, max_pages, str(parser_version)],
+        separators=(",", ":"),
+    )
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class ResultCache:
+    """
+    Two-tier (memory + disk) LRU cache of JSON-serialisable parse results.
+    """
+
+    def __init__(self, directory=None, memory_max_bytes=0, disk_max_bytes=0):
+        """
+        Args:
+            directory (str): Directory of the on-disk tier, or None to disable it
+            memory_max_bytes (int): Size budget of the in-memory tier
+            disk_max_bytes (int): Size budget of the on-disk tier
+        """
+        self.memory_max_bytes = memory_max_bytes
+        self.disk_max_bytes = disk_max_bytes
+        self.directory = Path(directory) if directory else None
+
+        self._lock = threading.Lock()
+        # key -> (encoded entry, size); ordered from least to most recently used
+        self._memory = OrderedDict()
+        self._memory_bytes = 0
+        # key -> size; ordered from least to most recently used
+        self._disk = OrderedDict()
+        self._disk_bytes = 0
+
+        self.hits = 0
+        self.misses = 0
+
+        if self.directory is not None:
+            self._load_disk_index()
+
+    def _path(self, key):
+        return self.directory / key[:2] / f"{key}.json"
+
+    def _load_disk_index(self):
+        """Rebuild the disk index from the files left by a previous process."""
+        try:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            entries = []
+            for path in self.directory.glob("*/*.json"):
+                stat = path.stat()
+                entries.append((stat.st_mtime, path.stem, stat.st_size))
+        except OSError as e:
+            logger.warning(f"Disabling on-disk result cache: {str(e)}")
+            self.directory = None
+            return
+
+        for _, key, size in sorted(entries):
+            self._disk[key] = size
+            self._disk_bytes += size
+        logger.info(
+            f"Loaded result cache index: {len(self._disk)} entries, "
+            f"{self._disk_bytes} bytes in {self.directory}"
+        )
+        self._evict_disk()
+
+    def get(self, key):
+        """
+        Look up a cached result.
+
+        Args:
+            key (str): Cache key from `make_cache_key`
+
+        Returns:
+            dict: The cached result, or None on a miss
+        """
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                self._memory.move_to_end(key)
+                self.hits += 1
+                return json.loads(entry[0])
+
+            if key in self._disk:
+                path = self._path(key)
+                try:
+                    encoded = path.read_bytes()
+                    os.utime(path)
+                except OSError as e:
+                    logger.warning(f"Dropping unreadable cache entry {key}: {str(e)}")
+                    self._disk_bytes -= self._disk.pop(key)
+                else:
+                    self._disk.move_to_end(key)
+                    self._store_memory(key, encoded)
+                    self.hits += 1
+                    return json.loads(encoded)
+
+            self.misses += 1
+            return None
+
+    def put(self, key, value):
+        """
+        Store a result in both tiers.
+
+        Args:
+            key (str): Cache key from `make_cache_key`
+            value (dict): JSON-serialisable result
+        """
+        encoded = json.dumps(value, separators=(",", ":")).encode("utf-8")
+        with self._lock:
+            self._store_memory(key, encoded)
+            self._store_disk(key, encoded)
+
+    def _store_memory(self, key, encoded):
+        size = len(encoded)
+        if size > self.memory_max_bytes:
+            return
+        if key in self._memory:
+            self._memory_bytes -= self._memory.pop(key)[1]
+        self._memory[key] = (encoded, size)
+        self._memory_bytes += size
+        while self._memory_bytes > self.memory_max_bytes:
+            _, (_, evicted_size) = self._memory.popitem(last=False)
+            self._memory_bytes -= evicted_size
+
+    def _store_disk(self, key, encoded):
+        size = len(encoded)
+        if self.directory is None or size > self.disk_max_bytes:
+            return
+        path = self._path(key)
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            # Write to a temporary file first so readers never see partial entries
+            fd, tmp_path = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+            with os.fdopen(fd, "wb") as fp:
+                fp.write(encoded)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning(f"Failed to write cache entry {key}: {str(e)}")
+            return
+
+        if key in self._disk:
+            self._disk_bytes -= self._disk.pop(key)
+        self._disk[key] = size
+        self._disk_bytes += size
+        self._evict_disk()
+
+    def _evict_disk(self):
+        while self._disk_bytes > self.disk_max_bytes and self._disk:
+            key, size = self._disk.popitem(last=False)
+            self._disk_bytes -= size
+            try:
+                self._path(key).unlink()
+            except OSError as e:
+                logger.warning(f"Failed to evict cache entry {key}: {str(e)}")
+
+    def clear(self):
+        """Remove every entry from both tiers and reset the counters."""
+        with self._lock:
+            self._memory.clear()
+            self._memory_bytes = 0
+            for key in self._disk:
+                try:
+                    self._path(key).unlink()
+                except OSError:
+                    pass
+            self._disk.clear()
+            self._disk_bytes = 0
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self):
+        """
+        Returns:
+            dict: Hit/miss counters and the size of each tier
+        """
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "memory_entries": len(self._memory),
+                "memory_bytes": self._memory_bytes,
+                "disk_entries": len(self._disk),
+                "disk_bytes": self._disk_bytes,
+            }
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_cache():
+    """
+    Get the process-wide result cache, creating it from the configuration.
+
+    Returns:
+        ResultCache: The cache instance, or None if caching is disabled
+    """
+    global _cache
+    if not config.CACHE_ENABLED:
+        return None
+    with _cache_lock:
+        if _cache is None:
+            _cache = ResultCache(
+                directory=config.CACHE_DIR or None,
+                memory_max_bytes=config.CACHE_MEMORY_MAX_BYTES,
+                disk_max_bytes=config.CACHE_DISK_MAX_BYTES,
+            )
+        return _cache
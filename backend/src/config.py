@@ -0,0 +1,201 @@
+"""
+Runtime configuration.
+
+All settings are read from ``PPP_*`` environment variables when the module is
+first imported. Other modules should access them as ``config.NAME`` (rather
+than importing the names directly) so tests can monkeypatch them.
+"""
+
+import os
+
+
+def _env_str(name, default):
+    return os.environ.get(name, default)
+
+
+def _env_int(name, default):
+    value = os.environ.get(name)
+    if value is None or value.strip() == "":
+        return default
+    return int(value)
+
+
+def _env_float(name, default):
+    value = os.environ.get(name)
+    if value is None or value.strip() == "":
+        return default
+    return float(value)
+
+
+def _env_mapping(name):
+    """Parse a ``key=int,key=int`` variable into a dict with lower-case keys."""
+    result = {}
+    for item in os.environ.get(name, "").split(","):
+        if "=" in item:
+            key, value = item.split("=", 1)
+            result[key.strip().lower()] = int(value)
+    return result
+
+
+def _env_list(name, default):
+    """Parse a comma-separated variable into a list of lower-case names."""
+    value = os.environ.get(name, default)
+    return [item.strip().lower() for item in value.split(",") if item.strip()]
+
+
+def _env_bool(name, default):
+    value = os.environ.get(name)
+    if value is None or value.strip() == "":
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
+# --- Result cache ---
+CACHE_ENABLED = _env_bool("PPP_CACHE_ENABLED", True)
+# Directory of the on-disk tier. Set to an empty string to keep the cache in memory only.
+CACHE_DIR = _env_str("PPP_CACHE_DIR", "cache/results")
+CACHE_MEMORY_MAX_BYTES = _env_int("PPP_CACHE_MEMORY_MAX_BYTES", 64 * 1024 * 1024)
+CACHE_DISK_MAX_BYTES = _env_int("PPP_CACHE_DISK_MAX_BYTES", 1024 * 1024 * 1024)
+
+# --- Worker pools ---
+# "process" runs parsers in worker processes, "thread" in threads of the API process
+WORKER_BACKEND = _env_str("PPP_WORKER_BACKEND", "process")
+# Per-parser pool sizes, e.g. "docling=1,pdfminer=2,pymupdf=4,pypdf2=2"
+POOL_SIZES = _env_mapping("PPP_POOL_SIZES")
+# Jobs allowed to wait for a free worker before requests are rejected with 503
+POOL_QUEUE_LIMIT = _env_int("PPP_POOL_QUEUE_LIMIT", 8)
+# Parsers whose workers are warmed up (models loaded) at startup; /ready waits for them
+WARMUP_PARSERS = _env_list("PPP_WARMUP_PARSERS", "docling")
+# Parsers imported (with their library) at startup rather than on first use, in
+# the API process and in every one of their workers
+PRELOAD_PARSERS = _env_list("PPP_PRELOAD_PARSERS", "pymupdf,pypdf2,pdfminer")
+# Worker processes are replaced by fresh ones after this many jobs (0: never),
+# which releases memory that parser libraries accumulate over time
+WORKER_MAX_JOBS = _env_int("PPP_WORKER_MAX_JOBS", 500)
+# Worker processes whose resident memory exceeds this many MiB after a job are
+# replaced by fresh ones (0: no limit). PPP_WORKER_MAX_RSS_MB_PER_PARSER sets
+# it by parser, e.g. "docling=6144,pymupdf=512"
+WORKER_MAX_RSS_MB = _env_int("PPP_WORKER_MAX_RSS_MB", 1024)
+WORKER_MAX_RSS_MB_PER_PARSER = {
+    "docling": 6144,
+    **_env_mapping("PPP_WORKER_MAX_RSS_MB_PER_PARSER"),
+}
+# Also run a conversion of a bundled one-page PDF while warming up Docling
+DOCLING_WARMUP_CONVERSION = _env_bool("PPP_DOCLING_WARMUP_CONVERSION", True)
+
+# --- Docling ---
+# Pipeline profile used when a request does not ask for one: "fast" (no OCR, no
+# table structure), "balanced" (fast table structure, no OCR) or "accurate"
+DOCLING_PROFILE = _env_str("PPP_DOCLING_PROFILE", "accurate").lower()
+# CPU threads of each Docling converter (0 keeps Docling's default, which
+# follows OMP_NUM_THREADS); keep workers x threads within the cores available
+DOCLING_NUM_THREADS = _env_int("PPP_DOCLING_NUM_THREADS", 0)
+# Pages Docling processes together inside a conversion (0 keeps its default)
+DOCLING_PAGE_BATCH_SIZE = _env_int("PPP_DOCLING_PAGE_BATCH_SIZE", 0)
+
+# --- Streaming ---
+# Pages extracted per worker job by the streaming endpoint after the first page;
+# later jobs double in size up to eight times this
+STREAM_BATCH_PAGES = _env_int("PPP_STREAM_BATCH_PAGES", 8)
+
+# --- Sharding ---
+# Page ranges of at least twice this many pages are split into shards of at
+# least this many pages, extracted in parallel by the idle workers of the
+# parser's pool (process backend only; 0 disables sharding)
+SHARD_MIN_PAGES = _env_int("PPP_SHARD_MIN_PAGES", 32)
+
+# --- Auto parser ---
+# Thresholds of the per-page probe that routes pages of `parser_type=auto` to
+# Docling instead of PyMuPDF. Pages with images but fewer than this many
+# characters are taken to lack a text layer
+AUTO_MIN_CHARS = _env_int("PPP_AUTO_MIN_CHARS", 50)
+# Horizontal and vertical rulings from which a page is taken to hold a table
+AUTO_MIN_RULINGS = _env_int("PPP_AUTO_MIN_RULINGS", 8)
+# Fraction of the page area covered by images from which layout analysis is used
+AUTO_IMAGE_COVERAGE = _env_float("PPP_AUTO_IMAGE_COVERAGE", 0.5)
+
+# --- Cost estimates ---
+# Estimated worker milliseconds per page, by parser, e.g. "docling=1000,pymupdf=3";
+# parsers not listed cost COST_DEFAULT_PAGE_MS. "auto" is used for requests to
+# the auto parser, whose pages have not been analysed
+COST_PAGE_MS = {
+    "auto": 250,
+    "docling": 1000,
+    "pdfminer": 40,
+    "pypdf2": 15,
+    "pymupdf": 3,
+    **_env_mapping("PPP_COST_PAGE_MS"),
+}
+COST_DEFAULT_PAGE_MS = _env_int("PPP_COST_DEFAULT_PAGE_MS", 50)
+# Estimated worker milliseconds per MiB of document, for opening and reading it
+COST_MB_MS = _env_int("PPP_COST_MB_MS", 20)
+
+# --- Admission control ---
+# Largest estimated cost (worker milliseconds, see PPP_COST_*) of a single parse
+# request; costlier requests are rejected with 413 (0 disables the limit)
+ADMISSION_REQUEST_BUDGET_MS = _env_int("PPP_ADMISSION_REQUEST_BUDGET_MS", 5 * 60 * 1000)
+# Largest total estimated cost of the parse requests running at once; later
+# requests wait for earlier ones to finish (0 disables the limit)
+ADMISSION_GLOBAL_BUDGET_MS = _env_int("PPP_ADMISSION_GLOBAL_BUDGET_MS", 20 * 60 * 1000)
+# Longest a request waits to be admitted before it is rejected with 503
+ADMISSION_MAX_WAIT_SECONDS = _env_float("PPP_ADMISSION_MAX_WAIT_SECONDS", 10)
+# Longest the page count of a document may take when refining its cost estimate;
+# past it, the estimate assumes all the pages requested are there
+ADMISSION_COUNT_TIMEOUT_SECONDS = _env_float("PPP_ADMISSION_COUNT_TIMEOUT_SECONDS", 2)
+
+# --- Deadlines ---
+# Seconds a parse request may run, by parser, e.g. "docling=600,pdfminer=60";
+# parsers not listed get PARSE_TIMEOUT_SECONDS (0: no deadline). Requests can
+# ask for less with their `timeout` field. Pages extracted by the deadline are
+# returned as a partial result
+PARSE_TIMEOUT_SECONDS = _env_float("PPP_PARSE_TIMEOUT_SECONDS", 120)
+PARSE_TIMEOUTS = {"docling": 600, **_env_mapping("PPP_PARSE_TIMEOUTS")}
+# Seconds the page being extracted at the deadline is given to finish before
+# its worker process is killed and the request fails with 504
+PARSE_TIMEOUT_GRACE_SECONDS = _env_float("PPP_PARSE_TIMEOUT_GRACE_SECONDS", 10)
+
+# --- Uploads ---
+# Uploads larger than this are rejected with 413 (0 disables the limit)
+UPLOAD_MAX_BYTES = _env_int("PPP_UPLOAD_MAX_BYTES", 200 * 1024 * 1024)
+# Uploads up to this size are parsed straight from memory; larger ones are
+# written to a temporary file first
+UPLOAD_MEMORY_THRESHOLD = _env_int("PPP_UPLOAD_MEMORY_THRESHOLD", 32 * 1024 * 1024)
+UPLOAD_CHUNK_BYTES = _env_int("PPP_UPLOAD_CHUNK_BYTES", 1024 * 1024)
+
+# --- Background jobs ---
+# SQLite database holding job state and per-page results
+JOBS_DB = _env_str("PPP_JOBS_DB", "cache/jobs.sqlite3")
+# Seconds that results of finished jobs are kept
+JOB_TTL_SECONDS = _env_int("PPP_JOB_TTL_SECONDS", 24 * 60 * 60)
+# Jobs that run at the same time; later jobs wait in the "queued" state
+JOB_CONCURRENCY = _env_int("PPP_JOB_CONCURRENCY", 2)
+# Jobs allowed to wait for a running one; further jobs are rejected with 503
+JOB_QUEUE_LIMIT = _env_int("PPP_JOB_QUEUE_LIMIT", 20)
+# Workers per parser dedicated to jobs, separate from the interactive pools
+JOB_POOL_SIZE = _env_int("PPP_JOB_POOL_SIZE", 1)
+
+# --- Batches ---
+# Documents accepted by one batch request, counting the PDFs inside zip archives
+BATCH_MAX_FILES = _env_int("PPP_BATCH_MAX_FILES", 1000)
+# Total size of the documents of one batch request, counting the PDFs inside zip
+# archives once decompressed (0 disables the limit)
+BATCH_MAX_BYTES = _env_int("PPP_BATCH_MAX_BYTES", 512 * 1024 * 1024)
+# Documents of a batch parsed by one worker job, at most this many and this
+# many bytes; fewer if that leaves workers of the pool idle
+BATCH_CHUNK_FILES = _env_int("PPP_BATCH_CHUNK_FILES", 8)
+BATCH_CHUNK_BYTES = _env_int("PPP_BATCH_CHUNK_BYTES", 4 * 1024 * 1024)
+
+# --- Document sessions ---
+# Documents uploaded to /api/v1/documents kept at once, and their total size;
+# the least recently used are removed first
+SESSION_MAX_DOCUMENTS = _env_int("PPP_SESSION_MAX_DOCUMENTS", 64)
+SESSION_MAX_BYTES = _env_int("PPP_SESSION_MAX_BYTES", 512 * 1024 * 1024)
+# Seconds a document, and the workers' open handles of it, are kept unused
+SESSION_TTL_SECONDS = _env_int("PPP_SESSION_TTL_SECONDS", 30 * 60)
+# Open documents kept by every worker, and the total size of their files
+SESSION_WORKER_HANDLES = _env_int("PPP_SESSION_WORKER_HANDLES", 8)
+SESSION_WORKER_MAX_BYTES = _env_int("PPP_SESSION_WORKER_MAX_BYTES", 256 * 1024 * 1024)
+
+# --- Profiling ---
+# Allow requests to ask for a stage-by-stage timing breakdown with `profile`
+PROFILING_ENABLED = _env_bool("PPP_PROFILING_ENABLED", False)
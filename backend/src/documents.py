@@ -0,0 +1,467 @@
+"""
+Document sessions: upload a document once, then read ranges of its pages.
+
+The API process keeps uploaded documents in a `DocumentStore`, in shared
+memory when parsers run in worker processes, so a request for more pages
+only sends the workers a small reference. Every worker keeps the documents
+it has opened in a `HandleCache`, and the pages of a document are always
+read by the same worker (see `WorkerPool.run`), so reading the next pages of
+a document does not open and parse the file again. Both are bounded by a number of
+entries, a total size and a time-to-live, evicting the least recently used
+entries first. When the store releases a document, it tells the workers that
+opened it to close their handles.
+"""
+
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from contextlib import contextmanager
+
+from loguru import logger
+
+from src import config
+from src.parsers.errors import PageRangeError
+from src.sharding import SharedDocument, attach_source
+from src.workers import find_pool
+
+
+class DocumentTooLargeError(Exception):
+    """Raised when a document does not fit in the store even when it is empty."""
+
+    def __init__(self, limit):
+        super().__init__(f"Document exceeds the session limit of {limit} bytes")
+        self.limit = limit
+
+
+class StoredDocument:
+    """
+    A document uploaded to a session.
+
+    Attributes:
+        id (str): Identifier of the document
+        filename (str): Name of the file given by the client
+        size (int): Size in bytes
+        digest (str): SHA-256 hex digest of the content
+    """
+
+    def __init__(self, upload, shared=None):
+        self.id = uuid.uuid4().hex
+        self.filename = upload.filename
+        self.size = upload.size
+        self.digest = upload.digest
+        self.created_at = time.time()
+        self.last_used = time.monotonic()
+        self._upload = upload
+        self._shared = shared
+        self._leases = 0
+        self._evicted = False
+        # Pool name -> name of the parser whose workers may hold a handle
+        self._readers = {}
+
+    @property
+    def source(self):
+        """The source to hand to a worker: a `SharedHandle`, the buffer or the spill file path."""
+        if self._shared is not None:
+            return self._shared.handle
+        return self._upload.source
+
+    def to_dict(self):
+        return {
+            "document_id": self.id,
+            "filename": self.filename,
+            "size": self.size,
+            "sha256": self.digest,
+            "created_at": self.created_at,
+        }
+
+    def opened_by(self, pool_name, parser_name):
+        """Record that the workers of a pool may keep the document open (see `close`)."""
+        self._readers[pool_name] = parser_name
+
+    def close(self):
+        """Release the document, and have the workers that opened it close their handles."""
+        if self._shared is not None:
+            self._shared.close()
+            self._shared = None
+        self._upload.close()
+        readers, self._readers = self._readers, {}
+        for pool_name, parser_name in readers.items():
+            # A pool stopped since has closed its handles with its workers
+            pool = find_pool(pool_name)
+            if pool is not None:
+                # Same worker as the reads, after any read still queued there
+                pool.run_detached(close_document_handle, parser_name, self.id, affinity=self.id)
+
+
+class DocumentStore:
+    """
+    Uploaded documents by id, bounded in number, total size and idle time.
+
+    Documents are only released once no request uses them any more (see `lease`).
+    """
+
+    def __init__(self, max_documents, max_bytes, ttl_seconds):
+        self.max_documents = max_documents
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        # id -> StoredDocument; ordered from least to most recently used
+        self._documents = OrderedDict()
+        self._bytes = 0
+
+    def add(self, upload):
+        """
+        Take ownership of an upload and store it as a new document.
+
+        In-memory uploads are copied into shared memory when parsers run in
+        worker processes.
+
+        Args:
+            upload (ReceivedUpload): The upload
+
+        Returns:
+            StoredDocument: The stored document
+
+        Raises:
+            DocumentTooLargeError: If the upload exceeds the size of the store;
+                the upload is closed
+        """
+        if self.max_bytes and upload.size > self.max_bytes:
+            upload.close()
+            raise DocumentTooLargeError(self.max_bytes)
+        shared = None
+        if upload.path is None and config.WORKER_BACKEND == "process":
+            shared = SharedDocument(upload.source)
+            upload.close()
+        document = StoredDocument(upload, shared)
+
+        with self._lock:
+            self._documents[document.id] = document
+            self._bytes += document.size
+            evicted = self._evict_locked()
+        self._release(evicted)
+        logger.info(f"Stored document {document.id} ({document.filename}, {document.size} bytes)")
+        return document
+
+    def get(self, document_id):
+        """
+        Returns:
+            StoredDocument: The document, or None if it is unknown or has expired
+        """
+        with self._lock:
+            expired = self._evict_locked()
+            document = self._documents.get(document_id)
+            if document is not None:
+                self._documents.move_to_end(document_id)
+                document.last_used = time.monotonic()
+        self._release(expired)
+        return document
+
+    @contextmanager
+    def lease(self, document_id):
+        """
+        Use a document, keeping it open until the block exits even if it is evicted.
+
+        Yields:
+            StoredDocument: The document, or None if it is unknown or has expired
+        """
+        document = self.get(document_id)
+        if document is not None:
+            with self._lock:
+                if document._evicted:
+                    # Evicted since; it may already be closed
+                    document = None
+                else:
+                    document._leases += 1
+        if document is None:
+            yield None
+            return
+        try:
+            yield document
+        finally:
+            self._return(document)
+
+    def delete(self, document_id):
+        """
+        Remove a document.
+
+        Returns:
+            bool: Whether the document existed
+        """
+        with self._lock:
+            document = self._documents.pop(document_id, None)
+            if document is not None:
+                self._bytes -= document.size
+        if document is None:
+            return False
+        self._release([document])
+        return True
+
+    def stats(self):
+        with self._lock:
+            return {"documents": len(self._documents), "bytes": self._bytes}
+
+    def close(self):
+        """Remove every document."""
+        with self._lock:
+            documents = list(self._documents.values())
+            self._documents.clear()
+            self._bytes = 0
+        self._release(documents)
+
+    def _evict_locked(self):
+        """Remove expired documents, then the least recently used ones over the limits."""
+        evicted = []
+        now = time.monotonic()
+        for document in list(self._documents.values()):
+            if self.ttl_seconds and now - document.last_used > self.ttl_seconds:
+                del self._documents[document.id]
+                self._bytes -= document.size
+                evicted.append(document)
+        while len(self._documents) > self.max_documents or (
+            self.max_bytes and self._bytes > self.max_bytes
+        ):
+            _, document = self._documents.popitem(last=False)
+            self._bytes -= document.size
+            evicted.append(document)
+        return evicted
+
+    def _release(self, documents):
+        for document in documents:
+            logger.info(f"Evicting document {document.id}")
+            with self._lock:
+                document._evicted = True
+                close = document._leases == 0
+            if close:
+                document.close()
+
+    def _return(self, document):
+        with self._lock:
+            document._leases -= 1
+            close = document._evicted and document._leases == 0
+        if close:
+            document.close()
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_document_store():
+    """
+    Get the process-wide document store, creating it from the configuration.
+
+    Returns:
+        DocumentStore: The store
+    """
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = DocumentStore(
+                max_documents=config.SESSION_MAX_DOCUMENTS,
+                max_bytes=config.SESSION_MAX_BYTES,
+                ttl_seconds=config.SESSION_TTL_SECONDS,
+            )
+        return _store
+
+
+class HandleCache:
+    """
+    Open `DocumentHandle` objects of one worker, bounded in number, total
+    document size and idle time.
+
+    A handle is checked out while it is used, so two threads never read the
+    same open document at once.
+    """
+
+    def __init__(self, max_handles, max_bytes, ttl_seconds):
+        self.max_handles = max_handles
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        # key -> (handle, last used); ordered from least to most recently used
+        self._handles = OrderedDict()
+        self._bytes = 0
+
+    def checkout(self, key):
+        """
+        Take a handle out of the cache.
+
+        Returns:
+            DocumentHandle: The open handle, or None if there is none
+        """
+        with self._lock:
+            entry = self._handles.pop(key, None)
+            if entry is not None:
+                self._bytes -= entry[0].size
+            expired = self._evict_locked()
+        self._close(expired)
+        if entry is None:
+            return None
+        handle, last_used = entry
+        if self.ttl_seconds and time.monotonic() - last_used > self.ttl_seconds:
+            self._close([handle])
+            return None
+        return handle
+
+    def checkin(self, key, handle):
+        """Put a handle (back) into the cache, closing it if another one took its place."""
+        with self._lock:
+            if key in self._handles or self.max_handles < 1:
+                duplicate = [handle]
+            else:
+                duplicate = []
+                self._handles[key] = (handle, time.monotonic())
+                self._bytes += handle.size
+            evicted = self._evict_locked()
+        self._close(duplicate + evicted)
+
+    def discard(self, key):
+        """
+        Close the handle of a key, if the cache has it.
+
+        Returns:
+            bool: Whether there was a handle
+        """
+        with self._lock:
+            entry = self._handles.pop(key, None)
+            if entry is not None:
+                self._bytes -= entry[0].size
+        if entry is None:
+            return False
+        self._close([entry[0]])
+        return True
+
+    def close(self):
+        with self._lock:
+            handles = [handle for handle, _ in self._handles.values()]
+            self._handles.clear()
+            self._bytes = 0
+        self._close(handles)
+
+    def _evict_locked(self):
+        handles = []
+        now = time.monotonic()
+        for key, (handle, last_used) in list(self._handles.items()):
+            if self.ttl_seconds and now - last_used > self.ttl_seconds:
+                del self._handles[key]
+                self._bytes -= handle.size
+                handles.append(handle)
+        while self._handles and (
+            len(self._handles) > self.max_handles
+            or (self.max_bytes and self._bytes > self.max_bytes and len(self._handles) > 1)
+        ):
+            _, (handle, _) = self._handles.popitem(last=False)
+            self._bytes -= handle.size
+            handles.append(handle)
+        return handles
+
+    @staticmethod
+    def _close(handles):
+        for handle in handles:
+            handle.close()
+
+
+_handle_cache = None
+_handle_cache_lock = threading.Lock()
+
+
+def get_handle_cache():
+    """
+    Get the cache of open documents of this process (each worker process has its own).
+
+    Returns:
+        HandleCache: The cache
+    """
+    global _handle_cache
+    with _handle_cache_lock:
+        if _handle_cache is None:
+            _handle_cache = HandleCache(
+                max_handles=config.SESSION_WORKER_HANDLES,
+                max_bytes=config.SESSION_WORKER_MAX_BYTES,
+                ttl_seconds=config.SESSION_TTL_SECONDS,
+            )
+        return _handle_cache
+
+
+def shutdown_documents():
+    """Release the stored documents and the documents open in this process."""
+    global _store, _handle_cache
+    with _store_lock:
+        store, _store = _store, None
+    if store is not None:
+        store.close()
+    with _handle_cache_lock:
+        handle_cache, _handle_cache = _handle_cache, None
+    if handle_cache is not None:
+        handle_cache.close()
+
+
+def close_document_handle(parser_name, document_id):
+    """
+    Close the handle a worker keeps for a document, if it has one.
+
+    Args:
+        parser_name (str): Name of the parser that opened the document
+        document_id (str): Identifier of the document
+
+    Returns:
+        bool: Whether the worker had the document open
+    """
+    return get_handle_cache().discard((parser_name, document_id))
+
+
+def parse_document_pages(parser, document_id, source, start_page, max_pages, deadline=None):
+    """
+    Extract a range of pages of a stored document on a worker.
+
+    The document is read from the worker's open handle if it has one, and
+    opened (and kept open) otherwise. Parsers without handle support parse
+    the source as usual.
+
+    Args:
+        parser (PDFParser): The parser
+        document_id (str): Identifier of the document
+        source (SharedHandle | str | bytes): Source of the document
+        start_page (int): Page to start extraction from (1-indexed)
+        max_pages (int): Maximum number of pages to extract
+        deadline (float): See `PDFParser.parse`
+
+    Returns:
+        tuple: (ParseResult, whether an open handle was reused)
+
+    Raises:
+        ParserError: If the document cannot be processed
+    """
+    if not parser.supports_handles:
+        source, release = attach_source(source)
+        try:
+            return parser.parse(source, start_page, max_pages, None, deadline), False
+        finally:
+            release()
+
+    cache = get_handle_cache()
+    key = (parser.name, document_id)
+    handle = cache.checkout(key)
+    reused = handle is not None
+    if handle is None:
+        source, release = attach_source(source)
+        try:
+            handle = parser.open_handle(source)
+        except BaseException:
+            release()
+            raise
+        handle.on_close(release)
+
+    try:
+        result = parser.parse_handle(handle, start_page, max_pages, deadline)
+    except PageRangeError:
+        cache.checkin(key, handle)
+        raise
+    except BaseException:
+        # The handle may be left in an unknown state
+        handle.close()
+        raise
+    cache.checkin(key, handle)
+    return result, reused
@@ -0,0 +1,588 @@
+"""
+Background parse jobs.
+
+Large documents are parsed as jobs instead of within a single request: a job
+is submitted, runs on worker pools separate from the interactive ones, and its
+progress and page results are written to a SQLite database as each batch of
+pages completes. Clients poll the job for progress and partial results.
+Results of finished jobs are kept for ``config.JOB_TTL_SECONDS``.
+
+Several API processes (e.g. uvicorn workers) may share the database. Every
+job belongs to the process that runs it, which records a heartbeat while it
+is alive; jobs left active by a process whose heartbeat has stopped can never
+finish, so any other process marks them as failed.
+"""
+
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+
+from fastapi.concurrency import run_in_threadpool
+from loguru import logger
+
+from src import config, metrics
+from src.parsers import render
+from src.parsers.errors import ParserError
+from src.workers import get_job_pool, iter_page_batches
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+CANCELLED = "cancelled"
+
+ACTIVE_STATUSES = (QUEUED, RUNNING)
+
+# Seconds between heartbeats of a job manager
+HEARTBEAT_SECONDS = 30
+# Seconds without a heartbeat after which the jobs of a manager are failed
+ORPHAN_SECONDS = 4 * HEARTBEAT_SECONDS
+
+
+class JobQueueFullError(Exception):
+    """Raised when a job is submitted while the queue of waiting jobs is full."""
+
+    def __init__(self, limit):
+        super().__init__(f"Job queue is full ({limit} jobs waiting)")
+        self.limit = limit
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    status TEXT NOT NULL,
+    parser TEXT NOT NULL,
+    filename TEXT,
+    start_page INTEGER NOT NULL,
+    max_pages INTEGER,
+    pages_total INTEGER,
+    pages_done INTEGER NOT NULL DEFAULT 0,
+    header TEXT,
+    footer TEXT,
+    error TEXT,
+    metadata TEXT,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL,
+    expires_at REAL,
+    owner TEXT
+);
+CREATE TABLE IF NOT EXISTS job_owners (
+    id TEXT PRIMARY KEY,
+    heartbeat_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS job_pages (
+    job_id TEXT NOT NULL REFERENCES jobs(id) ON DELETE CASCADE,
+    page INTEGER NOT NULL,
+    content TEXT NOT NULL,
+    PRIMARY KEY (job_id, page)
+);
+CREATE TABLE IF NOT EXISTS job_tables (
+    job_id TEXT NOT NULL REFERENCES jobs(id) ON DELETE CASCADE,
+    table_index INTEGER NOT NULL,
+    page INTEGER NOT NULL,
+    content TEXT NOT NULL,
+    PRIMARY KEY (job_id, table_index)
+);
+CREATE INDEX IF NOT EXISTS jobs_expires_at ON jobs(expires_at);
+"""
+
+
+class JobStore:
+    """
+    Persistent job state, backed by SQLite.
+
+    The store is shared by the event loop and threadpool threads, so every
+    statement runs under a lock on a single connection.
+    """
+
+    def __init__(self, path):
+        """
+        Args:
+            path (str): Database file, or ":memory:"
+        """
+        if path != ":memory:":
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute("PRAGMA foreign_keys=ON")
+            self._conn.executescript(_SCHEMA)
+            columns = [row["name"] for row in self._conn.execute("PRAGMA table_info(jobs)")]
+            if "owner" not in columns:
+                # Databases created before jobs had owners
+                self._conn.execute("ALTER TABLE jobs ADD COLUMN owner TEXT")
+
+    def create(self, job_id, parser, filename, start_page, max_pages, owner=None):
+        """Record a new job in the queued state, run by the manager ``owner``."""
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO jobs"
+                " (id, status, parser, filename, start_page, max_pages, created_at, owner)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (job_id, QUEUED, parser, filename, start_page, max_pages, time.time(), owner),
+            )
+
+    def mark_running(self, job_id):
+        """Move a queued job to the running state."""
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, started_at = ? WHERE id = ? AND status = ?",
+                (RUNNING, time.time(), job_id, QUEUED),
+            )
+
+    def add_pages(self, job_id, pages, header=None, pages_total=None, tables=()):
+        """
+        Store the results of a batch of pages and update the progress.
+
+        Args:
+            job_id (str): The job
+            pages (list): (page number, markdown) tuples
+            header (str): Document header, stored with the first batch
+            pages_total (int): Number of pages the job will extract, once known
+            tables (list): Structured tables found on the pages (see `tables`)
+        """
+        with self._lock, self._conn:
+            self._conn.execute("BEGIN")
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO job_pages (job_id, page, content) VALUES (?, ?, ?)",
+                [(job_id, number, content) for number, content in pages],
+            )
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO job_tables (job_id, table_index, page, content)"
+                " VALUES (?, ?, ?, ?)",
+                [(job_id, table["index"], table["page"], json.dumps(table)) for table in tables],
+            )
+            self._conn.execute(
+                "UPDATE jobs SET pages_done = pages_done + ?,"
+                " header = COALESCE(?, header), pages_total = COALESCE(?, pages_total)"
+                " WHERE id = ?",
+                (len(pages), header, pages_total, job_id),
+            )
+
+    def finish(self, job_id, status, ttl, footer=None, error=None, metadata=None):
+        """
+        Move an active job to a final state and start its retention period.
+
+        Jobs that are already finished are left alone, so a job cancelled by
+        the client is not later reported as failed or succeeded.
+
+        Returns:
+            bool: True if the job was still active
+        """
+        now = time.time()
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE jobs SET status = ?, footer = ?, error = ?, metadata = ?,"
+                " finished_at = ?, expires_at = ?"
+                f" WHERE id = ? AND status IN ({', '.join('?' for _ in ACTIVE_STATUSES)})",
+                (
+                    status,
+                    footer,
+                    error,
+                    json.dumps(metadata) if metadata is not None else None,
+                    now,
+                    now + ttl,
+                    job_id,
+                    *ACTIVE_STATUSES,
+                ),
+            )
+            return cursor.rowcount > 0
+
+    def get(self, job_id, since=0, include_pages=True):
+        """
+        Get a job and the results of its pages after ``since``.
+
+        Returns:
+            dict: The job, or None if it does not exist or has expired
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT * FROM jobs WHERE id = ? AND (expires_at IS NULL OR expires_at > ?)",
+                (job_id, time.time()),
+            ).fetchone()
+            if row is None:
+                return None
+            pages = []
+            tables = {}
+            if include_pages:
+                pages = self._conn.execute(
+                    "SELECT page, content FROM job_pages WHERE job_id = ? AND page > ?"
+                    " ORDER BY page",
+                    (job_id, since),
+                ).fetchall()
+                for table in self._conn.execute(
+                    "SELECT table_index, page FROM job_tables WHERE job_id = ? AND page > ?"
+                    " ORDER BY table_index",
+                    (job_id, since),
+                ):
+                    tables.setdefault(table["page"], []).append(table["table_index"])
+        job = {
+            "id": row["id"],
+            "status": row["status"],
+            "parser": row["parser"],
+            "filename": row["filename"],
+            "start_page": row["start_page"],
+            "max_pages": row["max_pages"],
+            "progress": {
+                "pages_done": row["pages_done"],
+                "pages_total": row["pages_total"],
+            },
+            "created_at": row["created_at"],
+            "started_at": row["started_at"],
+            "finished_at": row["finished_at"],
+            "expires_at": row["expires_at"],
+            "error": row["error"],
+            "metadata": json.loads(row["metadata"]) if row["metadata"] else None,
+        }
+        if include_pages:
+            job["header"] = row["header"]
+            job["pages"] = [
+                {"page": p["page"], "content": p["content"], "tables": tables.get(p["page"], [])}
+                for p in pages
+            ]
+            job["footer"] = row["footer"]
+        return job
+
+    def get_table(self, job_id, index):
+        """
+        Get a structured table found by a job.
+
+        Returns:
+            dict: The table, or None if the job or the table does not exist
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT job_tables.content FROM job_tables JOIN jobs ON jobs.id = job_tables.job_id"
+                " WHERE job_id = ? AND table_index = ?"
+                " AND (jobs.expires_at IS NULL OR jobs.expires_at > ?)",
+                (job_id, index, time.time()),
+            ).fetchone()
+        return json.loads(row["content"]) if row is not None else None
+
+    def delete(self, job_id):
+        """Delete a job and its results."""
+        with self._lock:
+            self._conn.execute("DELETE FROM jobs WHERE id = ?", (job_id,))
+
+    def purge_expired(self):
+        """
+        Delete jobs whose retention period has ended.
+
+        Returns:
+            int: Number of jobs deleted
+        """
+        with self._lock:
+            cursor = self._conn.execute(
+                "DELETE FROM jobs WHERE expires_at IS NOT NULL AND expires_at <= ?",
+                (time.time(),),
+            )
+            return cursor.rowcount
+
+    def heartbeat(self, owner):
+        """Record that the manager ``owner`` is alive."""
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO job_owners (id, heartbeat_at) VALUES (?, ?)",
+                (owner, time.time()),
+            )
+
+    def interrupt_active(self, ttl, owner):
+        """
+        Fail the jobs of ``owner`` that are still queued or running.
+
+        Used when the manager stops; the uploads of its jobs only lived in
+        the memory of its process.
+
+        Returns:
+            int: Number of jobs interrupted
+        """
+        now = time.time()
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE jobs SET status = ?, error = ?, finished_at = ?, expires_at = ?"
+                f" WHERE owner = ? AND status IN ({', '.join('?' for _ in ACTIVE_STATUSES)})",
+                (
+                    FAILED,
+                    "Interrupted by a server restart",
+                    now,
+                    now + ttl,
+                    owner,
+                    *ACTIVE_STATUSES,
+                ),
+            )
+            self._conn.execute("DELETE FROM job_owners WHERE id = ?", (owner,))
+            return cursor.rowcount
+
+    def interrupt_orphaned(self, ttl, stale_after):
+        """
+        Fail the active jobs of managers that have stopped sending heartbeats.
+
+        Args:
+            ttl (int): Seconds the failed jobs are kept
+            stale_after (float): Seconds without a heartbeat after which a
+                manager is considered gone
+
+        Returns:
+            int: Number of jobs interrupted
+        """
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute("BEGIN")
+            self._conn.execute(
+                "DELETE FROM job_owners WHERE heartbeat_at <= ?", (now - stale_after,)
+            )
+            cursor = self._conn.execute(
+                "UPDATE jobs SET status = ?, error = ?, finished_at = ?, expires_at = ?"
+                f" WHERE status IN ({', '.join('?' for _ in ACTIVE_STATUSES)})"
+                " AND (owner IS NULL OR owner NOT IN (SELECT id FROM job_owners))",
+                (FAILED, "Interrupted by a server restart", now, now + ttl, *ACTIVE_STATUSES),
+            )
+            return cursor.rowcount
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class JobManager:
+    """
+    Runs parse jobs in the background and records their progress.
+    """
+
+    def __init__(self, store, concurrency, queue_limit):
+        """
+        Args:
+            store (JobStore): Where job state and results are kept
+            concurrency (int): Number of jobs that may run at the same time
+            queue_limit (int): Number of jobs allowed to wait for a running
+                one to finish; their uploads are held until they run
+        """
+        self.store = store
+        # Identifies the jobs of this manager in a database shared by processes
+        self.owner = uuid.uuid4().hex
+        self.concurrency = max(1, concurrency)
+        self.queue_limit = max(0, queue_limit)
+        self._semaphore = asyncio.Semaphore(self.concurrency)
+        self._tasks = {}
+
+    @property
+    def queued(self):
+        """Number of submitted jobs that are waiting for a running one to finish."""
+        return max(0, len(self._tasks) - self.concurrency)
+
+    def check_capacity(self):
+        """
+        Raises:
+            JobQueueFullError: If a new job would have to wait and the queue is full
+        """
+        if len(self._tasks) >= self.concurrency + self.queue_limit:
+            raise JobQueueFullError(self.queue_limit)
+
+    async def submit(self, upload, parser_type, internal_parser_name, parser, first_page, max_pages):
+        """
+        Queue a job. The job takes ownership of the upload and closes it when done.
+
+        Args:
+            upload (ReceivedUpload): The document
+            parser_type (str): Parser type as given to the API
+            internal_parser_name (str): Internal parser name
+            parser (PDFParser): The parser
+            first_page (int): First page to extract (1-indexed)
+            max_pages (int): Maximum number of pages to extract, or None for all
+
+        Returns:
+            dict: The new job
+
+        Raises:
+            JobQueueFullError: If the queue of waiting jobs is full
+        """
+        job_id = uuid.uuid4().hex
+        try:
+            self.check_capacity()
+            await run_in_threadpool(
+                self.store.create,
+                job_id,
+                parser_type,
+                upload.filename,
+                first_page,
+                max_pages,
+                self.owner,
+            )
+        except Exception:
+            upload.close()
+            raise
+        task = asyncio.create_task(
+            self._run(job_id, upload, internal_parser_name, parser, first_page, max_pages)
+        )
+        self._tasks[job_id] = task
+        task.add_done_callback(lambda _: self._tasks.pop(job_id, None))
+        logger.info(f"Queued job {job_id}: parser={parser_type}, filename={upload.filename}")
+        return await run_in_threadpool(self.store.get, job_id, 0, False)
+
+    async def _run(self, job_id, upload, internal_parser_name, parser, first_page, max_pages):
+        try:
+            async with self._semaphore:
+                await run_in_threadpool(self.store.mark_running, job_id)
+                logger.info(f"Running job {job_id}")
+                start_time = time.perf_counter()
+                pool = get_job_pool(internal_parser_name)
+                info = {}
+                pages_done = 0
+                image_count = 0
+                async for info, pages in iter_page_batches(
+                    pool, parser, upload.source, first_page, max_pages
+                ):
+                    header = pages_total = None
+                    if pages_done == 0:
+                        header = render.markdown_header(parser.name, info)
+                        page_count = info.get("page_count")
+                        if page_count is not None:
+                            last_page = page_count
+                            if max_pages is not None:
+                                last_page = min(last_page, first_page + max_pages - 1)
+                            pages_total = max(0, last_page - first_page + 1)
+                    pages_done += len(pages)
+                    image_count += sum(page.image_count for page in pages)
+                    await run_in_threadpool(
+                        self.store.add_pages,
+                        job_id,
+                        [(page.number, render.markdown_page(page, info)) for page in pages],
+                        header,
+                        pages_total,
+                        [
+                            table
+                            for page in pages
+                            for table in page.tables
+                            if "cells" in table
+                        ],
+                    )
+
+                duration = time.perf_counter() - start_time
+                metrics.record_parse(internal_parser_name, "jobs", duration, pages_done)
+                await run_in_threadpool(
+                    self.store.finish,
+                    job_id,
+                    SUCCEEDED,
+                    config.JOB_TTL_SECONDS,
+                    footer=render.markdown_footer(info, image_count),
+                    metadata={
+                        "pages_processed": pages_done,
+                        "duration_ms": duration * 1000,
+                    },
+                )
+                logger.info(f"Job {job_id} finished: {pages_done} pages")
+        except ParserError as e:
+            metrics.record_error(internal_parser_name, e)
+            logger.warning(f"Job {job_id} failed: {e.message}")
+            await run_in_threadpool(
+                self.store.finish, job_id, FAILED, config.JOB_TTL_SECONDS, error=e.message
+            )
+        except Exception as e:
+            metrics.record_error(internal_parser_name, e)
+            logger.error(f"Job {job_id} failed: {str(e)}")
+            await run_in_threadpool(
+                self.store.finish,
+                job_id,
+                FAILED,
+                config.JOB_TTL_SECONDS,
+                error=f"Parsing failed: {str(e)}",
+            )
+        finally:
+            upload.close()
+
+    async def cancel(self, job_id):
+        """
+        Cancel an active job, or delete a finished one and its results.
+
+        A batch of pages that is already running on a worker process is
+        stopped by killing the worker (see `WorkerPool.run`); with the thread
+        backend it is allowed to finish, but its results are discarded.
+
+        Returns:
+            str: "cancelled" or "deleted", or None if the job does not exist
+        """
+        job = await run_in_threadpool(self.store.get, job_id, 0, False)
+        if job is None:
+            return None
+        if job["status"] in ACTIVE_STATUSES:
+            await run_in_threadpool(
+                self.store.finish,
+                job_id,
+                CANCELLED,
+                config.JOB_TTL_SECONDS,
+                error="Cancelled by the client",
+            )
+            task = self._tasks.get(job_id)
+            if task is not None:
+                task.cancel()
+            logger.info(f"Cancelled job {job_id}")
+            return CANCELLED
+        await run_in_threadpool(self.store.delete, job_id)
+        logger.info(f"Deleted job {job_id}")
+        return "deleted"
+
+    async def purge_periodically(self):
+        """
+        Send heartbeats, fail the jobs of stopped managers and delete expired
+        jobs, forever. Run as a background task.
+        """
+        interval = max(1, min(HEARTBEAT_SECONDS, config.JOB_TTL_SECONDS))
+        while True:
+            try:
+                await run_in_threadpool(self.store.heartbeat, self.owner)
+                interrupted = await run_in_threadpool(
+                    self.store.interrupt_orphaned, config.JOB_TTL_SECONDS, ORPHAN_SECONDS
+                )
+                if interrupted:
+                    logger.warning(f"Marked {interrupted} jobs of stopped processes as failed")
+                purged = await run_in_threadpool(self.store.purge_expired)
+                if purged:
+                    logger.info(f"Purged {purged} expired jobs")
+            except Exception as e:
+                logger.error(f"Failed to purge expired jobs: {str(e)}")
+            await asyncio.sleep(interval)
+
+    def shutdown(self):
+        """Cancel every running job and close the store."""
+        for task in list(self._tasks.values()):
+            task.cancel()
+        self.store.interrupt_active(config.JOB_TTL_SECONDS, self.owner)
+        self.store.close()
+
+
+_manager = None
+_manager_lock = threading.Lock()
+
+
+def get_job_manager():
+    """
+    Get the job manager of this process, creating it on first use.
+
+    Jobs left active by stopped processes are marked as failed by
+    `JobManager.purge_periodically`, which the application runs from startup.
+    """
+    global _manager
+    with _manager_lock:
+        if _manager is None:
+            store = JobStore(config.JOBS_DB)
+            _manager = JobManager(store, config.JOB_CONCURRENCY, config.JOB_QUEUE_LIMIT)
+            store.heartbeat(_manager.owner)
+        return _manager
+
+
+def shutdown_jobs():
+    """Cancel running jobs and release the job store."""
+    global _manager
+    with _manager_lock:
+        if _manager is not None:
+            _manager.shutdown()
+            _manager = None
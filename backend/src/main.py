@@ -1,20 +1,78 @@
-from fastapi import FastAPI, File, UploadFile, Form, HTTPException
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, File, UploadFile, Form, HTTPException, Query, Request
+from fastapi.responses import FileResponse, JSONResponse, PlainTextResponse, Response, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.concurrency import run_in_threadpool
 from loguru import logger
+from starlette.background import BackgroundTask
+from starlette.requests import ClientDisconnect
+import asyncio
+import json
 import sys
-import tempfile
 import os
 import shutil
+import tempfile
 import time
 
-from src.parsers import get_parser
+from src.cache import get_cache, make_cache_key
+from src import admission, analysis, batch, config, metrics
+from src.admission import AdmissionRejectedError, CostBudgetExceededError, get_admission_controller
+from src.documents import (
+    DocumentTooLargeError,
+    get_document_store,
+    parse_document_pages,
+    shutdown_documents,
+)
+from src.jobs import JobQueueFullError, get_job_manager, shutdown_jobs
+from src.parsers import get_available_parsers, get_parser, registry, render, tables
+from src.parsers.errors import (
+    InvalidDocumentError,
+    PageRangeError,
+    ParserError,
+    ParserUnavailableError,
+)
+from src.parsers.results import ParseResult
+from src.parsers.spans import GRANULARITIES
+from src.routing import AUTO_PARSER_TYPE, AutoRouter, auto_router
+from src.sharding import parse_sharded, should_shard
+from src.workers import (
+    DeadlineExceededError,
+    PoolSaturatedError,
+    get_pool,
+    iter_page_batches,
+    kill_deadline,
+    parse_deadline,
+    parse_timeout,
+    readiness,
+    shutdown_pools,
+    warm_up_pools,
+)
+from src.uploads import ReceivedUpload, UploadTooLargeError, receive_upload
 
 # Configure logging
 logger.remove()
 logger.add(sys.stderr, level="INFO")
 logger.add("logs/app.log", rotation="500 MB", level="INFO")
 
-app = FastAPI(title="PDF Parser API")
+@asynccontextmanager
+async def lifespan(app):
+    # Import the preloaded parsers now instead of on their first request
+    for name in get_available_parsers():
+        if name.lower() in config.PRELOAD_PARSERS:
+            registry.get(name)
+    registry.log_report()
+    # Load parser models in the background; /ready reports when this is done
+    warm_up_task = asyncio.create_task(warm_up_pools())
+    purge_task = asyncio.create_task(get_job_manager().purge_periodically())
+    yield
+    warm_up_task.cancel()
+    purge_task.cancel()
+    shutdown_jobs()
+    shutdown_pools()
+    shutdown_documents()
+
+app = FastAPI(title="PDF Parser API", lifespan=lifespan)
 
 # Configure CORS
 origins = [
@@ -29,6 +87,7 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(metrics.MetricsMiddleware)
 
 @app.get("/")
 def read_root():
@@ -39,93 +98,1403 @@ def read_root():
 def health_check():
     return {"status": "ok"}
 
+@app.get("/ready")
+def readiness_check():
+    """
+    Report whether the workers have finished loading their models.
+    """
+    ready, pools = readiness()
+    return JSONResponse(
+        status_code=200 if ready else 503,
+        content={
+            "status": "ready" if ready else "starting",
+            "pools": pools,
+            "parsers": registry.report(),
+        },
+    )
+
+@app.get("/metrics")
+def metrics_endpoint():
+    """
+    Expose the parse workload metrics in the Prometheus text format.
+    """
+    return PlainTextResponse(metrics.REGISTRY.render(), media_type=metrics.CONTENT_TYPE)
+
+def _parser_mapping():
+    """Parser types accepted by the API (lower-cased names), mapped to internal parser names."""
+    return {name.lower(): name for name in get_available_parsers()}
+
+def _resolve_parser(parser_type, allow_auto=False, docling_profile=None):
+    """
+    Validate an API parser type.
+
+    Args:
+        parser_type (str): Parser type from the request
+        allow_auto (bool): Whether the endpoint supports the ``auto`` parser
+        docling_profile (str): Docling pipeline profile from the request; other
+            parsers (and the ``auto`` parser) ignore it
+
+    Returns:
+        tuple: (internal parser name, parser instance, or the `AutoRouter`)
+    """
+    if docling_profile:
+        from src.parsers.docling_parser import PROFILES
+
+        if docling_profile.lower() not in PROFILES:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Invalid Docling profile. Must be one of: {', '.join(PROFILES)}",
+            )
+
+    if parser_type.lower() == AUTO_PARSER_TYPE:
+        if not allow_auto:
+            raise HTTPException(
+                status_code=400,
+                detail="The auto parser is only supported by /api/v1/parse and /api/v1/parse/compare",
+            )
+        return auto_router.name, auto_router
+
+    parser_mapping = _parser_mapping()
+    internal_parser_name = parser_mapping.get(parser_type.lower())
+    if not internal_parser_name:
+        raise HTTPException(
+            status_code=400, 
+            detail=f"Invalid parser type. Must be one of: {', '.join([*parser_mapping, AUTO_PARSER_TYPE])}"
+        )
+
+    parser = get_parser(internal_parser_name)
+    if not parser:
+        raise HTTPException(status_code=500, detail=f"Parser {internal_parser_name} not initialized")
+    if docling_profile and hasattr(parser, "with_profile"):
+        parser = parser.with_profile(docling_profile.lower())
+    return internal_parser_name, parser
+
+def _cache_metadata(cache, hit):
+    """Summarise the cache outcome of a request for the response metadata."""
+    stats = cache.stats()
+    return {"hit": hit, "hits": stats["hits"], "misses": stats["misses"]}
+
+async def _cache_lookup(internal_parser_name, parser, digest, start_page, max_pages):
+    """
+    Look up a previous result for the same document, parser and page range.
+
+    Returns:
+        tuple: (cache or None if disabled, cache key, cached entry or None)
+    """
+    cache = get_cache()
+    if cache is None:
+        return None, None, None
+    cache_key = make_cache_key(
+        digest, internal_parser_name, start_page, max_pages, parser.version
+    )
+    cached = await run_in_threadpool(cache.get, cache_key)
+    if cached is not None:
+        logger.info(f"Cache hit for {internal_parser_name} ({cache_key[:12]})")
+    return cache, cache_key, cached
+
+async def _run_parser(internal_parser_name, parser, source, start_page, max_pages, cache, cache_key, endpoint, profile=None, timeout=None):
+    """
+    Run a parser on its worker pool and cache the result.
+
+    Large page ranges of shardable parsers are split into shards extracted in
+    parallel (see `src.sharding`). ``profile`` is passed on to
+    ``PDFParser.parse``; profiled parses are never sharded or cached.
+
+    The parse is given the parser's deadline, or ``timeout`` seconds if
+    shorter (see `parse_deadline`). The pages extracted by the deadline are
+    returned as a partial result, which is not cached; a page still being
+    extracted after the grace period has its worker stopped.
+
+    Returns:
+        tuple: (ParseResult, duration in ms including any wait for a worker)
+
+    Raises:
+        ParserError: If the parser cannot process the document
+        PoolSaturatedError: If the parser's pool is saturated
+        DeadlineExceededError: If the parser was stopped at the deadline
+    """
+    logger.info(f"Parsing with {internal_parser_name}, start_page={start_page}, max_pages={max_pages}")
+
+    start_time = time.perf_counter()
+    deadline = parse_deadline(internal_parser_name, timeout)
+    # Run the parser on its worker pool so the event loop stays responsive
+    try:
+        if isinstance(parser, AutoRouter):
+            # The auto parser runs PyMuPDF and Docling on their own pools
+            result = await parser.parse(source, start_page, max_pages, deadline)
+        else:
+            pool = get_pool(internal_parser_name)
+            if not profile and should_shard(parser, pool, max_pages):
+                result = await parse_sharded(pool, parser, source, start_page, max_pages, deadline)
+            else:
+                result = await pool.run(
+                    parser.parse, source, start_page, max_pages, profile, deadline,
+                    deadline=kill_deadline(deadline),
+                )
+    except Exception as e:
+        metrics.record_error(internal_parser_name, e)
+        raise
+    duration = time.perf_counter() - start_time
+    duration_ms = duration * 1000
+    metrics.record_parse(internal_parser_name, endpoint, duration, result.pages_processed)
+    if result.info.get("deadline_exceeded"):
+        logger.warning(
+            f"{internal_parser_name} reached its deadline after {result.pages_processed} pages"
+        )
+    elif cache is not None and not profile:
+        # Failures raise instead, so they are never cached and can be retried
+        await run_in_threadpool(cache.put, cache_key, result.to_dict())
+    return result, duration_ms
+
+# Output formats of the parse endpoints
+OUTPUT_FORMATS = ("markdown", "text", "json")
+
+def _check_format(output_format):
+    if output_format not in OUTPUT_FORMATS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Invalid format. Must be one of: {', '.join(OUTPUT_FORMATS)}",
+        )
+
+def _render(result, output_format):
+    """
+    Render a parse result in the requested output format.
+
+    Returns:
+        str | dict: Markdown or plain text, or the structured result for "json"
+    """
+    if output_format == "json":
+        return result.to_dict()
+    if output_format == "text":
+        return render.text_document(result)
+    return render.markdown_document(result)
+
+def _result_metadata(result):
+    """Summarise a parse result for the response metadata."""
+    metadata = {
+        "pages_processed": result.pages_processed,
+        "page_count": result.page_count,
+        "parse_ms": result.duration_ms,
+        # Whether the deadline stopped the parse before the end of the page range
+        "partial": bool(result.info.get("deadline_exceeded")),
+    }
+    if "routing" in result.info:
+        # How the auto parser routed each page
+        metadata["routing"] = result.info["routing"]
+    if "docling_profile" in result.info:
+        metadata["docling_profile"] = result.info["docling_profile"]
+    return metadata
+
+# Values of the `profile` form field, mapped to the `profile` argument of `PDFParser.parse`
+PROFILE_MODES = {"false": None, "true": "timings", "cprofile": "cprofile"}
+
+def _check_profile(profile):
+    """
+    Validate the `profile` form field.
+
+    Returns:
+        str: The profiling mode, or None if profiling was not requested
+    """
+    if profile.lower() not in PROFILE_MODES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Invalid profile. Must be one of: {', '.join(PROFILE_MODES)}",
+        )
+    mode = PROFILE_MODES[profile.lower()]
+    if mode and not config.PROFILING_ENABLED:
+        raise HTTPException(
+            status_code=403,
+            detail="Profiling is disabled on this server (set PPP_PROFILING_ENABLED)",
+        )
+    return mode
+
+def _profile_metadata(result, upload_ms, duration_ms, render_ms, total_ms):
+    """
+    Combine the timings taken by the API with those of the parser.
+
+    Args:
+        result (ParseResult): A result parsed with profiling on
+        upload_ms (float): Time to receive and hash the upload
+        duration_ms (float): Time of the pool call; whatever the parser did not
+            spend went to waiting for a worker and transferring data
+        render_ms (float): Time to render the result in the requested format
+        total_ms (float): Time of the whole request
+
+    Returns:
+        dict: ``stages_ms`` in the order they ran, ``total_ms``, per-page
+            timings in ``pages`` and, if requested, the ``cprofile`` report
+    """
+    stages_ms = {
+        "upload": upload_ms,
+        "queue_and_transfer": max(duration_ms - result.duration_ms, 0.0),
+        **result.profile["stages"],
+        "render": render_ms,
+    }
+    profile = {
+        "stages_ms": stages_ms,
+        "total_ms": total_ms,
+        "pages": result.profile["pages"],
+    }
+    if "cprofile" in result.profile:
+        profile["cprofile"] = result.profile["cprofile"]
+    return profile
+
+def _parser_error_status(error):
+    """Map a `ParserError` to the HTTP status reported to the client."""
+    if isinstance(error, InvalidDocumentError):
+        return 422
+    if isinstance(error, PageRangeError):
+        return 400
+    if isinstance(error, ParserUnavailableError):
+        return 503
+    return 500
+
+def _admission_error(error):
+    """Turn an admission control rejection into an HTTP error."""
+    if isinstance(error, CostBudgetExceededError):
+        return HTTPException(
+            status_code=413,
+            detail=f"{str(error)}. Request fewer pages or submit a job to /api/v1/jobs",
+        )
+    return HTTPException(
+        status_code=503, detail=str(error), headers={"Retry-After": str(error.retry_after)}
+    )
+
+async def _admit(internal_parser_name, max_pages, size, source=None):
+    """
+    Estimate the cost of parsing a document and wait until it is admitted.
+
+    Args:
+        internal_parser_name (str): Internal parser name
+        max_pages (int): Pages requested
+        size (int): Size of the document in bytes
+        source (str | bytes): The document, to count its pages if needed
+
+    Returns:
+        Ticket: The admitted request; release it once the parse has finished
+
+    Raises:
+        HTTPException: 413 if the request costs more than the per-request
+            budget, 503 if it cannot be admitted soon enough
+    """
+    costs = await admission.estimate_request_costs(
+        [internal_parser_name], max_pages, size, source
+    )
+    try:
+        return await get_admission_controller().admit(costs[internal_parser_name])
+    except (CostBudgetExceededError, AdmissionRejectedError) as e:
+        logger.warning(f"Rejecting request, {str(e)}")
+        raise _admission_error(e)
+
+async def _receive(file, endpoint):
+    """
+    Receive an upload, mapping an oversized upload to 413.
+
+    Returns:
+        ReceivedUpload: The upload; the caller must close it
+    """
+    try:
+        upload = await receive_upload(file)
+    except UploadTooLargeError as e:
+        logger.warning(f"Rejecting upload {file.filename}: {str(e)}")
+        raise HTTPException(status_code=413, detail=str(e))
+    metrics.UPLOAD_BYTES.observe(upload.size, endpoint=endpoint)
+    logger.info(
+        f"Received {file.filename}: {upload.size} bytes"
+        + (f", spilled to {upload.path}" if upload.path else " in memory")
+    )
+    return upload
+
+def _check_timeout(timeout):
+    if timeout < 0:
+        raise HTTPException(status_code=400, detail="timeout must not be negative")
+
+# Seconds between checks that the client of a running parse is still connected
+DISCONNECT_POLL_SECONDS = 0.5
+
+async def _cancel_on_disconnect(request, awaitable):
+    """
+    Await ``awaitable``, cancelling it if the client disconnects meanwhile.
+
+    Cancelling a pool job stops it (see `WorkerPool.run`), so parses for a
+    client that has gone away do not run to completion.
+
+    Raises:
+        ClientDisconnect: If the client disconnected
+    """
+    task = asyncio.ensure_future(awaitable)
+    try:
+        while True:
+            done, _ = await asyncio.wait({task}, timeout=DISCONNECT_POLL_SECONDS)
+            if done:
+                return task.result()
+            if await request.is_disconnected():
+                logger.info(f"Client of {request.url.path} disconnected, cancelling its parse")
+                raise ClientDisconnect()
+    finally:
+        if not task.done():
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+
+async def _stop_tasks(tasks):
+    """Cancel ``tasks`` and wait until they have stopped."""
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+async def _stream_until_disconnect(request, records):
+    """Relay the records of a streaming response, stopping if the client disconnects."""
+    try:
+        while True:
+            try:
+                record = await _cancel_on_disconnect(request, anext(records))
+            except (StopAsyncIteration, ClientDisconnect):
+                return
+            yield record
+    finally:
+        await records.aclose()
+
+class _CleanupStreamingResponse(StreamingResponse):
+    """
+    A streaming response that awaits ``cleanup()`` once it is over.
+
+    The body of a streaming response may never be iterated, e.g. if the client
+    resets the connection before the response starts, and an interrupted body
+    runs its ``finally`` while still being cancelled. Resources held by a
+    stream (uploads, admission tickets, running parses) are therefore released
+    here rather than by the body.
+    """
+
+    def __init__(self, content, cleanup, **kwargs):
+        super().__init__(content, **kwargs)
+        self.cleanup = cleanup
+
+    async def __call__(self, scope, receive, send):
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            try:
+                await self.body_iterator.aclose()
+            finally:
+                await self.cleanup()
+
+def _stream_ndjson(request, records, cleanup):
+    """
+    Stream NDJSON ``records``, stopping if the client disconnects.
+
+    Args:
+        request (Request): The request being answered
+        records (AsyncGenerator): Lines of the response
+        cleanup (callable): Coroutine function awaited once the response is
+            over, however it ended
+    """
+    return _CleanupStreamingResponse(
+        _stream_until_disconnect(request, records),
+        cleanup,
+        media_type="application/x-ndjson",
+    )
+
 @app.post("/api/v1/parse")
 async def parse_pdf(
+    request: Request,
     file: UploadFile = File(...),
     parser_type: str = Form(...),
     start_page: int = Form(0),
     max_pages: int = Form(10),
+    format: str = Form("markdown"),
+    profile: str = Form("false"),
+    docling_profile: str = Form(""),
+    timeout: float = Form(0),
 ):
     """
     Parse a PDF file and return the extracted content.
+
+    ``format`` selects the content returned: ``markdown`` (the default), ``text``
+    (the plain text of each page, separated by form feeds) or ``json`` (the
+    structured result with per-page text, tables and counts).
+
+    ``profile=true`` adds a stage-by-stage timing breakdown and per-page
+    timings to the metadata, and ``profile=cprofile`` also a cProfile report
+    of the parser. Profiled requests bypass the cache. Profiling must be
+    enabled with ``PPP_PROFILING_ENABLED``.
+
+    ``timeout`` (seconds) shortens the parser's deadline. Pages extracted by
+    the deadline are returned with ``metadata.partial`` set; a parse stopped
+    at the deadline without a result fails with 504. The parse is cancelled
+    if the client disconnects.
     """
     logger.info(f"Received parse request: parser={parser_type}, filename={file.filename}")
 
-    # Validate parser type and map to internal name
-    parser_mapping = {
-        "docling": "Docling",
-        "pdfminer": "PDFMiner",
-        "pymupdf": "PyMuPDF",
-        "pypdf2": "PyPDF2",
+    internal_parser_name, parser = _resolve_parser(
+        parser_type, allow_auto=True, docling_profile=docling_profile
+    )
+    _check_format(format)
+    _check_timeout(timeout)
+    profile_mode = _check_profile(profile)
+    if profile_mode and isinstance(parser, AutoRouter):
+        raise HTTPException(status_code=400, detail="The auto parser cannot be profiled")
+
+    request_start = time.perf_counter()
+    upload = await _receive(file, "parse")
+    upload_ms = (time.perf_counter() - request_start) * 1000
+    try:
+        # API uses 0-based index, Parser uses 1-based index
+        parser_start_page = start_page + 1
+
+        # Serve repeated requests for the same document and options from the cache
+        start_time = time.perf_counter()
+        if profile_mode:
+            cache, cache_key, cached = None, None, None
+        else:
+            cache, cache_key, cached = await _cache_lookup(
+                internal_parser_name,
+                parser,
+                upload.digest,
+                parser_start_page,
+                max_pages,
+            )
+        if cached is not None:
+            result = ParseResult.from_dict(cached)
+            duration_ms = (time.perf_counter() - start_time) * 1000
+        else:
+            ticket = await _admit(internal_parser_name, max_pages, upload.size, upload.source)
+            try:
+                result, duration_ms = await _cancel_on_disconnect(
+                    request,
+                    _run_parser(
+                        internal_parser_name,
+                        parser,
+                        upload.source,
+                        parser_start_page,
+                        max_pages,
+                        cache,
+                        cache_key,
+                        "parse",
+                        profile_mode,
+                        timeout,
+                    ),
+                )
+            except ClientDisconnect:
+                raise HTTPException(status_code=499, detail="Client closed the request")
+            except DeadlineExceededError as e:
+                logger.warning(f"Stopped parse, {str(e)}")
+                raise HTTPException(status_code=504, detail=str(e))
+            except PoolSaturatedError as e:
+                logger.warning(f"Rejecting request, {str(e)}")
+                raise HTTPException(
+                    status_code=503,
+                    detail=f"Parser {internal_parser_name} is busy, retry later",
+                    headers={"Retry-After": str(e.retry_after)},
+                )
+            except ParserError as e:
+                logger.warning(f"Parser error: {e.message}")
+                raise HTTPException(status_code=_parser_error_status(e), detail=e.message)
+            except Exception as e:
+                logger.error(f"Error during parsing: {str(e)}")
+                raise HTTPException(status_code=500, detail=f"Parsing failed: {str(e)}")
+            finally:
+                ticket.release()
+
+        metadata = {
+            "parser": parser_type,
+            "filename": file.filename,
+            "format": format,
+            "duration_ms": duration_ms,
+            **_result_metadata(result),
+        }
+        if cache is not None:
+            metadata["cache"] = _cache_metadata(cache, hit=cached is not None)
+        if cached is None:
+            metadata["admission"] = ticket.to_dict()
+
+        render_start = time.perf_counter()
+        content = _render(result, format)
+        if profile_mode:
+            render_ms = (time.perf_counter() - render_start) * 1000
+            metadata["profile"] = _profile_metadata(
+                result,
+                upload_ms,
+                duration_ms,
+                render_ms,
+                (time.perf_counter() - request_start) * 1000,
+            )
+
+        return {
+            "status": "success",
+            "metadata": metadata,
+            "content": content,
+        }
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error handling file upload: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"File processing failed: {str(e)}")
+    finally:
+        upload.close()
+
+@app.post("/api/v1/parse/compare")
+async def compare_parsers(
+    request: Request,
+    file: UploadFile = File(...),
+    parser_types: list[str] = Form(...),
+    start_page: int = Form(0),
+    max_pages: int = Form(10),
+    format: str = Form("markdown"),
+    docling_profile: str = Form(""),
+    timeout: float = Form(0),
+):
+    """
+    Parse one uploaded PDF with several parsers concurrently.
+
+    The response is streamed as NDJSON: one JSON object per parser, written as
+    soon as that parser finishes, so fast parsers are not held back by slow ones.
+    ``timeout`` applies to each parser, as for ``/api/v1/parse``.
+    """
+    # Accept both repeated form fields and a single comma-separated value
+    requested = [
+        name.strip().lower()
+        for value in parser_types
+        for name in value.split(",")
+        if name.strip()
+    ]
+    requested = list(dict.fromkeys(requested))
+    if not requested:
+        raise HTTPException(status_code=400, detail="At least one parser type is required")
+    parsers = {
+        parser_type: _resolve_parser(parser_type, allow_auto=True, docling_profile=docling_profile)
+        for parser_type in requested
     }
-    
-    internal_parser_name = parser_mapping.get(parser_type.lower())
-    if not internal_parser_name:
+    _check_format(format)
+    _check_timeout(timeout)
+
+    logger.info(f"Received compare request: parsers={requested}, filename={file.filename}")
+
+    # API uses 0-based index, Parser uses 1-based index
+    parser_start_page = start_page + 1
+
+    # The upload is shared by all parsers and released once the stream is done
+    upload = await _receive(file, "compare")
+    # The per-request budget applies to all parsers together, the global one to each
+    costs = await admission.estimate_request_costs(
+        [internal_parser_name for internal_parser_name, _ in parsers.values()],
+        max_pages,
+        upload.size,
+        upload.source,
+    )
+    try:
+        get_admission_controller().check(sum(costs.values()))
+    except CostBudgetExceededError as e:
+        upload.close()
+        logger.warning(f"Rejecting compare request, {str(e)}")
+        raise _admission_error(e)
+
+    async def run_one(parser_type):
+        internal_parser_name, parser = parsers[parser_type]
+        start_time = time.perf_counter()
+        record = {"parser": parser_type, "status": "success"}
+        metadata = {
+            "parser": parser_type,
+            "filename": file.filename,
+            "format": format,
+        }
+        try:
+            cache, cache_key, cached = await _cache_lookup(
+                internal_parser_name, parser, upload.digest, parser_start_page, max_pages
+            )
+            if cached is not None:
+                result = ParseResult.from_dict(cached)
+                metadata["duration_ms"] = (time.perf_counter() - start_time) * 1000
+            else:
+                ticket = await get_admission_controller().admit(
+                    costs[internal_parser_name], check_request_budget=False
+                )
+                try:
+                    result, metadata["duration_ms"] = await _run_parser(
+                        internal_parser_name,
+                        parser,
+                        upload.source,
+                        parser_start_page,
+                        max_pages,
+                        cache,
+                        cache_key,
+                        "compare",
+                        timeout=timeout,
+                    )
+                finally:
+                    ticket.release()
+            metadata.update(_result_metadata(result))
+            if cache is not None:
+                metadata["cache"] = _cache_metadata(cache, hit=cached is not None)
+            record["metadata"] = metadata
+            record["content"] = _render(result, format)
+        except PoolSaturatedError as e:
+            logger.warning(f"Rejecting {parser_type} in compare request, {str(e)}")
+            metadata["duration_ms"] = (time.perf_counter() - start_time) * 1000
+            record.update(
+                status="error",
+                metadata=metadata,
+                error=f"Parser {internal_parser_name} is busy, retry later",
+                retry_after=e.retry_after,
+            )
+        except AdmissionRejectedError as e:
+            logger.warning(f"Rejecting {parser_type} in compare request, {str(e)}")
+            metadata["duration_ms"] = (time.perf_counter() - start_time) * 1000
+            record.update(
+                status="error", metadata=metadata, error=str(e), retry_after=e.retry_after
+            )
+        except DeadlineExceededError as e:
+            logger.warning(f"Stopped {parser_type} in compare request, {str(e)}")
+            metadata["duration_ms"] = (time.perf_counter() - start_time) * 1000
+            record.update(status="error", metadata=metadata, error=str(e))
+        except ParserError as e:
+            logger.warning(f"Parser error with {parser_type}: {e.message}")
+            metadata["duration_ms"] = (time.perf_counter() - start_time) * 1000
+            record.update(status="error", metadata=metadata, error=e.message)
+        except Exception as e:
+            logger.error(f"Error during parsing with {parser_type}: {str(e)}")
+            metadata["duration_ms"] = (time.perf_counter() - start_time) * 1000
+            record.update(status="error", metadata=metadata, error=f"Parsing failed: {str(e)}")
+        return record
+
+    tasks = []
+
+    async def stream_results():
+        tasks.extend(asyncio.create_task(run_one(parser_type)) for parser_type in requested)
+        for next_done in asyncio.as_completed(tasks):
+            record = await next_done
+            yield json.dumps(record) + "\n"
+
+    async def release():
+        # The parses may be reading the upload until they have stopped
+        await _stop_tasks(tasks)
+        upload.close()
+
+    return _stream_ndjson(request, stream_results(), release)
+
+@app.post("/api/v1/parse/batch")
+async def parse_pdf_batch(
+    request: Request,
+    files: list[UploadFile] = File(...),
+    parser_type: str = Form(...),
+    start_page: int = Form(0),
+    max_pages: int = Form(10),
+    format: str = Form("markdown"),
+    docling_profile: str = Form(""),
+    timeout: float = Form(0),
+):
+    """
+    Parse many PDF files, uploaded as separate files or in zip archives, with one parser.
+
+    The response is streamed as NDJSON: one record per document, in the order
+    they finish, with its ``index`` in the batch. A document that cannot be
+    parsed gets an error record without failing the others. Small documents
+    are parsed several to a worker job (see `src.batch`). ``timeout``
+    applies to each document, as for ``/api/v1/parse``.
+    """
+    logger.info(f"Received batch request: parser={parser_type}, files={len(files)}")
+
+    internal_parser_name, parser = _resolve_parser(parser_type, docling_profile=docling_profile)
+    _check_format(format)
+    _check_timeout(timeout)
+
+    try:
+        documents = await batch.receive_documents(files)
+    except batch.BatchTooLargeError as e:
+        logger.warning(f"Rejecting batch request: {str(e)}")
+        raise HTTPException(status_code=413, detail=str(e))
+    for _, document in documents:
+        if isinstance(document, ReceivedUpload):
+            metrics.UPLOAD_BYTES.observe(document.size, endpoint="batch")
+
+    # API uses 0-based index, Parser uses 1-based index
+    parser_start_page = start_page + 1
+    pool = get_pool(internal_parser_name)
+
+    def make_record(index, name, outcome, duration_ms, cache=None, hit=False):
+        record = {"index": index, "filename": name}
+        if isinstance(outcome, ParseResult):
+            metadata = {
+                "parser": parser_type,
+                "format": format,
+                "duration_ms": duration_ms,
+                **_result_metadata(outcome),
+            }
+            if cache is not None:
+                metadata["cache"] = _cache_metadata(cache, hit=hit)
+            record.update(status="success", metadata=metadata, content=_render(outcome, format))
+        elif isinstance(outcome, PoolSaturatedError):
+            record.update(
+                status="error",
+                error=f"Parser {internal_parser_name} is busy, retry later",
+                retry_after=outcome.retry_after,
+            )
+        elif isinstance(outcome, AdmissionRejectedError):
+            record.update(status="error", error=str(outcome), retry_after=outcome.retry_after)
+        elif isinstance(outcome, DeadlineExceededError):
+            record.update(status="error", error=str(outcome), status_code=504)
+        elif isinstance(outcome, ParserError):
+            record.update(
+                status="error", error=outcome.message, status_code=_parser_error_status(outcome)
+            )
+        elif isinstance(outcome, UploadTooLargeError):
+            record.update(status="error", error=str(outcome), status_code=413)
+        else:
+            record.update(status="error", error=f"Cannot read file: {str(outcome)}", status_code=400)
+        return record
+
+    async def parse_chunk(chunk, semaphore):
+        # Chunks wait here rather than in the pool queue, which other requests share
+        async with semaphore:
+            start_time = time.perf_counter()
+            # Chunks are held to the global cost budget, like separate requests
+            cost_ms = sum(
+                admission.request_cost_ms(internal_parser_name, max_pages, document.size)
+                for _, _, document, _ in chunk
+            )
+            try:
+                ticket = await get_admission_controller().admit(
+                    cost_ms, check_request_budget=False
+                )
+            except AdmissionRejectedError as e:
+                logger.warning(f"Rejecting chunk of batch request, {str(e)}")
+                return [make_record(index, name, e, 0.0) for index, name, _, _ in chunk]
+            try:
+                outcomes = await batch.run_chunk(
+                    pool,
+                    parser,
+                    [document for _, _, document, _ in chunk],
+                    parser_start_page,
+                    max_pages,
+                    parse_timeout(internal_parser_name, timeout),
+                )
+            except PoolSaturatedError as e:
+                logger.warning(f"Rejecting chunk of batch request, {str(e)}")
+                metrics.record_error(internal_parser_name, e)
+                return [make_record(index, name, e, 0.0) for index, name, _, _ in chunk]
+            except DeadlineExceededError as e:
+                logger.warning(f"Stopped chunk of batch request, {str(e)}")
+                metrics.record_error(internal_parser_name, e)
+                duration_ms = (time.perf_counter() - start_time) * 1000
+                return [make_record(index, name, e, duration_ms) for index, name, _, _ in chunk]
+            finally:
+                ticket.release()
+            logger.info(
+                f"Parsed {len(chunk)} documents in {(time.perf_counter() - start_time) * 1000:.1f}ms"
+            )
+        records = []
+        for (index, name, _, cache_key), (outcome, duration_ms) in zip(chunk, outcomes):
+            cache = get_cache() if cache_key is not None else None
+            if isinstance(outcome, ParseResult):
+                metrics.record_parse(
+                    internal_parser_name, "batch", duration_ms / 1000, outcome.pages_processed
+                )
+                if cache is not None and not outcome.info.get("deadline_exceeded"):
+                    await run_in_threadpool(cache.put, cache_key, outcome.to_dict())
+            else:
+                metrics.record_error(internal_parser_name, outcome)
+            records.append(make_record(index, name, outcome, duration_ms, cache))
+        return records
+
+    tasks = []
+
+    async def stream_results():
+        pending = []
+        for index, (name, document) in enumerate(documents):
+            if not isinstance(document, ReceivedUpload):
+                yield json.dumps(make_record(index, name, document, 0.0)) + "\n"
+                continue
+            start_time = time.perf_counter()
+            cache, cache_key, cached = await _cache_lookup(
+                internal_parser_name, parser, document.digest, parser_start_page, max_pages
+            )
+            if cached is not None:
+                duration_ms = (time.perf_counter() - start_time) * 1000
+                record = make_record(
+                    index, name, ParseResult.from_dict(cached), duration_ms, cache, hit=True
+                )
+                yield json.dumps(record) + "\n"
+                continue
+            pending.append((index, name, document, cache_key))
+
+        max_files, max_bytes = batch.chunk_limits(pool, len(pending))
+        chunks = batch.plan_chunks(
+            pending,
+            max_files,
+            max_bytes,
+            size=lambda item: item[2].size,
+        )
+        semaphore = asyncio.Semaphore(pool.size)
+        tasks.extend(asyncio.create_task(parse_chunk(chunk, semaphore)) for chunk in chunks)
+        for next_done in asyncio.as_completed(tasks):
+            for record in await next_done:
+                yield json.dumps(record) + "\n"
+
+    async def release():
+        await _stop_tasks(tasks)
+        batch.close_documents(documents)
+
+    return _stream_ndjson(request, stream_results(), release)
+
+@app.post("/api/v1/parse/stream")
+async def parse_pdf_stream(
+    request: Request,
+    file: UploadFile = File(...),
+    parser_type: str = Form(...),
+    start_page: int = Form(0),
+    max_pages: int = Form(10),
+    docling_profile: str = Form(""),
+    timeout: float = Form(0),
+):
+    """
+    Parse a PDF file and stream the markdown page by page.
+
+    The response is NDJSON. A ``start`` record carries the document header, each
+    ``page`` record the markdown of one page as soon as it has been extracted,
+    and a final ``end`` (or ``error``) record the footer and timings. If the
+    deadline (see ``/api/v1/parse``) stops the parse, the ``end`` record has
+    ``metadata.partial`` set.
+    """
+    logger.info(f"Received stream request: parser={parser_type}, filename={file.filename}")
+
+    internal_parser_name, parser = _resolve_parser(parser_type, docling_profile=docling_profile)
+    _check_timeout(timeout)
+
+    upload = await _receive(file, "stream")
+    try:
+        ticket = await _admit(internal_parser_name, max_pages, upload.size, upload.source)
+    except HTTPException:
+        upload.close()
+        raise
+
+    # API uses 0-based index, Parser uses 1-based index
+    first_page = start_page + 1
+
+    async def stream_pages():
+        start_time = time.perf_counter()
+        pool = get_pool(internal_parser_name)
+        pages_processed = 0
+        image_count = 0
+        info = {}
+        header_sent = False
+        try:
+            async for info, pages in iter_page_batches(
+                pool,
+                parser,
+                upload.source,
+                first_page,
+                max_pages,
+                parse_deadline(internal_parser_name, timeout),
+            ):
+                if not header_sent:
+                    header_sent = True
+                    yield json.dumps({
+                        "event": "start",
+                        "parser": parser_type,
+                        "content": render.markdown_header(parser.name, info),
+                    }) + "\n"
+
+                for page in pages:
+                    pages_processed += 1
+                    image_count += page.image_count
+                    yield json.dumps({
+                        "event": "page",
+                        "page": page.number,
+                        "content": render.markdown_page(page, info),
+                    }) + "\n"
+
+            duration = time.perf_counter() - start_time
+            metrics.record_parse(internal_parser_name, "stream", duration, pages_processed)
+            yield json.dumps({
+                "event": "end",
+                "content": render.markdown_footer(info, image_count),
+                "metadata": {
+                    "parser": parser_type,
+                    "pages_processed": pages_processed,
+                    "partial": bool(info.get("deadline_exceeded")),
+                    "filename": file.filename,
+                    "duration_ms": duration * 1000,
+                },
+            }) + "\n"
+        except PoolSaturatedError as e:
+            metrics.record_error(internal_parser_name, e)
+            logger.warning(f"Rejecting stream request, {str(e)}")
+            yield json.dumps({
+                "event": "error",
+                "error": f"Parser {internal_parser_name} is busy, retry later",
+                "retry_after": e.retry_after,
+            }) + "\n"
+        except DeadlineExceededError as e:
+            metrics.record_error(internal_parser_name, e)
+            logger.warning(f"Stopped streaming parse, {str(e)}")
+            yield json.dumps({"event": "error", "error": str(e)}) + "\n"
+        except ParserError as e:
+            metrics.record_error(internal_parser_name, e)
+            logger.warning(f"Parser error while streaming: {e.message}")
+            yield json.dumps({
+                "event": "error",
+                "error": e.message,
+                "content": render.markdown_error(e),
+            }) + "\n"
+        except Exception as e:
+            metrics.record_error(internal_parser_name, e)
+            logger.error(f"Error during streaming parse: {str(e)}")
+            yield json.dumps({"event": "error", "error": f"Parsing failed: {str(e)}"}) + "\n"
+
+    async def release():
+        ticket.release()
+        upload.close()
+
+    return _stream_ndjson(request, stream_pages(), release)
+
+@app.post("/api/v1/parse/spans")
+async def parse_pdf_spans(
+    request: Request,
+    file: UploadFile = File(...),
+    start_page: int = Form(0),
+    max_pages: int = Form(10),
+    granularity: str = Form("spans"),
+    compress: bool = Form(False),
+    timeout: float = Form(0),
+):
+    """
+    Extract text spans (or words) with their bounding boxes as a NumPy ``.npz`` archive.
+
+    The archive holds one array per attribute (page, bbox, font, size, ...) rather
+    than one object per span; see `src.parsers.spans` for its layout. Spans are
+    extracted with PyMuPDF.
+    """
+    logger.info(f"Received spans request: granularity={granularity}, filename={file.filename}")
+
+    if granularity not in GRANULARITIES:
         raise HTTPException(
-            status_code=400, 
-            detail=f"Invalid parser type. Must be one of: {', '.join(parser_mapping.keys())}"
+            status_code=400,
+            detail=f"Invalid granularity. Must be one of: {', '.join(GRANULARITIES)}",
         )
+    _check_timeout(timeout)
+    internal_parser_name, parser = _resolve_parser("pymupdf")
 
-    parser = get_parser(internal_parser_name)
-    if not parser:
-        raise HTTPException(status_code=500, detail=f"Parser {internal_parser_name} not initialized")
+    upload = await _receive(file, "spans")
+    try:
+        start_time = time.perf_counter()
+        try:
+            info, columns = await _cancel_on_disconnect(
+                request,
+                get_pool(internal_parser_name).run(
+                    parser.extract_spans,
+                    upload.source,
+                    start_page + 1,
+                    max_pages,
+                    granularity,
+                    deadline=kill_deadline(parse_deadline(internal_parser_name, timeout)),
+                ),
+            )
+        except ClientDisconnect:
+            raise HTTPException(status_code=499, detail="Client closed the request")
+        except Exception as e:
+            metrics.record_error(internal_parser_name, e)
+            raise
+        duration = time.perf_counter() - start_time
+        metrics.record_parse(internal_parser_name, "spans", duration, len(columns.page_number))
 
-    # Create a temporary file to save the uploaded PDF
-    with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as tmp_file:
-        tmp_file_path = tmp_file.name
         try:
-            # Write uploaded file content to temp file
-            content = await file.read()
-            tmp_file.write(content)
-            tmp_file.flush()
-            
-            logger.info(f"Saved uploaded file to {tmp_file_path}")
-            
-            # Call the parser
-            # API uses 0-based index, Parser uses 1-based index
-            parser_start_page = start_page + 1
-            
-            logger.info(f"Parsing with {internal_parser_name}, start_page={parser_start_page}, max_pages={max_pages}")
-            
+            content = await run_in_threadpool(columns.to_npz, compress)
+        except ImportError:
+            raise HTTPException(status_code=503, detail="NumPy is not installed")
+    except DeadlineExceededError as e:
+        logger.warning(f"Stopped spans request, {str(e)}")
+        raise HTTPException(status_code=504, detail=str(e))
+    except PoolSaturatedError as e:
+        logger.warning(f"Rejecting spans request, {str(e)}")
+        raise HTTPException(
+            status_code=503,
+            detail=f"Parser {internal_parser_name} is busy, retry later",
+            headers={"Retry-After": str(e.retry_after)},
+        )
+    except ParserError as e:
+        logger.warning(f"Parser error: {e.message}")
+        raise HTTPException(status_code=_parser_error_status(e), detail=e.message)
+    finally:
+        upload.close()
+
+    filename = os.path.splitext(os.path.basename(file.filename or "document"))[0].replace('"', "")
+    return Response(
+        content=content,
+        media_type="application/octet-stream",
+        headers={
+            "Content-Disposition": f'attachment; filename="{filename}.npz"',
+            "X-Span-Count": str(len(columns)),
+            "X-Page-Count": str(info.get("page_count")),
+            "X-Duration-Ms": f"{duration * 1000:.1f}",
+        },
+    )
+
+@app.post("/api/v1/parse/images")
+async def parse_pdf_images(
+    request: Request,
+    file: UploadFile = File(...),
+    start_page: int = Form(0),
+    max_pages: int = Form(10),
+    thumbnail_size: int = Form(0),
+    timeout: float = Form(0),
+):
+    """
+    Extract the text and the images of a PDF file as a zip archive.
+
+    Each unique image is included once, however many pages it is placed on,
+    with an optional PNG thumbnail; ``manifest.json`` maps the pages to their
+    images. Images are extracted with PyMuPDF, in the same pass as the text.
+    """
+    logger.info(f"Received images request: thumbnail_size={thumbnail_size}, filename={file.filename}")
+
+    if thumbnail_size < 0:
+        raise HTTPException(status_code=400, detail="thumbnail_size cannot be negative")
+    _check_timeout(timeout)
+    internal_parser_name, parser = _resolve_parser("pymupdf")
+
+    upload = await _receive(file, "images")
+    fd, archive_path = tempfile.mkstemp(suffix=".zip")
+    os.close(fd)
+    manifest = None
+    try:
+        start_time = time.perf_counter()
+        try:
+            manifest = await _cancel_on_disconnect(
+                request,
+                get_pool(internal_parser_name).run(
+                    parser.extract_images,
+                    upload.source,
+                    start_page + 1,
+                    max_pages,
+                    archive_path,
+                    thumbnail_size,
+                    deadline=kill_deadline(parse_deadline(internal_parser_name, timeout)),
+                ),
+            )
+        except ClientDisconnect:
+            raise HTTPException(status_code=499, detail="Client closed the request")
+        except Exception as e:
+            metrics.record_error(internal_parser_name, e)
+            raise
+        duration = time.perf_counter() - start_time
+        metrics.record_parse(internal_parser_name, "images", duration, len(manifest["pages"]))
+    except DeadlineExceededError as e:
+        logger.warning(f"Stopped images request, {str(e)}")
+        raise HTTPException(status_code=504, detail=str(e))
+    except PoolSaturatedError as e:
+        logger.warning(f"Rejecting images request, {str(e)}")
+        raise HTTPException(
+            status_code=503,
+            detail=f"Parser {internal_parser_name} is busy, retry later",
+            headers={"Retry-After": str(e.retry_after)},
+        )
+    except ParserError as e:
+        logger.warning(f"Parser error: {e.message}")
+        raise HTTPException(status_code=_parser_error_status(e), detail=e.message)
+    finally:
+        upload.close()
+        if manifest is None:
+            os.remove(archive_path)
+
+    filename = os.path.splitext(os.path.basename(file.filename or "document"))[0].replace('"', "")
+    return FileResponse(
+        archive_path,
+        media_type="application/zip",
+        filename=f"{filename}.zip",
+        headers={
+            "X-Image-Count": str(manifest["image_count"]),
+            "X-Image-Placements": str(manifest["placements"]),
+            "X-Page-Count": str(manifest.get("page_count")),
+            "X-Duration-Ms": f"{duration * 1000:.1f}",
+        },
+        background=BackgroundTask(os.remove, archive_path),
+    )
+
+@app.post("/api/v1/analyze")
+async def analyze_pdf(request: Request, file: UploadFile = File(...), timeout: float = Form(0)):
+    """
+    Analyse a PDF file before parsing it.
+
+    Reports the page count, encryption, whether each page has a text layer,
+    image and table candidate counts, the route the ``auto`` parser would
+    take for each page, and the estimated worker time of parsing the whole
+    document with each parser (``estimated_cost_ms``). The analysis is a
+    single PyMuPDF pass over the text layer and is cached by file hash.
+    """
+    logger.info(f"Received analyze request: filename={file.filename}")
+
+    _check_timeout(timeout)
+    internal_parser_name, parser = _resolve_parser("pymupdf")
+
+    upload = await _receive(file, "analyze")
+    try:
+        cache = get_cache()
+        result = None
+        if cache is not None:
+            cache_key = analysis.analysis_cache_key(upload.digest, parser)
+            result = await run_in_threadpool(cache.get, cache_key)
+        hit = result is not None
+        if result is None:
             try:
-                start_time = time.perf_counter()
-                extracted_content = parser.parse(tmp_file_path, parser_start_page, max_pages)
-                end_time = time.perf_counter()
-                duration_ms = (end_time - start_time) * 1000
-                
-                # Check for error indicator in content (simple check based on return format)
-                if extracted_content.startswith("# Error"):
-                    # We might want to return 400 or 500 depending on the error,
-                    # but for now let's wrap it in the success response as the content
-                    # or explicitly raise if it's a critical failure.
-                    # The instructions say "Handle errors ... with HTTPException".
-                    # However, if the parser returns a formatted error string, maybe we return that?
-                    # Let's log it.
-                    logger.warning(f"Parser returned error content: {extracted_content[:100]}...")
-
-                return {
-                    "status": "success",
-                    "metadata": {
-                        "parser": parser_type,
-                        "pages_processed": max_pages, # This is an approximation/request, not actual
-                        "filename": file.filename,
-                        "duration_ms": duration_ms
-                    },
-                    "content": extracted_content
-                }
-                
+                result = await _cancel_on_disconnect(
+                    request,
+                    get_pool(internal_parser_name).run(
+                        parser.analyze,
+                        upload.source,
+                        deadline=kill_deadline(parse_deadline(internal_parser_name, timeout)),
+                    ),
+                )
+            except ClientDisconnect:
+                raise HTTPException(status_code=499, detail="Client closed the request")
             except Exception as e:
-                logger.error(f"Error during parsing: {str(e)}")
-                raise HTTPException(status_code=500, detail=f"Parsing failed: {str(e)}")
-                
-        except Exception as e:
-            logger.error(f"Error handling file upload: {str(e)}")
-            raise HTTPException(status_code=500, detail=f"File processing failed: {str(e)}")
-        finally:
-            # Clean up temp file
-            if os.path.exists(tmp_file_path):
-                try:
-                    os.unlink(tmp_file_path)
-                    logger.info(f"Deleted temp file {tmp_file_path}")
-                except Exception as e:
-                    logger.warning(f"Failed to delete temp file {tmp_file_path}: {str(e)}")
\ No newline at end of file
+                metrics.record_error(internal_parser_name, e)
+                raise
+            if cache is not None:
+                await run_in_threadpool(cache.put, cache_key, result)
+    except DeadlineExceededError as e:
+        logger.warning(f"Stopped analyze request, {str(e)}")
+        raise HTTPException(status_code=504, detail=str(e))
+    except PoolSaturatedError as e:
+        logger.warning(f"Rejecting analyze request, {str(e)}")
+        raise HTTPException(
+            status_code=503,
+            detail=f"Parser {internal_parser_name} is busy, retry later",
+            headers={"Retry-After": str(e.retry_after)},
+        )
+    except ParserError as e:
+        logger.warning(f"Parser error: {e.message}")
+        raise HTTPException(status_code=_parser_error_status(e), detail=e.message)
+    finally:
+        upload.close()
+
+    return {
+        "filename": file.filename,
+        "size": upload.size,
+        "sha256": upload.digest,
+        **result,
+        "estimated_cost_ms": analysis.estimate_costs(result, upload.size, get_available_parsers()),
+        "cache": _cache_metadata(cache, hit) if cache is not None else None,
+    }
+
+@app.post("/api/v1/jobs", status_code=202)
+async def submit_job(
+    file: UploadFile = File(...),
+    parser_type: str = Form(...),
+    start_page: int = Form(0),
+    max_pages: int | None = Form(None),
+    docling_profile: str = Form(""),
+):
+    """
+    Submit a PDF file to be parsed in the background.
+
+    Unlike ``/api/v1/parse`` the whole document is parsed by default. Poll
+    ``GET /api/v1/jobs/{job_id}`` for progress and results.
+    """
+    logger.info(f"Received job: parser={parser_type}, filename={file.filename}")
+
+    internal_parser_name, parser = _resolve_parser(parser_type, docling_profile=docling_profile)
+    if max_pages is not None and max_pages < 1:
+        raise HTTPException(status_code=400, detail="max_pages must be at least 1")
+
+    manager = get_job_manager()
+    try:
+        # Checked before the upload is received, and again when it is queued
+        manager.check_capacity()
+        upload = await _receive(file, "jobs")
+        # API uses 0-based index, Parser uses 1-based index
+        job = await manager.submit(
+            upload, parser_type, internal_parser_name, parser, start_page + 1, max_pages
+        )
+    except JobQueueFullError as e:
+        logger.warning(f"Rejecting job, {str(e)}")
+        raise HTTPException(status_code=503, detail=f"{str(e)}, retry later")
+    return JSONResponse(
+        status_code=202,
+        content=job,
+        headers={"Location": f"/api/v1/jobs/{job['id']}"},
+    )
+
+@app.get("/api/v1/jobs/{job_id}")
+async def get_job(job_id: str, since: int = Query(0)):
+    """
+    Report the progress of a job and the results of its pages.
+
+    Only pages after ``since`` are returned, so clients polling a running job
+    can pass the last page they have received. Concatenating the ``header``,
+    the page contents and the ``footer`` gives the same markdown as
+    ``/api/v1/parse``.
+    """
+    job = await run_in_threadpool(get_job_manager().store.get, job_id, since)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job {job_id} not found")
+    return job
+
+@app.get("/api/v1/jobs/{job_id}/tables/{index}")
+async def get_job_table(job_id: str, index: int, format: str = Query("json")):
+    """
+    Get one table found by a job.
+
+    ``format`` is ``json`` (the default: the page, bounding box and cells of
+    the table), ``markdown``, ``csv`` or ``html``. Tables are listed by index
+    with the pages of the job.
+    """
+    if format != "json" and format not in tables.FORMATS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Invalid format. Must be one of: {', '.join(['json', *tables.FORMATS])}",
+        )
+    table = await run_in_threadpool(get_job_manager().store.get_table, job_id, index)
+    if table is None:
+        raise HTTPException(status_code=404, detail=f"Table {index} of job {job_id} not found")
+    if format == "json":
+        return table
+    return Response(
+        content=tables.render_table(table, format), media_type=tables.FORMATS[format]
+    )
+
+@app.delete("/api/v1/jobs/{job_id}")
+async def cancel_job(job_id: str):
+    """
+    Cancel a queued or running job, or delete the results of a finished one.
+    """
+    outcome = await get_job_manager().cancel(job_id)
+    if outcome is None:
+        raise HTTPException(status_code=404, detail=f"Job {job_id} not found")
+    return {"id": job_id, "status": outcome}
+
+@app.post("/api/v1/documents", status_code=201)
+async def upload_document(file: UploadFile = File(...)):
+    """
+    Upload a PDF file once to read ranges of its pages with ``GET /api/v1/documents/{document_id}/pages``.
+
+    Documents are kept until they are deleted, unused for ``PPP_SESSION_TTL_SECONDS``
+    or evicted to make room for newer ones.
+    """
+    logger.info(f"Received document: filename={file.filename}")
+
+    upload = await _receive(file, "documents")
+    try:
+        document = await run_in_threadpool(get_document_store().add, upload)
+    except DocumentTooLargeError as e:
+        logger.warning(f"Rejecting document {file.filename}: {str(e)}")
+        raise HTTPException(status_code=413, detail=str(e))
+    return JSONResponse(
+        status_code=201,
+        content=document.to_dict(),
+        headers={"Location": f"/api/v1/documents/{document.id}"},
+    )
+
+@app.get("/api/v1/documents/{document_id}/pages")
+async def get_document_pages(
+    request: Request,
+    document_id: str,
+    parser: str = Query(...),
+    start: int = Query(0),
+    count: int = Query(10),
+    format: str = Query("markdown"),
+    docling_profile: str = Query(""),
+    timeout: float = Query(0),
+):
+    """
+    Extract a range of pages of an uploaded document.
+
+    Workers keep the documents they have opened, so paging through a document
+    does not open and parse the file again on every request.
+    ``metadata.handle`` says whether an open document was ``reused``.
+    ``timeout`` is as for ``/api/v1/parse``.
+    """
+    internal_parser_name, parser_instance = _resolve_parser(parser, docling_profile=docling_profile)
+    _check_format(format)
+    _check_timeout(timeout)
+    if count < 1:
+        raise HTTPException(status_code=400, detail="count must be at least 1")
+
+    with get_document_store().lease(document_id) as document:
+        if document is None:
+            raise HTTPException(status_code=404, detail=f"Document {document_id} not found")
+
+        # API uses 0-based index, Parser uses 1-based index
+        parser_start_page = start + 1
+        start_time = time.perf_counter()
+        cache, cache_key, cached = await _cache_lookup(
+            internal_parser_name, parser_instance, document.digest, parser_start_page, count
+        )
+        if cached is not None:
+            result = ParseResult.from_dict(cached)
+            handle = "cached"
+        else:
+            ticket = await _admit(internal_parser_name, count, document.size)
+            deadline = parse_deadline(internal_parser_name, timeout)
+            if parser_instance.supports_handles:
+                document.opened_by(internal_parser_name, parser_instance.name)
+            try:
+                result, reused = await _cancel_on_disconnect(
+                    request,
+                    get_pool(internal_parser_name).run(
+                        parse_document_pages,
+                        parser_instance,
+                        document.id,
+                        document.source,
+                        parser_start_page,
+                        count,
+                        deadline,
+                        deadline=kill_deadline(deadline),
+                        affinity=document.id,
+                    ),
+                )
+            except ClientDisconnect:
+                raise HTTPException(status_code=499, detail="Client closed the request")
+            except DeadlineExceededError as e:
+                metrics.record_error(internal_parser_name, e)
+                logger.warning(f"Stopped document pages request, {str(e)}")
+                raise HTTPException(status_code=504, detail=str(e))
+            except PoolSaturatedError as e:
+                metrics.record_error(internal_parser_name, e)
+                logger.warning(f"Rejecting document pages request, {str(e)}")
+                raise HTTPException(
+                    status_code=503,
+                    detail=f"Parser {internal_parser_name} is busy, retry later",
+                    headers={"Retry-After": str(e.retry_after)},
+                )
+            except ParserError as e:
+                metrics.record_error(internal_parser_name, e)
+                logger.warning(f"Parser error: {e.message}")
+                raise HTTPException(status_code=_parser_error_status(e), detail=e.message)
+            finally:
+                ticket.release()
+            handle = "reused" if reused else "opened"
+            metrics.record_parse(
+                internal_parser_name,
+                "documents",
+                time.perf_counter() - start_time,
+                result.pages_processed,
+            )
+            if cache is not None and not result.info.get("deadline_exceeded"):
+                await run_in_threadpool(cache.put, cache_key, result.to_dict())
+        duration_ms = (time.perf_counter() - start_time) * 1000
+
+    metadata = {
+        "parser": parser,
+        "document_id": document_id,
+        "filename": document.filename,
+        "format": format,
+        "duration_ms": duration_ms,
+        "handle": handle,
+        **_result_metadata(result),
+    }
+    if cache is not None:
+        metadata["cache"] = _cache_metadata(cache, hit=cached is not None)
+    return {
+        "status": "success",
+        "metadata": metadata,
+        "content": _render(result, format),
+    }
+
+@app.delete("/api/v1/documents/{document_id}")
+async def delete_document(document_id: str):
+    """
+    Delete an uploaded document.
+    """
+    if not await run_in_threadpool(get_document_store().delete, document_id):
+        raise HTTPException(status_code=404, detail=f"Document {document_id} not found")
+    return {"document_id": document_id, "status": "deleted"}
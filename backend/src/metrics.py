@@ -0,0 +1,353 @@
+"""
+Prometheus-style metrics of the parse workload.
+
+Metrics are kept in memory by the API process and rendered in the Prometheus
+text exposition format by ``GET /metrics``. Parsers run in worker processes,
+but every measurement is taken in the API process around the calls to the
+pools, so a single registry sees all of them. When the API itself is run with
+several uvicorn workers, each of them exposes its own metrics.
+"""
+
+import bisect
+import math
+import threading
+
+from loguru import logger
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _format_value(value):
+    if value == math.inf:
+        return "+Inf"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, description, labels=()):
+        self.name = name
+        self.description = description
+        self.label_names = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        if set(labels) != set(self.label_names):
+            raise ValueError(
+                f"Metric {self.name} expects labels {self.label_names}, got {tuple(labels)}"
+            )
+        return tuple(str(labels[name]) for name in self.label_names)
+
+    def render(self):
+        lines = [
+            f"# HELP {self.name} {self.description}",
+            f"# TYPE {self.name} {self.kind}",
+        ]
+        with self._lock:
+            items = sorted(self._values.items())
+            lines.extend(self._render_samples(items))
+        return lines
+
+    def _render_samples(self, items):
+        return [
+            f"{self.name}{_format_labels(self.label_names, key)} {_format_value(value)}"
+            for key, value in items
+        ]
+
+    def clear(self):
+        with self._lock:
+            self._values.clear()
+
+
+class Counter(_Metric):
+    """A value that only goes up, such as a number of errors."""
+
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+
+class Gauge(_Metric):
+    """A value that goes up and down, such as the number of requests in flight."""
+
+    kind = "gauge"
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+    def value(self, **labels):
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+
+class Histogram(_Metric):
+    """Observations counted in cumulative buckets, with their sum and count."""
+
+    kind = "histogram"
+
+    def __init__(self, name, description, buckets, labels=()):
+        super().__init__(name, description, labels)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+            state[0][bisect.bisect_left(self.buckets, value)] += 1
+            state[1] += value
+            state[2] += 1
+
+    def count(self, **labels):
+        with self._lock:
+            state = self._values.get(self._key(labels))
+            return state[2] if state else 0
+
+    def _render_samples(self, items):
+        lines = []
+        for key, (bucket_counts, total, count) in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, bucket_counts):
+                cumulative += bucket_count
+                labels = _format_labels(self.label_names, key, [("le", _format_value(float(bound)))])
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.label_names, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+class Registry:
+    """
+    A set of metrics, rendered together.
+
+    Collectors are callbacks run just before rendering, to set gauges from
+    state that is cheaper to read on demand (pool occupancy, cache size).
+    """
+
+    def __init__(self):
+        self._metrics = []
+        self._collectors = []
+
+    def counter(self, name, description, labels=()):
+        return self._register(Counter(name, description, labels))
+
+    def gauge(self, name, description, labels=()):
+        return self._register(Gauge(name, description, labels))
+
+    def histogram(self, name, description, buckets, labels=()):
+        return self._register(Histogram(name, description, buckets, labels))
+
+    def _register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def add_collector(self, collector):
+        self._collectors.append(collector)
+
+    def render(self):
+        """
+        Returns:
+            str: Every metric in the Prometheus text exposition format
+        """
+        for collector in self._collectors:
+            try:
+                collector()
+            except Exception as e:
+                logger.warning(f"Metrics collector failed: {str(e)}")
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+    def clear(self):
+        """Reset every metric (used by tests)."""
+        for metric in self._metrics:
+            metric.clear()
+
+
+REGISTRY = Registry()
+
+DURATION_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+PARSE_DURATION = REGISTRY.histogram(
+    "ppp_parse_duration_seconds",
+    "Time to parse a document, including any wait for a free worker.",
+    DURATION_BUCKETS,
+    labels=("parser", "endpoint"),
+)
+PAGES_PROCESSED = REGISTRY.histogram(
+    "ppp_parse_pages",
+    "Pages extracted per parse.",
+    (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000),
+    labels=("parser", "endpoint"),
+)
+PAGES_PER_SECOND = REGISTRY.histogram(
+    "ppp_parse_pages_per_second",
+    "Throughput of each parse, in pages per second.",
+    (0.1, 0.5, 1, 2, 5, 10, 25, 50, 100, 250, 500, 1000),
+    labels=("parser", "endpoint"),
+)
+UPLOAD_BYTES = REGISTRY.histogram(
+    "ppp_upload_bytes",
+    "Size of uploaded documents.",
+    tuple(n * 1024 * 1024 for n in (0.01, 0.1, 0.5, 1, 5, 10, 50, 100, 200)),
+    labels=("endpoint",),
+)
+PARSE_ERRORS = REGISTRY.counter(
+    "ppp_parse_errors_total",
+    "Failed parses, by parser and error type.",
+    labels=("parser", "type"),
+)
+QUEUE_WAIT = REGISTRY.histogram(
+    "ppp_queue_wait_seconds",
+    "Time jobs waited for a free worker.",
+    (0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60),
+    labels=("pool",),
+)
+POOL_REJECTIONS = REGISTRY.counter(
+    "ppp_pool_rejections_total",
+    "Jobs rejected because the pool was saturated.",
+    labels=("pool",),
+)
+POOL_WORKERS = REGISTRY.gauge(
+    "ppp_pool_workers", "Workers of each pool.", labels=("pool",)
+)
+POOL_ACTIVE = REGISTRY.gauge(
+    "ppp_pool_active_jobs", "Jobs running or waiting on each pool.", labels=("pool",)
+)
+POOL_WAITING = REGISTRY.gauge(
+    "ppp_pool_waiting_jobs", "Jobs waiting for a free worker.", labels=("pool",)
+)
+POOL_WORKER_RSS = REGISTRY.gauge(
+    "ppp_pool_worker_rss_bytes",
+    "Resident memory of each worker process, by pool and worker slot.",
+    labels=("pool", "worker"),
+)
+POOL_WORKER_JOBS = REGISTRY.gauge(
+    "ppp_pool_worker_jobs",
+    "Jobs run by each worker process since it started, by pool and worker slot.",
+    labels=("pool", "worker"),
+)
+WORKER_RECYCLES = REGISTRY.counter(
+    "ppp_pool_worker_recycles_total",
+    "Worker processes replaced by fresh ones, by pool and reason (jobs or memory).",
+    labels=("pool", "reason"),
+)
+JOBS_STOPPED = REGISTRY.counter(
+    "ppp_pool_jobs_stopped_total",
+    "Jobs stopped before finishing, by pool and reason (deadline or cancelled).",
+    labels=("pool", "reason"),
+)
+ADMISSION_COST = REGISTRY.gauge(
+    "ppp_admission_cost_ms",
+    "Estimated cost of the admitted parse requests, in worker milliseconds.",
+)
+ADMISSION_WAITING = REGISTRY.gauge(
+    "ppp_admission_waiting_requests", "Parse requests waiting to be admitted."
+)
+ADMISSION_REJECTIONS = REGISTRY.counter(
+    "ppp_admission_rejections_total",
+    "Parse requests rejected by admission control, by exceeded budget.",
+    labels=("reason",),
+)
+IN_FLIGHT = REGISTRY.gauge(
+    "ppp_requests_in_flight",
+    "HTTP requests being handled, including streaming responses.",
+    labels=("route",),
+)
+REQUESTS = REGISTRY.counter(
+    "ppp_requests_total",
+    "Handled HTTP requests.",
+    labels=("route", "method", "status"),
+)
+
+
+def record_parse(parser, endpoint, seconds, pages):
+    """Record a successful parse."""
+    PARSE_DURATION.observe(seconds, parser=parser, endpoint=endpoint)
+    PAGES_PROCESSED.observe(pages, parser=parser, endpoint=endpoint)
+    if seconds > 0:
+        PAGES_PER_SECOND.observe(pages / seconds, parser=parser, endpoint=endpoint)
+
+
+def record_error(parser, error):
+    """Record a failed parse, labelled with the type of the exception."""
+    PARSE_ERRORS.inc(parser=parser, type=type(error).__name__)
+
+
+def _route_label(scope):
+    """The path template of the matched route, to keep the label cardinality low."""
+    from starlette.routing import Match
+
+    app = scope.get("app")
+    for route in getattr(getattr(app, "router", None), "routes", []):
+        match, _ = route.matches(scope)
+        if match == Match.FULL:
+            return route.path
+    return "unmatched"
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware counting requests and the requests in flight.
+
+    A request stays in flight until its response has been sent completely,
+    so streaming responses are counted for their whole duration.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        route = _route_label(scope)
+        status = {"code": 500}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        IN_FLIGHT.inc(route=route)
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            IN_FLIGHT.dec(route=route)
+            REQUESTS.inc(route=route, method=scope["method"], status=status["code"])
@@ -2,43 +2,40 @@
 PDF Parsers Package
 
 This package contains implementations of various PDF parsing libraries.
+
+Parsers are imported lazily through `registry`: ``get_parser`` loads a parser
+on first use, and third-party parsers can register through entry points.
 """
 
 from loguru import logger
 
-from .docling_parser import DoclingParser
-from .pdfminer_parser import PDFMinerParser
-from .pymupdf_parser import PyMuPDFParser
-from .pypdf2_parser import PyPDF2Parser
+from .registry import BUILTIN_PARSERS, ParserRegistry
 from .utils import analyze_pdf_structure, pdf_diagnostic_info
 
-# Create instances of all parsers
-parsers = {
-    "PyMuPDF": PyMuPDFParser(),
-    "PyPDF2": PyPDF2Parser(),
-    "PDFMiner": PDFMinerParser(),
-    "Docling": DoclingParser(),
-}
+registry = ParserRegistry()
+for _name, _target in BUILTIN_PARSERS.items():
+    registry.register(_name, _target)
+registry.discover()
 
 # Log available parsers
-logger.info(f"Initialized PDF parsers: {', '.join(parsers.keys())}")
+logger.info(f"Registered PDF parsers: {', '.join(registry.names())}")
 
 
 # Function to get all available parsers
 def get_available_parsers():
     """
-    Returns a dictionary of all available parsers.
+    Returns the names of all available parsers, without loading them.
 
     Returns:
-        dict: A dictionary mapping parser names to parser instances
+        list: The names of the registered parsers
     """
-    return parsers
+    return registry.names()
 
 
 # Function to get a specific parser by name
 def get_parser(name):
     """
-    Get a parser by name.
+    Get a parser by name, loading it on first use.
 
     Args:
         name (str): The name of the parser
@@ -46,7 +43,7 @@ def get_parser(name):
     Returns:
         PDFParser: The parser instance if found, None otherwise
     """
-    parser = parsers.get(name)
+    parser = registry.get(name)
     if parser:
         logger.info(f"Retrieved parser: {name}")
     else:
@@ -54,12 +51,24 @@ def get_parser(name):
     return parser
 
 
+def __getattr__(name):
+    # Parser classes are imported on first access to keep importing the package cheap
+    for target in BUILTIN_PARSERS.values():
+        module_name, class_name = target.split(":")
+        if class_name == name:
+            from importlib import import_module
+
+            return getattr(import_module(module_name, __name__), class_name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
 # Export the names of all available parsers and utilities
 __all__ = [
     "PyMuPDFParser",
     "PyPDF2Parser",
     "PDFMinerParser",
     "DoclingParser",
+    "registry",
     "get_available_parsers",
     "get_parser",
     "pdf_diagnostic_info",
@@ -1,4 +1,47 @@
+import importlib
+import sys
+import time
 from abc import ABC, abstractmethod
+from importlib import metadata
+
+from .profiling import cprofile_report, profile_pages
+from .results import ParseResult
+
+
+def collect_pages(pages, info, start_page, max_pages, deadline=None):
+    """
+    Collect the pages yielded by `PDFParser.iter_pages`, stopping at a deadline.
+
+    Pages are only checked between one another, so the page being extracted
+    when the deadline passes is still finished. If pages of the range remain
+    at that point, extraction stops and ``info["deadline_exceeded"]`` is set.
+
+    Args:
+        pages (iterator): Pages yielded by `iter_pages` or `iter_handle_pages`
+        info (dict): The document details filled in by the iterator
+        start_page (int): First page of the range (1-indexed)
+        max_pages (int): Maximum number of pages of the range
+        deadline (float): Wall-clock time (`time.time`), or None
+
+    Returns:
+        list: The collected PageResults
+    """
+    if deadline is None:
+        return list(pages)
+    collected = []
+    try:
+        for page in pages:
+            collected.append(page)
+            if time.time() < deadline:
+                continue
+            last_page = min(start_page + max_pages - 1, info.get("page_count") or sys.maxsize)
+            if page.number < last_page:
+                info["deadline_exceeded"] = True
+                break
+    finally:
+        if hasattr(pages, "close"):
+            pages.close()
+    return collected
 
 
 class PDFParser(ABC):
@@ -7,6 +50,24 @@ class PDFParser(ABC):
     All parser implementations should inherit from this class.
     """
 
+    # Distribution name of the underlying library, used to report its version
+    library = None
+
+    # Modules of the underlying library, imported by `preload`
+    library_modules = ()
+
+    # Whether the parser implements `count_pages`, so that large page ranges
+    # can be split into shards extracted in parallel
+    shardable = False
+
+    # Whether the parser implements `open_handle` and `iter_handle_pages`, so
+    # an open document can be kept between requests for pages of it
+    supports_handles = False
+
+    # Bump whenever a change to the parser alters its output, so cached
+    # results produced by the previous implementation are not reused.
+    revision = 1
+
     @property
     @abstractmethod
     def name(self):
@@ -25,17 +86,208 @@ class PDFParser(ABC):
         """Return a link to the parser's documentation or homepage."""
         pass
 
+    @property
+    def version(self):
+        """Return a version string identifying the parser and its library."""
+        library_version = "unknown"
+        if self.library:
+            try:
+                library_version = metadata.version(self.library)
+            except metadata.PackageNotFoundError:
+                library_version = "not-installed"
+        return f"{self.revision}/{self.library}=={library_version}"
+
+    def preload(self):
+        """
+        Import the underlying library so the first request does not pay for it.
+
+        Raises:
+            ImportError: If the library is not installed
+        """
+        for module in self.library_modules:
+            importlib.import_module(module)
+
+    def warm_up(self):
+        """
+        Prepare the parser so that the first request is as fast as later ones.
+
+        Called once in every worker before it accepts jobs. Parsers with models
+        or other expensive state should load it here; by default only the
+        library is imported.
+
+        Returns:
+            dict: Timings or other details about the warm-up
+        """
+        self.preload()
+        return {}
+
+    def count_pages(self, source):
+        """
+        Count the pages of a document without extracting any of them.
+
+        Parsers that implement it can have large page ranges split into shards
+        extracted in parallel (see `src.sharding`).
+
+        Args:
+            source (str | bytes): Path to the PDF file, or its content as a
+                bytes-like object
+
+        Returns:
+            int: Number of pages, or None if unknown or not supported
+        """
+        return None
+
+    def open_handle(self, source, info=None):
+        """
+        Open a document to extract pages from it later with `iter_handle_pages`.
+
+        Only implemented by parsers with ``supports_handles``.
+
+        Args:
+            source (str | bytes): Path to the PDF file, or its content as a
+                bytes-like object
+            info (dict): Optional dict filled in with timings of the open
+
+        Returns:
+            DocumentHandle: The open document; the caller must close it
+
+        Raises:
+            ParserError: If the document cannot be opened
+        """
+        raise NotImplementedError(f"{self.name} does not support document handles")
+
+    def iter_handle_pages(self, handle, start_page, max_pages, info=None):
+        """
+        Extract pages of a document opened with `open_handle`, like `iter_pages`.
+
+        The handle is left open. Only implemented by parsers with ``supports_handles``.
+        """
+        raise NotImplementedError(f"{self.name} does not support document handles")
+
+    def parse_handle(self, handle, start_page, max_pages, deadline=None):
+        """
+        Extract a range of pages of a document opened with `open_handle`.
+
+        ``deadline`` is as for `parse`.
+
+        Returns:
+            ParseResult: The extracted pages and document details
+
+        Raises:
+            ParserError: If the pages cannot be extracted
+        """
+        start_time = time.perf_counter()
+        info = dict(handle.info)
+        pages = collect_pages(
+            self.iter_handle_pages(handle, start_page, max_pages, info),
+            info,
+            start_page,
+            max_pages,
+            deadline,
+        )
+        return ParseResult(
+            self.name,
+            pages=pages,
+            info=info,
+            duration_ms=(time.perf_counter() - start_time) * 1000,
+        )
+
     @abstractmethod
-    def parse(self, file_path, start_page, max_pages):
+    def iter_pages(self, source, start_page, max_pages, info=None):
         """
-        Extract text from a PDF file.
+        Extract a PDF file page by page.
+
+        Pages are yielded as soon as they have been extracted, so callers can
+        stream them without holding the whole document in memory.
 
         Args:
-            file_path (str): Path to the PDF file
+            source (str | bytes): Path to the PDF file, or its content as a
+                bytes-like object
             start_page (int): Page to start extraction from (1-indexed)
             max_pages (int): Maximum number of pages to extract
+            info (dict): Optional dict filled in with document details
+                (``page_count``, ``metadata``, ...) before the first page is
+                yielded, and with summary details once the last page is done
 
-        Returns:
-            str: Extracted text in markdown format
+        Yields:
+            PageResult: One result per extracted page
+
+        Raises:
+            ParserError: If the document cannot be processed
         """
         pass
+
+    def extract_pages(self, source, start_page, max_pages, deadline=None):
+        """
+        Extract a range of pages in one call.
+
+        ``deadline`` is as for `parse`.
+
+        Returns:
+            tuple: (document info dict, list of PageResult)
+        """
+        info = {}
+        pages = collect_pages(
+            self.iter_pages(source, start_page, max_pages, info),
+            info,
+            start_page,
+            max_pages,
+            deadline,
+        )
+        return info, pages
+
+    def parse(self, source, start_page, max_pages, profile=None, deadline=None):
+        """
+        Extract a range of pages of a PDF file.
+
+        Args:
+            source (str | bytes): Path to the PDF file, or its content as a
+                bytes-like object
+            start_page (int): Page to start extraction from (1-indexed)
+            max_pages (int): Maximum number of pages to extract
+            profile (str): ``"timings"`` to attach stage and per-page timings
+                to the result, ``"cprofile"`` to also attach a cProfile report
+            deadline (float): Wall-clock time (`time.time`) after which no
+                further page is started; the pages extracted by then are
+                returned, with ``info["deadline_exceeded"]`` set. Ignored when
+                profiling.
+
+        Returns:
+            ParseResult: The extracted pages and document details
+
+        Raises:
+            ParserError: If the document cannot be processed
+        """
+        start_time = time.perf_counter()
+        if not profile:
+            info, pages = self.extract_pages(source, start_page, max_pages, deadline)
+            return ParseResult(
+                self.name,
+                pages=pages,
+                info=info,
+                duration_ms=(time.perf_counter() - start_time) * 1000,
+            )
+
+        profiler = None
+        if profile == "cprofile":
+            import cProfile
+
+            profiler = cProfile.Profile()
+            profiler.enable()
+        info = {}
+        try:
+            pages, timings = profile_pages(
+                self.iter_pages(source, start_page, max_pages, info), info
+            )
+        finally:
+            if profiler is not None:
+                profiler.disable()
+        if profiler is not None:
+            timings["cprofile"] = cprofile_report(profiler)
+        return ParseResult(
+            self.name,
+            pages=pages,
+            info=info,
+            duration_ms=(time.perf_counter() - start_time) * 1000,
+            profile=timings,
+        )
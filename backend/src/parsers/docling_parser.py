@@ -1,11 +1,132 @@
+import io
 import os
-import tempfile
+import queue
+import threading
+import time
 import traceback
 from pathlib import Path
 
 from loguru import logger
 
+from src import config
+
 from .base_parser import PDFParser
+from .errors import PageRangeError, ParserError, ParserUnavailableError
+from .profiling import stage
+from .results import PageResult
+from .source import describe, is_path
+
+# Tiny bundled document used to exercise the models before the first real request
+WARMUP_PDF = Path(__file__).parent / "assets" / "warmup.pdf"
+
+# Pipeline settings of the Docling profiles, from the fastest to the most thorough.
+# ``fast`` reads the text layer and layout only; ``balanced`` adds the fast
+# table structure model; ``accurate`` (Docling's defaults) adds OCR and the
+# accurate table structure model
+PROFILES = {
+    "fast": {"do_ocr": False, "do_table_structure": False},
+    "balanced": {"do_ocr": False, "do_table_structure": True, "table_mode": "fast"},
+    "accurate": {"do_ocr": True, "do_table_structure": True, "table_mode": "accurate"},
+}
+
+
+def _create_converter(profile):
+    """
+    Create a ``DocumentConverter`` for a profile, with the configured threads
+    and page batch size.
+    """
+    from docling.document_converter import DocumentConverter
+
+    try:
+        from docling.datamodel.base_models import InputFormat
+        from docling.datamodel.pipeline_options import (
+            AcceleratorOptions,
+            PdfPipelineOptions,
+            TableFormerMode,
+        )
+        from docling.datamodel.settings import settings
+        from docling.document_converter import PdfFormatOption
+    except ImportError as e:
+        logger.warning(f"Docling pipeline options are unavailable, using its defaults: {str(e)}")
+        return DocumentConverter()
+
+    if config.DOCLING_PAGE_BATCH_SIZE > 0:
+        settings.perf.page_batch_size = config.DOCLING_PAGE_BATCH_SIZE
+
+    options = PROFILES[profile]
+    pipeline_options = PdfPipelineOptions()
+    pipeline_options.do_ocr = options["do_ocr"]
+    pipeline_options.do_table_structure = options["do_table_structure"]
+    if options["do_table_structure"]:
+        pipeline_options.table_structure_options.mode = (
+            TableFormerMode.ACCURATE if options["table_mode"] == "accurate" else TableFormerMode.FAST
+        )
+    if config.DOCLING_NUM_THREADS > 0:
+        pipeline_options.accelerator_options = AcceleratorOptions(
+            num_threads=config.DOCLING_NUM_THREADS
+        )
+    return DocumentConverter(
+        format_options={InputFormat.PDF: PdfFormatOption(pipeline_options=pipeline_options)}
+    )
+
+
+class _ConverterPool:
+    """
+    Docling converters kept alive for the lifetime of the process.
+
+    Creating a ``DocumentConverter`` loads the layout and table models, so each
+    converter is reused across requests. Converters are kept per profile, as
+    the profile decides which models they load. A converter is only ever used
+    by one caller at a time; concurrent callers in the same process get their own.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # profile -> idle converters
+        self._idle = {}
+
+    def acquire(self, profile):
+        """
+        Take an idle converter of a profile, creating one if none is available.
+
+        Args:
+            profile (str): Name of the profile, one of `PROFILES`
+
+        Returns:
+            tuple: (converter, load time in ms or None if it was already warm)
+        """
+        with self._lock:
+            idle = self._idle.setdefault(profile, queue.LifoQueue())
+        try:
+            return idle.get_nowait(), None
+        except queue.Empty:
+            pass
+
+        start_time = time.perf_counter()
+        converter = _create_converter(profile)
+        # Load the PDF pipeline (and its models) now rather than on first convert
+        if hasattr(converter, "initialize_pipeline"):
+            try:
+                from docling.datamodel.base_models import InputFormat
+
+                converter.initialize_pipeline(InputFormat.PDF)
+            except Exception as e:
+                logger.warning(f"Could not initialize Docling pipeline: {str(e)}")
+        load_ms = (time.perf_counter() - start_time) * 1000
+        logger.info(
+            f"Created Docling {profile} converter in {load_ms:.0f} ms (pid {os.getpid()})"
+        )
+        return converter, load_ms
+
+    def release(self, profile, converter):
+        """Return a converter obtained from `acquire` to the pool."""
+        with self._lock:
+            self._idle.setdefault(profile, queue.LifoQueue()).put(converter)
+
+
+_converters = _ConverterPool()
+# Timings of the warm-up performed in this process
+_warmup_stats = {}
 
 
 class DoclingParser(PDFParser):
@@ -16,6 +137,43 @@ class DoclingParser(PDFParser):
     for extracting tables, text, and maintaining document layout.
     """
 
+    library = "docling"
+    library_modules = ("docling.document_converter",)
+    revision = 3
+
+    # Pages converted per Docling call when iterating over a document
+    convert_batch_pages = 8
+
+    def __init__(self, profile=None):
+        """
+        Args:
+            profile (str): Name of the pipeline profile, one of `PROFILES`;
+                ``PPP_DOCLING_PROFILE`` if None
+        """
+        if profile is not None and profile not in PROFILES:
+            raise ValueError(f"Unknown Docling profile: {profile}")
+        self._profile = profile
+
+    @property
+    def profile(self):
+        """Name of the pipeline profile used by this parser."""
+        return self._profile or config.DOCLING_PROFILE
+
+    @property
+    def version(self):
+        # Profiles produce different output, so they must not share cached results
+        return f"{super().version}/{self.profile}"
+
+    def with_profile(self, profile):
+        """
+        Returns:
+            DoclingParser: A parser using another pipeline profile
+
+        Raises:
+            ValueError: If the profile is unknown
+        """
+        return DoclingParser(profile)
+
     @property
     def name(self):
         return "Docling"
@@ -32,145 +190,287 @@ class DoclingParser(PDFParser):
     def link(self):
         return "https://github.com/example/docling"  # Replace with actual link when available
 
-    def parse(self, file_path, start_page, max_pages):
+    def warm_up(self):
         """
-        Extract text and tables from a PDF file using Docling.
+        Load a converter (and its models) and optionally run it on a tiny document.
 
-        Args:
-            file_path (str): Path to the PDF file
-            start_page (int): Page to start extraction from (1-indexed)
-            max_pages (int): Maximum number of pages to extract
+        The first call in a process reports the cold timings (model load and
+        first conversion); later calls also report a warm conversion, so the
+        savings of keeping converters alive are visible.
 
         Returns:
-            str: Extracted text in markdown format with tables
+            dict: Process id and timings in milliseconds
         """
+        converter, load_ms = _converters.acquire(self.profile)
         try:
-            # Import Docling (will raise ImportError if not installed)
-            try:
-                from docling.document_converter import DocumentConverter
+            first_run = not _warmup_stats
+            if first_run:
+                _warmup_stats.update({"pid": os.getpid(), "load_ms": load_ms})
+
+            if config.DOCLING_WARMUP_CONVERSION and WARMUP_PDF.is_file():
+                start_time = time.perf_counter()
+                converter.convert(str(WARMUP_PDF))
+                duration_ms = (time.perf_counter() - start_time) * 1000
+                key = "cold_conversion_ms" if first_run else "warm_conversion_ms"
+                _warmup_stats[key] = duration_ms
+                logger.info(f"Docling warm-up conversion took {duration_ms:.0f} ms")
+        finally:
+            _converters.release(self.profile, converter)
+        return dict(_warmup_stats)
+
+    def iter_pages(self, source, start_page, max_pages, info=None):
+        """
+        Extract text and tables from a PDF file page by page using Docling.
+
+        The page range is converted in chunks of `convert_batch_pages`, so the
+        first pages are available before the whole range has been converted.
 
-                logger.info("Successfully imported Docling")
-            except ImportError:
-                logger.error("Docling is not installed")
-                return "# Error\n\nDocling is not installed. Install with: `pip install docling`"
+        Args:
+            source (str | bytes): Path to the PDF file, or its content as a
+                bytes-like object
+            start_page (int): Page to start extraction from (1-indexed)
+            max_pages (int): Maximum number of pages to extract
+            info (dict): Optional dict filled in with document details
 
-            # Create output directory for any extracted tables
-            temp_dir = tempfile.mkdtemp()
-            output_dir = Path(temp_dir)
-            logger.info(f"Created temporary directory for outputs: {temp_dir}")
+        Yields:
+            PageResult: One result per extracted page, with its tables
+        """
+        if info is None:
+            info = {}
+        info["page_format"] = "markdown"
 
-            # Initialize the converter
-            doc_converter = DocumentConverter()
+        # Import Docling (will raise ImportError if not installed)
+        try:
+            self.preload()
+            logger.info("Successfully imported Docling")
+        except ImportError:
+            logger.error("Docling is not installed")
+            raise ParserUnavailableError(
+                "Docling is not installed. Install with: `pip install docling`"
+            )
 
-            # Convert the document
-            logger.info(f"Converting document: {file_path}")
-            try:
-                conv_res = doc_converter.convert(
-                    file_path,
-                    page_range=(start_page, start_page + max_pages - 1),
-                )
-                logger.info("Document conversion successful")
-            except Exception as e:
-                detailed_error = traceback.format_exc()
-                logger.error(f"Error converting document: {str(e)}\n{detailed_error}")
-                return f"# Error\n\nFailed to convert document with Docling: {str(e)}\n\n```\n{detailed_error}\n```"
-
-            # Get the document filename without extension
-            doc_filename = Path(file_path).stem
-
-            # Start building the markdown output
-            markdown_output = f"# Document Analysis: {doc_filename}\n\n"
-
-            # Add document metadata if available
-            if hasattr(conv_res.document, "metadata") and conv_res.document.metadata:
-                logger.info("Adding document metadata")
-                markdown_output += "## Document Metadata\n\n"
-                for key, value in conv_res.document.metadata.items():
-                    markdown_output += f"- **{key}**: {value}\n"
-                markdown_output += "\n"
-
-            # Add document text
-            markdown_output += "## Document Text\n\n"
-
-            # Add text by page
-            current_page = start_page
-            for page in conv_res.document.pages:
-                if current_page > start_page + max_pages - 1:
+        # Reuse a converter whose models are already loaded
+        profile = self.profile
+        info["docling_profile"] = profile
+        with stage(info, "load_models"):
+            doc_converter, load_ms = _converters.acquire(profile)
+        try:
+            last_page = start_page + max_pages - 1
+            chunk_start = start_page
+            table_count = 0
+            image_count = 0
+            while chunk_start <= last_page:
+                chunk_end = min(chunk_start + self.convert_batch_pages - 1, last_page)
+                with stage(info, "convert"):
+                    conv_res = self._convert(
+                        doc_converter, source, chunk_start, chunk_end, load_ms
+                    )
+                load_ms = None
+                document = conv_res.document
+
+                if chunk_start == start_page:
+                    page_count = getattr(conv_res.input, "page_count", None)
+                    if isinstance(page_count, int):
+                        if start_page > page_count:
+                            raise PageRangeError(
+                                f"Start page ({start_page}) exceeds document length ({page_count} pages)."
+                            )
+                        info["page_count"] = page_count
+                        last_page = min(last_page, page_count)
+                    # Add document metadata if available
+                    if hasattr(document, "metadata") and document.metadata:
+                        logger.info("Adding document metadata")
+                        info["metadata"] = {
+                            key: str(value) for key, value in document.metadata.items()
+                        }
+
+                # Add text by page
+                pages = []
+                for page in document.pages:
+                    page_number = chunk_start + len(pages)
+                    if page_number > chunk_end:
+                        break
+                    logger.info(f"Processing page {page_number}")
+                    # Add text blocks for this page
+                    text = "\n\n".join(block.text for block in page.text_blocks)
+                    pages.append(PageResult(page_number, text=text))
+
+                if pages:
+                    with stage(info, "tables"):
+                        table_count = self._attach_tables(document, pages, table_count)
+                # Add information about images if available
+                if hasattr(document, "images") and document.images:
+                    image_count += len(document.images)
+
+                yield from pages
+
+                # Stop early if the document ended inside this chunk
+                if len(pages) < chunk_end - chunk_start + 1:
                     break
+                chunk_start = chunk_end + 1
 
-                logger.info(f"Processing page {current_page}")
-                markdown_output += f"### Page {current_page}\n\n"
-
-                # Add text blocks for this page
-                for text_block in page.text_blocks:
-                    markdown_output += f"{text_block.text}\n\n"
-
-                current_page += 1
-
-            # Add tables section if tables are present
-            if conv_res.document.tables:
-                logger.info(f"Found {len(conv_res.document.tables)} tables in document")
-                markdown_output += "## Extracted Tables\n\n"
-
-                # Process each table
-                for table_ix, table in enumerate(conv_res.document.tables):
-                    logger.info(f"Processing table {table_ix + 1}")
-                    markdown_output += f"### Table {table_ix + 1}\n\n"
-
-                    # Convert table to DataFrame and then to markdown
-                    try:
-                        table_df = table.export_to_dataframe()
-                        markdown_output += table_df.to_markdown() + "\n\n"
-
-                        # Save the table to files in the temp directory
-                        csv_filename = (
-                            output_dir / f"{doc_filename}-table-{table_ix + 1}.csv"
-                        )
-                        html_filename = (
-                            output_dir / f"{doc_filename}-table-{table_ix + 1}.html"
-                        )
-
-                        logger.info(f"Saving CSV table to {csv_filename}")
-                        table_df.to_csv(csv_filename)
-
-                        logger.info(f"Saving HTML table to {html_filename}")
-                        with html_filename.open("w") as fp:
-                            fp.write(table.export_to_html(doc=conv_res.document))
-
-                        # markdown_output += f"*Table {table_ix + 1} has been saved as CSV and HTML.*\n\n"
-                    except Exception as e:
-                        detailed_error = traceback.format_exc()
-                        logger.error(
-                            f"Error processing table {table_ix + 1}: {str(e)}\n{detailed_error}"
-                        )
-                        markdown_output += (
-                            f"*Error processing table {table_ix + 1}: {str(e)}*\n\n"
-                        )
-
-            # Add information about images if available
-            if hasattr(conv_res.document, "images") and conv_res.document.images:
-                logger.info(f"Found {len(conv_res.document.images)} images in document")
-                markdown_output += "## Images\n\n"
-                markdown_output += (
-                    f"The document contains {len(conv_res.document.images)} images.\n\n"
-                )
+            if image_count:
+                logger.info(f"Found {image_count} images in document")
+                info["image_count"] = image_count
 
             logger.success("Docling extraction completed successfully")
-            return markdown_output
 
+        except ParserError:
+            raise
         except Exception as e:
             detailed_error = traceback.format_exc()
             logger.error(
                 f"Unexpected error in Docling parser: {str(e)}\n{detailed_error}"
             )
-            return f"# Error\n\nFailed to extract text with Docling: {str(e)}\n\n```\n{detailed_error}\n```"
+            raise ParserError(
+                f"Failed to extract text with Docling: {str(e)}", detailed_error
+            )
         finally:
-            # Clean up temporary files
-            if "temp_dir" in locals() and os.path.exists(temp_dir):
-                import shutil
-
-                logger.info(f"Cleaning up temporary directory: {temp_dir}")
-                try:
-                    shutil.rmtree(temp_dir)
-                except Exception as e:
-                    logger.error(f"Error cleaning up temporary directory: {str(e)}")
+            _converters.release(profile, doc_converter)
+
+    @staticmethod
+    def _convert(doc_converter, source, first_page, last_page, load_ms):
+        """Convert an inclusive page range, logging cold/warm timings."""
+        logger.info(
+            f"Converting document: {describe(source)} (pages {first_page}-{last_page})"
+        )
+        try:
+            if is_path(source):
+                document_input = source
+            else:
+                from docling.datamodel.base_models import DocumentStream
+
+                # BytesIO shares the memory of a bytes object instead of copying it
+                if not isinstance(source, bytes):
+                    source = bytes(source)
+                document_input = DocumentStream(
+                    name="document.pdf", stream=io.BytesIO(source)
+                )
+
+            convert_start = time.perf_counter()
+            conv_res = doc_converter.convert(
+                document_input,
+                page_range=(first_page, last_page),
+            )
+            convert_ms = (time.perf_counter() - convert_start) * 1000
+            if load_ms is None:
+                logger.info(
+                    f"Document conversion successful in {convert_ms:.0f} ms (warm converter)"
+                )
+            else:
+                logger.info(
+                    f"Document conversion successful in {convert_ms:.0f} ms "
+                    f"(cold converter, {load_ms:.0f} ms to load)"
+                )
+            return conv_res
+        except Exception as e:
+            detailed_error = traceback.format_exc()
+            logger.error(f"Error converting document: {str(e)}\n{detailed_error}")
+            raise ParserError(
+                f"Failed to convert document with Docling: {str(e)}", detailed_error
+            )
+
+    @staticmethod
+    def _attach_tables(document, pages, table_count):
+        """
+        Attach the tables of a converted chunk to their pages, as structured data.
+
+        Tables are not rendered here; see `tables` for their renderings.
+
+        Returns:
+            int: Number of tables seen so far in the document
+        """
+        if not document.tables:
+            return table_count
+
+        logger.info(f"Found {len(document.tables)} tables in document")
+        pages_by_number = {page.number: page for page in pages}
+        for table in document.tables:
+            table_count += 1
+            logger.info(f"Processing table {table_count}")
+
+            # Tables belong to the page they start on (the chunk's last page if unknown)
+            page = pages[-1]
+            prov = getattr(table, "prov", None)
+            if prov:
+                page = pages_by_number.get(getattr(prov[0], "page_no", None), page)
+
+            try:
+                page.tables.append(
+                    _table_data(table, document, table_count, page.number)
+                )
+            except Exception as e:
+                detailed_error = traceback.format_exc()
+                logger.error(
+                    f"Error processing table {table_count}: {str(e)}\n{detailed_error}"
+                )
+                page.tables.append({"index": table_count, "error": str(e)})
+        return table_count
+
+
+def _page_height(document, page_number):
+    """Height of a page of a converted document, or None if it is unknown."""
+    pages = getattr(document, "pages", None)
+    if not isinstance(pages, dict) or page_number not in pages:
+        return None
+    size = getattr(pages[page_number], "size", None)
+    return getattr(size, "height", None)
+
+
+def _bbox(bbox, page_height):
+    """
+    Convert a Docling bounding box to ``[x0, y0, x1, y1]`` with a top-left origin.
+
+    Returns:
+        list: The box, or None if there is none
+    """
+    if bbox is None:
+        return None
+    origin = str(getattr(bbox, "coord_origin", "")).upper()
+    if "BOTTOMLEFT" in origin:
+        if page_height is None:
+            return None
+        top, bottom = page_height - bbox.t, page_height - bbox.b
+    else:
+        top, bottom = bbox.t, bbox.b
+    return [round(bbox.l, 2), round(top, 2), round(bbox.r, 2), round(bottom, 2)]
+
+
+def _table_data(table, document, index, page_number):
+    """
+    Describe a Docling table as a structured table (see `tables`).
+
+    Args:
+        table (TableItem): The table
+        document (DoclingDocument): The converted document it belongs to
+        index (int): Document-wide index of the table (1-based)
+        page_number (int): Page the table starts on
+
+    Returns:
+        dict: The table
+    """
+    page_height = _page_height(document, page_number)
+    prov = getattr(table, "prov", None)
+    data = table.data
+    cells = []
+    for cell in data.table_cells:
+        cells.append(
+            {
+                "row": cell.start_row_offset_idx,
+                "col": cell.start_col_offset_idx,
+                "row_span": max(1, cell.row_span),
+                "col_span": max(1, cell.col_span),
+                "text": cell.text,
+                "column_header": bool(cell.column_header),
+                "row_header": bool(cell.row_header),
+                "bbox": _bbox(getattr(cell, "bbox", None), page_height),
+            }
+        )
+    return {
+        "index": index,
+        "page": page_number,
+        "bbox": _bbox(prov[0].bbox, page_height) if prov else None,
+        "num_rows": data.num_rows,
+        "num_cols": data.num_cols,
+        "cells": cells,
+    }
@@ -0,0 +1,37 @@
+"""
+Exceptions raised by the parsers.
+"""
+
+
+class ParserError(Exception):
+    """
+    Raised when a parser cannot process a document at all.
+
+    Failures limited to a single page are reported on that page's result instead.
+    """
+
+    def __init__(self, message, details=None):
+        """
+        Args:
+            message (str): Human readable description of the failure
+            details (str): Optional extra detail, such as a traceback
+        """
+        super().__init__(message)
+        self.message = message
+        self.details = details
+
+    def __reduce__(self):
+        # Keep ``details`` when the error crosses a process boundary
+        return (type(self), (self.message, self.details))
+
+
+class ParserUnavailableError(ParserError):
+    """Raised when the library behind a parser is not installed."""
+
+
+class InvalidDocumentError(ParserError):
+    """Raised when the source is missing, empty or not a readable PDF."""
+
+
+class PageRangeError(ParserError):
+    """Raised when the requested pages lie outside the document."""
@@ -0,0 +1,44 @@
+"""
+Open documents kept between requests.
+
+Parsers that support it (``PDFParser.supports_handles``) split opening a
+document from extracting its pages, so an open document can be cached and
+the next range of pages read from it without parsing the file again.
+"""
+
+from loguru import logger
+
+
+class DocumentHandle:
+    """
+    A document opened by a parser.
+
+    Attributes:
+        document: The library's document object
+        page_count (int): Number of pages
+        size (int): Size of the source in bytes, used to bound caches of handles
+        info (dict): Document details copied into the info of every extraction
+        state (dict): Objects the parser keeps between extractions, such as
+            font caches
+    """
+
+    def __init__(self, document, page_count, size, info=None, closers=()):
+        self.document = document
+        self.page_count = page_count
+        self.size = size
+        self.info = info or {}
+        self.state = {}
+        self._closers = list(closers)
+
+    def on_close(self, fn):
+        """Call ``fn()`` when the handle is closed, after the callbacks already registered."""
+        self._closers.append(fn)
+
+    def close(self):
+        """Release the document and whatever it was read from."""
+        closers, self._closers = self._closers, []
+        for fn in closers:
+            try:
+                fn()
+            except Exception as e:
+                logger.warning(f"Error closing document handle: {str(e)}")
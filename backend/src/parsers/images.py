@@ -0,0 +1,192 @@
+"""
+Deduplicated extraction of the images of a document.
+
+Every image is extracted once, however many pages it is placed on: images
+are looked up by PDF object number (xref) first, and by a hash of their
+content second, so identical images stored as separate objects are also
+written only once. The output is written to a zip file or a directory:
+
+- ``images/<id>.<ext>``: each unique image, in its original encoding
+- ``thumbnails/<id>.png``: downscaled copies, if requested
+- ``manifest.json``: the images with their size and pages, and for every
+  page the images placed on it with their bounding boxes
+"""
+
+import hashlib
+import json
+import os
+import zipfile
+
+# Bump when the layout of the manifest changes
+MANIFEST_VERSION = 1
+
+
+class ZipWriter:
+    """Writes output files into a zip archive."""
+
+    def __init__(self, path):
+        # Images are already compressed; deflating them again only costs time
+        self._zip = zipfile.ZipFile(path, "w", compression=zipfile.ZIP_STORED)
+
+    def write(self, name, data, compress=False):
+        compress_type = zipfile.ZIP_DEFLATED if compress else zipfile.ZIP_STORED
+        self._zip.writestr(name, data, compress_type=compress_type)
+
+    def close(self):
+        self._zip.close()
+
+
+class DirectoryWriter:
+    """Writes output files into a directory."""
+
+    def __init__(self, path):
+        self._path = path
+
+    def write(self, name, data, compress=False):
+        path = os.path.join(self._path, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as f:
+            f.write(data)
+
+    def close(self):
+        pass
+
+
+def open_writer(output):
+    """Return a writer for ``output``: a zip file if it ends in ``.zip``, else a directory."""
+    if str(output).endswith(".zip"):
+        return ZipWriter(output)
+    return DirectoryWriter(output)
+
+
+class ImageExtractor:
+    """
+    Collects the images of the pages it is given, writing each unique image once.
+
+    Attributes:
+        pages (list): Per page, its ``number`` and ``images`` placed on it
+        images (dict): Unique images by id
+    """
+
+    def __init__(self, writer, thumbnail_size=0):
+        """
+        Args:
+            writer (ZipWriter | DirectoryWriter): Where images are written
+            thumbnail_size (int): Longest side of thumbnails in pixels, 0 for none
+        """
+        self.writer = writer
+        self.thumbnail_size = thumbnail_size
+        self.pages = []
+        self.images = {}
+        self.placements = 0
+        self._ids_by_xref = {}
+        self._ids_by_digest = {}
+
+    def add_page(self, doc, page):
+        """
+        Extract the images placed on a PyMuPDF page that have not been seen yet.
+
+        Args:
+            doc (fitz.Document): The document of the page
+            page (fitz.Page): The page
+        """
+        placed = []
+        for placement in page.get_image_info(xrefs=True):
+            xref = placement.get("xref")
+            if not xref:
+                # Inline images have no object to extract
+                continue
+            image_id = self._ids_by_xref.get(xref)
+            if image_id is None:
+                image_id = self._extract(doc, xref)
+                self._ids_by_xref[xref] = image_id
+            if image_id is None:
+                continue
+            self.placements += 1
+            pages = self.images[image_id]["pages"]
+            if not pages or pages[-1] != page.number + 1:
+                pages.append(page.number + 1)
+            placed.append({"id": image_id, "bbox": [round(v, 2) for v in placement["bbox"]]})
+        self.pages.append({"number": page.number + 1, "images": placed})
+
+    def _extract(self, doc, xref):
+        extracted = doc.extract_image(xref)
+        if not extracted or not extracted.get("image"):
+            return None
+        data = extracted["image"]
+        digest = hashlib.sha256(data).hexdigest()
+        image_id = self._ids_by_digest.get(digest)
+        if image_id is not None:
+            return image_id
+
+        image_id = digest[:16]
+        self._ids_by_digest[digest] = image_id
+        entry = {
+            "file": f"images/{image_id}.{extracted['ext']}",
+            "sha256": digest,
+            "xref": xref,
+            "width": extracted["width"],
+            "height": extracted["height"],
+            "bytes": len(data),
+            "pages": [],
+        }
+        self.writer.write(entry["file"], data)
+        if self.thumbnail_size:
+            thumbnail = self._thumbnail(doc, xref)
+            if thumbnail is not None:
+                entry["thumbnail"] = f"thumbnails/{image_id}.png"
+                self.writer.write(entry["thumbnail"], thumbnail)
+        self.images[image_id] = entry
+        return image_id
+
+    def _thumbnail(self, doc, xref):
+        import fitz  # PyMuPDF
+
+        try:
+            pixmap = fitz.Pixmap(doc, xref)
+            if pixmap.n - pixmap.alpha > 3:
+                # PNG cannot hold CMYK
+                pixmap = fitz.Pixmap(fitz.csRGB, pixmap)
+            scale = self.thumbnail_size / max(pixmap.width, pixmap.height)
+            if scale < 1:
+                pixmap = fitz.Pixmap(
+                    pixmap,
+                    max(1, round(pixmap.width * scale)),
+                    max(1, round(pixmap.height * scale)),
+                    None,
+                )
+            return pixmap.tobytes("png")
+        except Exception:
+            return None
+
+    def manifest(self):
+        """
+        Returns:
+            dict: The manifest, also written by `finish`
+        """
+        return {
+            "version": MANIFEST_VERSION,
+            "image_count": len(self.images),
+            "placements": self.placements,
+            "images": self.images,
+            "pages": self.pages,
+        }
+
+    def finish(self, extra_files=None):
+        """
+        Write the manifest and any extra files, and close the writer.
+
+        Args:
+            extra_files (dict): Further files to write, by name
+
+        Returns:
+            dict: The manifest
+        """
+        manifest = self.manifest()
+        try:
+            for name, data in (extra_files or {}).items():
+                self.writer.write(name, data, compress=True)
+            self.writer.write("manifest.json", json.dumps(manifest, indent=2).encode(), compress=True)
+        finally:
+            self.writer.close()
+        return manifest
@@ -3,6 +3,16 @@ import traceback
 from loguru import logger
 
 from .base_parser import PDFParser
+from .errors import (
+    InvalidDocumentError,
+    PageRangeError,
+    ParserError,
+    ParserUnavailableError,
+)
+from .handles import DocumentHandle
+from .profiling import stage
+from .results import PageResult
+from .source import describe, open_source, source_size
 
 
 class PDFMinerParser(PDFParser):
@@ -10,6 +20,19 @@ class PDFMinerParser(PDFParser):
     PDF parser implementation using PDFMiner.Six.
     """
 
+    library = "pdfminer.six"
+    library_modules = (
+        "pdfminer.converter",
+        "pdfminer.layout",
+        "pdfminer.pdfdocument",
+        "pdfminer.pdfinterp",
+        "pdfminer.pdfpage",
+    )
+    shardable = True
+    supports_handles = True
+
+    revision = 3
+
     @property
     def name(self):
         return "PDFMiner"
@@ -25,40 +48,198 @@ class PDFMinerParser(PDFParser):
     def link(self):
         return "https://github.com/pdfminer/pdfminer.six"
 
-    def parse(self, file_path, start_page, max_pages):
+    @staticmethod
+    def _count_pages(document):
         """
-        Extract text from a PDF file using PDFMiner.
+        Get the page count from the page tree without interpreting any page.
 
         Args:
-            file_path (str): Path to the PDF file
-            start_page (int): Page to start extraction from (1-indexed)
-            max_pages (int): Maximum number of pages to extract
+            document (PDFDocument): The open PDFMiner document
 
         Returns:
-            str: Extracted text in markdown format
+            int: Number of pages in the document
         """
+        from pdfminer.pdfpage import PDFPage
+        from pdfminer.pdftypes import resolve1
+
+        try:
+            return int(resolve1(document.catalog["Pages"])["Count"])
+        except Exception as e:
+            # Broken page trees may lack /Count; walk the tree (still without
+            # interpreting page content) instead
+            logger.warning(f"Page tree has no usable /Count: {str(e)}")
+            return sum(1 for _ in PDFPage.create_pages(document))
+
+    @staticmethod
+    def _iter_page_range(document, start_idx, end_idx):
+        """
+        Yield the pages in ``[start_idx, end_idx)`` in a single walk of the page tree.
+
+        Subtrees entirely outside the range are skipped using their /Count, so
+        reaching page 400 costs a handful of dictionary lookups rather than
+        building 400 page objects.
+
+        Args:
+            document (PDFDocument): The open PDFMiner document
+            start_idx (int): First page index (0-indexed)
+            end_idx (int): Page index to stop before (0-indexed)
+
+        Yields:
+            tuple: (page index, PDFPage)
+        """
+        from pdfminer.pdfpage import LITERAL_PAGE, LITERAL_PAGES, PDFPage
+        from pdfminer.pdftypes import dict_value, list_value, resolve1
+
+        def node_type(attrs):
+            return attrs.get("Type") or attrs.get("type")
+
+        def leaf_count(obj):
+            # Number of pages below a node, or None if it cannot be trusted
+            attrs = dict_value(obj)
+            if node_type(attrs) is LITERAL_PAGE:
+                return 1
+            count = resolve1(attrs.get("Count"))
+            return count if isinstance(count, int) else None
+
+        def walk(obj, inherited, first, visited):
+            # Yields in-range pages below ``obj`` and returns how many pages it holds
+            objid = getattr(obj, "objid", None)
+            if objid is not None:
+                if objid in visited:
+                    return 0
+                visited.add(objid)
+
+            attrs = dict_value(obj).copy()
+            for key, value in inherited.items():
+                if key in PDFPage.INHERITABLE_ATTRS and key not in attrs:
+                    attrs[key] = value
+
+            if node_type(attrs) is LITERAL_PAGE:
+                if start_idx <= first < end_idx:
+                    yield first, PDFPage(document, objid, attrs, None)
+                return 1
+
+            if node_type(attrs) is not LITERAL_PAGES or "Kids" not in attrs:
+                return 0
+
+            seen = 0
+            for kid in list_value(attrs["Kids"]):
+                if first + seen >= end_idx:
+                    break
+                count = leaf_count(kid)
+                if count is not None and first + seen + count <= start_idx:
+                    seen += count
+                    continue
+                seen += yield from walk(kid, attrs, first + seen, visited)
+            return seen
+
+        try:
+            root = document.catalog["Pages"]
+        except KeyError:
+            # No page tree; fall back to PDFMiner's own page discovery
+            for idx, page in enumerate(PDFPage.create_pages(document)):
+                if idx >= end_idx:
+                    break
+                if idx >= start_idx:
+                    yield idx, page
+            return
+
+        yield from walk(root, document.catalog, 0, set())
+
+    def count_pages(self, source):
+        from pdfminer.pdfdocument import PDFDocument
+        from pdfminer.pdfparser import PDFParser as PDFSyntaxParser
+
+        try:
+            with open_source(source) as fp:
+                return self._count_pages(PDFDocument(PDFSyntaxParser(fp)))
+        except Exception as e:
+            logger.warning(f"Cannot count pages with PDFMiner: {str(e)}")
+            return None
+
+    def open_handle(self, source, info=None):
+        if info is None:
+            info = {}
+
         try:
             # Import here to avoid errors if PDFMiner is not installed
-            import io
+            from pdfminer.pdfdocument import PDFDocument
+            from pdfminer.pdfparser import PDFParser as PDFSyntaxParser
+        except ImportError:
+            logger.error("PDFMiner is not installed")
+            raise ParserUnavailableError(
+                "PDFMiner is not installed. Install with: `pip install pdfminer.six`"
+            )
 
-            from pdfminer.converter import TextConverter
-            from pdfminer.high_level import extract_text
-            from pdfminer.layout import LAParams
-            from pdfminer.pdfinterp import PDFPageInterpreter, PDFResourceManager
-            from pdfminer.pdfpage import PDFPage
+        logger.info(f"Opening PDF with PDFMiner: {describe(source)}")
 
-            logger.info(f"Opening PDF with PDFMiner: {file_path}")
+        try:
+            fp = open_source(source)
+        except Exception as e:
+            detailed_error = traceback.format_exc()
+            logger.error(
+                f"Unexpected error in PDFMiner parser: {str(e)}\n{detailed_error}"
+            )
+            raise ParserError(
+                f"Failed to extract text with PDFMiner: {str(e)}", detailed_error
+            )
 
-            # Get page count for validation
-            page_count = 0
-            try:
-                with open(file_path, "rb") as fp:
-                    page_count = sum(1 for _ in PDFPage.get_pages(fp))
-                logger.info(f"Document has {page_count} pages")
-            except Exception as e:
-                logger.error(f"Error counting pages: {str(e)}")
-                return f"# Error\n\nFailed to count pages in PDF: {str(e)}"
+        # Open the document once; every requested page is read from it
+        try:
+            with stage(info, "open"):
+                document = PDFDocument(PDFSyntaxParser(fp))
+                page_count = self._count_pages(document)
+            logger.info(f"Document has {page_count} pages")
+        except Exception as e:
+            fp.close()
+            logger.error(f"Error counting pages: {str(e)}")
+            raise InvalidDocumentError(f"Failed to count pages in PDF: {str(e)}")
+        return DocumentHandle(
+            document,
+            page_count,
+            source_size(source),
+            info={"page_count": page_count},
+            closers=[fp.close],
+        )
+
+    def iter_pages(self, source, start_page, max_pages, info=None):
+        """
+        Extract text from a PDF file page by page using PDFMiner.
+
+        Args:
+            source (str | bytes): Path to the PDF file, or its content as a
+                bytes-like object
+            start_page (int): Page to start extraction from (1-indexed)
+            max_pages (int): Maximum number of pages to extract
+            info (dict): Optional dict filled in with document details
+
+        Yields:
+            PageResult: One result per extracted page
+        """
+        if info is None:
+            info = {}
 
+        handle = self.open_handle(source, info)
+        try:
+            yield from self.iter_handle_pages(handle, start_page, max_pages, info)
+        finally:
+            handle.close()
+
+        logger.success("PDFMiner extraction completed successfully")
+
+    def iter_handle_pages(self, handle, start_page, max_pages, info=None):
+        if info is None:
+            info = {}
+
+        import io
+
+        from pdfminer.converter import TextConverter
+        from pdfminer.layout import LAParams
+        from pdfminer.pdfinterp import PDFPageInterpreter, PDFResourceManager
+
+        document = handle.document
+        page_count = handle.page_count
+        try:
             # Calculate page range (convert from 1-indexed to 0-indexed)
             start_idx = start_page - 1
             end_idx = start_idx + max_pages
@@ -67,68 +248,68 @@ class PDFMinerParser(PDFParser):
                 logger.error(
                     f"Start page ({start_page}) exceeds document length ({page_count} pages)"
                 )
-                return f"# Error\n\nStart page ({start_page}) exceeds document length ({page_count} pages)."
+                raise PageRangeError(
+                    f"Start page ({start_page}) exceeds document length ({page_count} pages)."
+                )
 
             end_idx = min(end_idx, page_count)
-            page_numbers = list(range(start_idx, end_idx))
 
             logger.info(
                 f"Extracting text from pages {start_page} to {min(start_page + max_pages - 1, page_count)}"
             )
 
-            text = "# Document Analysis with PDFMiner\n\n"
-            text += "## Document Information\n\n"
-            text += f"- **Total Pages**: {page_count}\n\n"
-
-            # Extract text page by page
-            text += "## Extracted Text\n\n"
-            for page_num in page_numbers:
-                try:
-                    logger.info(f"Processing page {page_num+1}")
-
-                    # Extract text for each page separately
-                    output_string = io.StringIO()
-                    with open(file_path, "rb") as fp:
-                        resource_manager = PDFResourceManager()
-                        device = TextConverter(
-                            resource_manager, output_string, laparams=LAParams()
-                        )
-                        interpreter = PDFPageInterpreter(resource_manager, device)
+            info.update(handle.info)
 
-                        # Skip to the desired page
-                        for i, page in enumerate(PDFPage.get_pages(fp)):
-                            if i == page_num:
-                                logger.debug(
-                                    f"Found page {page_num+1}, extracting text"
-                                )
-                                interpreter.process_page(page)
-                                break
-
-                    page_text = output_string.getvalue()
-
-                    # Check if we got any text
-                    if not page_text.strip():
-                        logger.warning(f"No text extracted from page {page_num+1}")
-                        page_text = "*No text could be extracted from this page.*"
+            # One resource manager (and font cache) is kept with the open
+            # document, and a converter and interpreter are shared by all pages;
+            # the output buffer is reset per page.
+            resource_manager = handle.state.get("resource_manager")
+            if resource_manager is None:
+                resource_manager = PDFResourceManager(caching=True)
+                handle.state["resource_manager"] = resource_manager
+            output_string = io.StringIO()
+            device = TextConverter(
+                resource_manager, output_string, laparams=LAParams()
+            )
+            interpreter = PDFPageInterpreter(resource_manager, device)
 
-                    text += f"### Page {page_num+1}\n\n```\n{page_text}\n```\n\n"
+            # Extract text page by page in a single pass over the page tree
+            try:
+                for page_num, page in self._iter_page_range(
+                    document, start_idx, end_idx
+                ):
+                    try:
+                        logger.info(f"Processing page {page_num+1}")
+                        interpreter.process_page(page)
+                        page_text = output_string.getvalue()
 
-                except Exception as e:
-                    detailed_error = traceback.format_exc()
-                    logger.error(
-                        f"Error extracting text from page {page_num+1}: {str(e)}\n{detailed_error}"
-                    )
-                    text += f"### Page {page_num+1}\n\n*Error extracting text: {str(e)}*\n\n"
+                        # Check if we got any text
+                        if not page_text.strip():
+                            logger.warning(
+                                f"No text extracted from page {page_num+1}"
+                            )
+                        result = PageResult(page_num + 1, text=page_text)
 
-            logger.success("PDFMiner extraction completed successfully")
-            return text
+                    except Exception as e:
+                        detailed_error = traceback.format_exc()
+                        logger.error(
+                            f"Error extracting text from page {page_num+1}: {str(e)}\n{detailed_error}"
+                        )
+                        result = PageResult(page_num + 1, error=str(e))
+                    finally:
+                        output_string.seek(0)
+                        output_string.truncate(0)
+                    yield result
+            finally:
+                device.close()
 
-        except ImportError:
-            logger.error("PDFMiner is not installed")
-            return "# Error\n\nPDFMiner is not installed. Install with: `pip install pdfminer.six`"
+        except ParserError:
+            raise
         except Exception as e:
             detailed_error = traceback.format_exc()
             logger.error(
                 f"Unexpected error in PDFMiner parser: {str(e)}\n{detailed_error}"
             )
-            return f"# Error\n\nFailed to extract text with PDFMiner: {str(e)}\n\n```\n{detailed_error}\n```"
+            raise ParserError(
+                f"Failed to extract text with PDFMiner: {str(e)}", detailed_error
+            )
@@ -0,0 +1,117 @@
+"""
+Cheap per-page layout probe, used to route pages between parsers.
+
+The probe looks at what PyMuPDF already knows about a page (its text layer,
+placed images and vector drawings) to guess whether the page needs layout
+and table analysis, or whether plain text extraction is good enough.
+"""
+
+from dataclasses import asdict, dataclass, field
+
+from src import config
+
+# Routes of a page
+ROUTE_FAST = "fast"
+ROUTE_LAYOUT = "layout"
+
+# Straight segments shorter than this (in points) are not counted as rulings
+MIN_RULING_LENGTH = 20
+# Lines thinner than this (in points) count as a single ruling
+MAX_RULING_WIDTH = 2
+
+
+@dataclass(slots=True)
+class PageProbe:
+    """
+    Layout features of one page and where it was routed.
+
+    Attributes:
+        number (int): Page number (1-indexed)
+        chars (int): Non-whitespace characters in the text layer
+        images (int): Images placed on the page
+        image_coverage (float): Fraction of the page area covered by images
+        rulings (int): Horizontal and vertical line segments, a sign of tables
+        route (str): ``"fast"`` or ``"layout"``
+        reasons (list): Why the page was routed to layout analysis
+    """
+
+    number: int
+    chars: int = 0
+    images: int = 0
+    image_coverage: float = 0.0
+    rulings: int = 0
+    route: str = ROUTE_FAST
+    reasons: list = field(default_factory=list)
+
+    def to_dict(self):
+        return asdict(self)
+
+
+def _count_rulings(page, page_area):
+    rulings = 0
+    for path in page.get_drawings():
+        for item in path["items"]:
+            if item[0] == "l":
+                start, end = item[1], item[2]
+                dx, dy = abs(end.x - start.x), abs(end.y - start.y)
+                if min(dx, dy) < 1 and max(dx, dy) >= MIN_RULING_LENGTH:
+                    rulings += 1
+            elif item[0] == "re":
+                rect = item[1]
+                if max(rect.width, rect.height) < MIN_RULING_LENGTH:
+                    continue
+                if min(rect.width, rect.height) < MAX_RULING_WIDTH:
+                    rulings += 1
+                elif rect.width * rect.height < page_area / 2:
+                    # Cell borders; page-sized rectangles are backgrounds or frames
+                    rulings += 4
+    return rulings
+
+
+def _image_coverage(page, page_area):
+    covered = 0.0
+    for image in page.get_image_info():
+        bbox = page.rect & image["bbox"]
+        if not bbox.is_empty:
+            covered += bbox.width * bbox.height
+    return min(1.0, covered / page_area)
+
+
+def route_page(probe):
+    """
+    Decide whether a probed page needs layout analysis, using the
+    ``PPP_AUTO_*`` thresholds. Sets ``probe.route`` and ``probe.reasons``.
+    """
+    reasons = []
+    if probe.chars < config.AUTO_MIN_CHARS and probe.images:
+        # Most likely a scan, which needs OCR
+        reasons.append("no_text_layer")
+    if probe.rulings >= config.AUTO_MIN_RULINGS:
+        reasons.append("table_rulings")
+    if probe.image_coverage >= config.AUTO_IMAGE_COVERAGE:
+        reasons.append("image_heavy")
+    probe.reasons = reasons
+    probe.route = ROUTE_LAYOUT if reasons else ROUTE_FAST
+    return probe
+
+
+def probe_page(page, text):
+    """
+    Probe a PyMuPDF page.
+
+    Args:
+        page (fitz.Page): The page
+        text (str): Its text, already extracted
+
+    Returns:
+        PageProbe: The features of the page, routed
+    """
+    page_area = max(page.rect.width * page.rect.height, 1.0)
+    probe = PageProbe(
+        page.number + 1,
+        chars=sum(1 for char in text if not char.isspace()),
+        images=len(page.get_images()),
+        image_coverage=_image_coverage(page, page_area),
+        rulings=_count_rulings(page, page_area),
+    )
+    return route_page(probe)
@@ -0,0 +1,86 @@
+"""
+Stage timings of a parse, collected when a request asks to be profiled.
+
+Parsers time their expensive stages (opening the document, converting it,
+exporting tables) with `stage`, which adds the elapsed time to the
+``timings`` entry of the ``info`` dict passed to ``PDFParser.iter_pages``.
+`profile_pages` turns the time between yielded pages into per-page timings,
+net of any stage recorded in between.
+"""
+
+import io
+import time
+from contextlib import contextmanager
+
+# Lines of the cProfile report attached to a profiled parse
+CPROFILE_LINES = 40
+
+
+@contextmanager
+def stage(info, name):
+    """
+    Add the time spent in the ``with`` block to ``info["timings"][name]``.
+
+    Args:
+        info (dict): The ``info`` dict of ``PDFParser.iter_pages``, or None
+        name (str): Name of the stage; repeated stages are summed
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        if info is not None:
+            timings = info.setdefault("timings", {})
+            timings[name] = timings.get(name, 0.0) + (time.perf_counter() - start) * 1000
+
+
+def _stages_total(info):
+    return sum(info.get("timings", {}).values())
+
+
+def profile_pages(pages, info):
+    """
+    Time each page of a page iterator.
+
+    The time of a page is the time from the previous page (or the start)
+    until it is yielded, minus the stages recorded by the parser meanwhile,
+    so opening the document is not charged to the first page.
+
+    Args:
+        pages (iterator): Output of ``PDFParser.iter_pages``
+        info (dict): The ``info`` dict passed to ``iter_pages``
+
+    Returns:
+        tuple: (list of PageResult, profile dict with the ``stages`` and the
+            per-page ``pages`` timings, in milliseconds)
+    """
+    results = []
+    page_timings = []
+    extract_ms = 0.0
+    start = last = time.perf_counter()
+    stages_before = 0.0
+    for page in pages:
+        now = time.perf_counter()
+        stages_now = _stages_total(info)
+        page_ms = max((now - last) * 1000 - (stages_now - stages_before), 0.0)
+        page_timings.append({"number": page.number, "ms": page_ms})
+        extract_ms += page_ms
+        stages_before, last = stages_now, now
+        results.append(page)
+    total_ms = (time.perf_counter() - start) * 1000
+
+    stages = dict(info.pop("timings", {}))
+    stages["extract_pages"] = extract_ms
+    # Whatever is left: closing the document, summary details, generator overhead
+    stages["other"] = max(total_ms - sum(stages.values()), 0.0)
+    return results, {"stages": stages, "pages": page_timings}
+
+
+def cprofile_report(profiler, lines=CPROFILE_LINES):
+    """Return the top functions of a cProfile run by cumulative time, as text."""
+    import pstats
+
+    stream = io.StringIO()
+    stats = pstats.Stats(profiler, stream=stream)
+    stats.sort_stats("cumulative").print_stats(lines)
+    return stream.getvalue()
@@ -1,9 +1,22 @@
 import os
+import time
 import traceback
 
 from loguru import logger
 
 from .base_parser import PDFParser
+from .errors import (
+    InvalidDocumentError,
+    PageRangeError,
+    ParserError,
+    ParserUnavailableError,
+)
+from .handles import DocumentHandle
+from .probe import ROUTE_LAYOUT, PageProbe, probe_page
+from .profiling import stage
+from .results import PageResult, ParseResult
+from .source import describe, is_path, read_header, source_size
+from .spans import SpanColumns
 
 
 class PyMuPDFParser(PDFParser):
@@ -11,6 +24,12 @@ class PyMuPDFParser(PDFParser):
     PDF parser implementation using PyMuPDF (fitz).
     """
 
+    library = "pymupdf"
+    library_modules = ("fitz",)
+    shardable = True
+    supports_handles = True
+    revision = 2
+
     @property
     def name(self):
         return "PyMuPDF"
@@ -26,157 +45,410 @@ class PyMuPDFParser(PDFParser):
     def link(self):
         return "https://pymupdf.readthedocs.io/"
 
-    def parse(self, file_path, start_page, max_pages):
+    def count_pages(self, source):
+        import fitz  # PyMuPDF
+
+        try:
+            if is_path(source):
+                doc = fitz.open(source)
+            else:
+                doc = fitz.open(stream=source, filetype="pdf")
+        except Exception as e:
+            logger.warning(f"Cannot count pages with PyMuPDF: {str(e)}")
+            return None
+        try:
+            return doc.page_count
+        finally:
+            doc.close()
+
+    def probe_pages(self, source, start_page, max_pages):
         """
-        Extract text from a PDF file using PyMuPDF.
+        Extract a range of pages and probe each of them for layout features.
 
         Args:
-            file_path (str): Path to the PDF file
+            source (str | bytes): Path to the PDF file, or its content as a
+                bytes-like object
             start_page (int): Page to start extraction from (1-indexed)
             max_pages (int): Maximum number of pages to extract
 
         Returns:
-            str: Extracted text in markdown format
+            tuple: (ParseResult, list of `PageProbe`, one per page)
+
+        Raises:
+            ParserError: If the document cannot be processed
+        """
+        start_time = time.perf_counter()
+        probes = []
+        info = {}
+
+        def on_page(doc, i, result):
+            if result.error is not None:
+                probe = PageProbe(i + 1, route=ROUTE_LAYOUT, reasons=["extraction_error"])
+            else:
+                try:
+                    probe = probe_page(doc[i], result.text)
+                except Exception as e:
+                    logger.warning(f"Cannot probe page {i + 1}: {str(e)}")
+                    probe = PageProbe(i + 1, route=ROUTE_LAYOUT, reasons=["probe_error"])
+            probes.append(probe)
+
+        pages = list(self._iter_pages(source, start_page, max_pages, info, on_page))
+        result = ParseResult(
+            self.name,
+            pages=pages,
+            info=info,
+            duration_ms=(time.perf_counter() - start_time) * 1000,
+        )
+        return result, probes
+
+    def analyze(self, source):
+        """
+        Describe a document and probe all of its pages in one pass.
+
+        Only the text layer is read (no markdown, tables or images are
+        produced), so the analysis costs a fraction of a parse. See
+        `src.analysis` for the cost estimates built on it.
+
+        Args:
+            source (str | bytes): Path to the PDF file, or its content as a
+                bytes-like object
+
+        Returns:
+            dict: Page count, encryption, PDF version, totals and one
+                `PageProbe` dict per page with whether it has a ``text_layer``
+
+        Raises:
+            ParserError: If the document cannot be opened
         """
+        start_time = time.perf_counter()
+        doc = self._open_document(source, {})
         try:
-            # Import here to avoid errors if PyMuPDF is not installed
-            import fitz  # PyMuPDF
+            metadata = doc.metadata or {}
+            analysis = {
+                "page_count": doc.page_count,
+                "encrypted": bool(doc.needs_pass or metadata.get("encryption")),
+                "needs_password": bool(doc.needs_pass),
+                "pdf_version": metadata.get("format") or None,
+            }
+            probes = []
+            # Pages of documents that need a password cannot be read
+            for i in range(0 if doc.needs_pass else doc.page_count):
+                try:
+                    page = doc[i]
+                    probe = probe_page(page, page.get_text())
+                except Exception as e:
+                    logger.warning(f"Cannot probe page {i + 1}: {str(e)}")
+                    probe = PageProbe(i + 1, route=ROUTE_LAYOUT, reasons=["probe_error"])
+                probes.append(probe)
+        finally:
+            doc.close()
 
-            logger.info(f"Opening PDF document: {file_path}")
+        pages = [{**probe.to_dict(), "text_layer": probe.chars > 0} for probe in probes]
+        analysis.update(
+            text_pages=sum(1 for page in pages if page["text_layer"]),
+            image_count=sum(page["images"] for page in pages),
+            table_candidates=sum(1 for page in pages if "table_rulings" in page["reasons"]),
+            layout_pages=sum(1 for page in pages if page["route"] == ROUTE_LAYOUT),
+            pages=pages,
+            duration_ms=(time.perf_counter() - start_time) * 1000,
+        )
+        return analysis
 
-            # Check if file exists and can be read
-            if not os.path.isfile(file_path):
-                logger.error(f"File not found: {file_path}")
-                return f"# Error\n\nFile not found: {file_path}"
+    def extract_spans(self, source, start_page, max_pages, granularity="spans"):
+        """
+        Extract the text spans (or words) of a range of pages with their geometry.
 
-            # Try to get file info before opening it fully
-            try:
-                file_size = os.path.getsize(file_path)
-                logger.info(f"File size: {file_size} bytes")
-                if file_size == 0:
-                    logger.error("Empty PDF file detected (0 bytes)")
-                    return "# Error\n\nEmpty PDF file detected (0 bytes)."
-            except Exception as e:
-                logger.warning(f"Could not check file size: {str(e)}")
+        Args:
+            source (str | bytes): Path to the PDF file, or its content as a
+                bytes-like object
+            start_page (int): Page to start extraction from (1-indexed)
+            max_pages (int): Maximum number of pages to extract
+            granularity (str): ``"spans"`` (with font details) or ``"words"``
 
-            # Verify file is readable
-            try:
-                with open(file_path, "rb") as f:
-                    header = f.read(5)
-                    if header != b"%PDF-":
-                        logger.error(
-                            "Invalid PDF file: File does not begin with %PDF- header"
-                        )
-                        return "# Error\n\nInvalid PDF file: File does not begin with %PDF- header."
-            except Exception as e:
-                logger.error(f"Cannot read file: {str(e)}")
-                return f"# Error\n\nCannot read file: {str(e)}"
+        Returns:
+            tuple: (document info dict, `SpanColumns`)
+
+        Raises:
+            ParserError: If the document cannot be processed
+        """
+        info = {}
+        columns = SpanColumns(granularity)
+        doc = self._open_document(source, info)
+        try:
+            page_indices = self._page_indices(doc, start_page, max_pages)
+            info["page_count"] = doc.page_count
+            for i in page_indices:
+                columns.add_page_spans(doc[i])
+        except ParserError:
+            raise
+        except Exception as e:
+            detailed_error = traceback.format_exc()
+            logger.error(f"Error extracting spans with PyMuPDF: {str(e)}\n{detailed_error}")
+            raise ParserError(
+                f"Failed to extract spans with PyMuPDF: {str(e)}", detailed_error
+            )
+        finally:
+            doc.close()
+        logger.info(f"Extracted {len(columns)} {granularity} from {len(page_indices)} pages")
+        return info, columns
+
+    def extract_images(self, source, start_page, max_pages, output, thumbnail_size=0):
+        """
+        Extract the text and the unique images of a range of pages.
+
+        Images are extracted in the same pass as the text, and each image is
+        written once however many pages it is placed on (see `src.parsers.images`).
+        The text is written as ``content.md`` next to the images and manifest.
+
+        Args:
+            source (str | bytes): Path to the PDF file, or its content as a
+                bytes-like object
+            start_page (int): Page to start extraction from (1-indexed)
+            max_pages (int): Maximum number of pages to extract
+            output (str): Path of a ``.zip`` file, or of a directory, to write to
+            thumbnail_size (int): Longest side of thumbnails in pixels, 0 for none
+
+        Returns:
+            dict: The manifest, with the document ``page_count``
 
-            # Attempt to open the document with detailed logging
+        Raises:
+            ParserError: If the document cannot be processed
+        """
+        from .images import ImageExtractor, open_writer
+        from .render import markdown_document
+
+        start_time = time.perf_counter()
+        info = {}
+        extractor = ImageExtractor(open_writer(output), thumbnail_size)
+
+        def on_page(doc, i, result):
+            if result.error is not None:
+                return
             try:
-                doc = fitz.open(file_path)
-                logger.info(
-                    f"Successfully opened document. Page count: {doc.page_count}"
-                )
+                extractor.add_page(doc, doc[i])
             except Exception as e:
-                detailed_error = traceback.format_exc()
-                logger.error(
-                    f"PyMuPDF could not open the document: {str(e)}\n{detailed_error}"
-                )
-                return f"# Error\n\nPyMuPDF could not open the document: {str(e)}\n\n```\n{detailed_error}\n```"
+                logger.error(f"Error extracting images from page {i + 1}: {str(e)}")
 
-            # Calculate page range (convert from 1-indexed to 0-indexed)
-            start_idx = start_page - 1
-            end_idx = min(start_idx + max_pages, doc.page_count)
+        try:
+            pages = list(self._iter_pages(source, start_page, max_pages, info, on_page))
+        except BaseException:
+            extractor.writer.close()
+            raise
+        result = ParseResult(
+            self.name,
+            pages=pages,
+            info=info,
+            duration_ms=(time.perf_counter() - start_time) * 1000,
+        )
+        manifest = extractor.finish({"content.md": markdown_document(result).encode()})
+        logger.info(
+            f"Extracted {manifest['image_count']} unique images "
+            f"({manifest['placements']} placements) from {len(pages)} pages"
+        )
+        return {**manifest, "page_count": info.get("page_count")}
 
-            if start_idx >= doc.page_count:
-                doc.close()
-                logger.error(
-                    f"Start page ({start_page}) exceeds document length ({doc.page_count} pages)"
-                )
-                return f"# Error\n\nStart page ({start_page}) exceeds document length ({doc.page_count} pages)."
+    def iter_pages(self, source, start_page, max_pages, info=None):
+        """
+        Extract text from a PDF file page by page using PyMuPDF.
+
+        Args:
+            source (str | bytes): Path to the PDF file, or its content as a
+                bytes-like object
+            start_page (int): Page to start extraction from (1-indexed)
+            max_pages (int): Maximum number of pages to extract
+            info (dict): Optional dict filled in with document details
 
-            logger.info(
-                f"Extracting text from pages {start_page} to {min(start_page + max_pages - 1, doc.page_count)}"
+        Yields:
+            PageResult: One result per extracted page
+        """
+        return self._iter_pages(source, start_page, max_pages, info)
+
+    def _open_document(self, source, info):
+        """
+        Check and open a document.
+
+        Returns:
+            fitz.Document: The open document; the caller must close it
+
+        Raises:
+            ParserError: If PyMuPDF is missing or the document cannot be opened
+        """
+        try:
+            # Import here to avoid errors if PyMuPDF is not installed
+            import fitz  # PyMuPDF
+        except ImportError:
+            logger.error("PyMuPDF (fitz) is not installed")
+            raise ParserUnavailableError(
+                "PyMuPDF (fitz) is not installed. Install with: `pip install pymupdf`"
             )
 
-            text = "# Document Analysis with PyMuPDF\n\n"
-            text += "## Document Information\n\n"
+        logger.info(f"Opening PDF document: {describe(source)}")
+
+        # Check if file exists and can be read
+        if is_path(source) and not os.path.isfile(source):
+            logger.error(f"File not found: {source}")
+            raise InvalidDocumentError(f"File not found: {source}")
+
+        # Try to get file info before opening it fully
+        try:
+            file_size = source_size(source)
+            logger.info(f"File size: {file_size} bytes")
+            if file_size == 0:
+                logger.error("Empty PDF file detected (0 bytes)")
+                raise InvalidDocumentError("Empty PDF file detected (0 bytes).")
+        except OSError as e:
+            logger.warning(f"Could not check file size: {str(e)}")
+
+        # Verify file is readable
+        try:
+            header = read_header(source)
+        except Exception as e:
+            logger.error(f"Cannot read file: {str(e)}")
+            raise InvalidDocumentError(f"Cannot read file: {str(e)}")
+        if header != b"%PDF-":
+            logger.error("Invalid PDF file: File does not begin with %PDF- header")
+            raise InvalidDocumentError("Invalid PDF file: File does not begin with %PDF- header.")
+
+        # Attempt to open the document with detailed logging
+        try:
+            with stage(info, "open"):
+                if is_path(source):
+                    doc = fitz.open(source)
+                else:
+                    # Open in-memory uploads directly, without a temporary file
+                    doc = fitz.open(stream=source, filetype="pdf")
+            logger.info(f"Successfully opened document. Page count: {doc.page_count}")
+        except Exception as e:
+            detailed_error = traceback.format_exc()
+            logger.error(
+                f"PyMuPDF could not open the document: {str(e)}\n{detailed_error}"
+            )
+            raise InvalidDocumentError(
+                f"PyMuPDF could not open the document: {str(e)}", detailed_error
+            )
+        return doc
+
+    @staticmethod
+    def _page_indices(doc, start_page, max_pages):
+        """
+        Return the 0-indexed pages of a 1-indexed range, clipped to the document.
+
+        Raises:
+            PageRangeError: If the range starts after the last page
+        """
+        # Calculate page range (convert from 1-indexed to 0-indexed)
+        start_idx = start_page - 1
+        end_idx = min(start_idx + max_pages, doc.page_count)
+
+        if start_idx >= doc.page_count:
+            logger.error(
+                f"Start page ({start_page}) exceeds document length ({doc.page_count} pages)"
+            )
+            raise PageRangeError(
+                f"Start page ({start_page}) exceeds document length ({doc.page_count} pages)."
+            )
+
+        logger.info(
+            f"Extracting text from pages {start_page} to {min(start_page + max_pages - 1, doc.page_count)}"
+        )
+        return range(start_idx, end_idx)
+
+    def open_handle(self, source, info=None):
+        doc = self._open_document(source, info if info is not None else {})
+        handle_info = {
+            "page_count": doc.page_count,
+            "metadata": {key: str(value) for key, value in (doc.metadata or {}).items() if value},
+        }
+        return DocumentHandle(
+            doc, doc.page_count, source_size(source), info=handle_info, closers=[doc.close]
+        )
+
+    def iter_handle_pages(self, handle, start_page, max_pages, info=None):
+        return self._iter_handle_pages(handle, start_page, max_pages, info)
+
+    def _iter_pages(self, source, start_page, max_pages, info=None, on_page=None):
+        """`iter_pages`, calling ``on_page(doc, index, result)`` for every extracted page."""
+        if info is None:
+            info = {}
+
+        handle = self.open_handle(source, info)
+        try:
+            yield from self._iter_handle_pages(handle, start_page, max_pages, info, on_page)
+        finally:
+            handle.close()
 
-            # Add document metadata if available
-            if doc.metadata:
-                text += "### Metadata\n\n"
-                for key, value in doc.metadata.items():
-                    if value:  # Only add non-empty values
-                        text += f"- **{key}**: {value}\n"
-                text += "\n"
+        logger.success("PyMuPDF extraction completed successfully")
+
+    def _iter_handle_pages(self, handle, start_page, max_pages, info=None, on_page=None):
+        if info is None:
+            info = {}
+
+        doc = handle.document
+        try:
+            page_indices = self._page_indices(doc, start_page, max_pages)
+            info.update(handle.info)
 
             # Extract text page by page with detailed logging
-            text += "## Extracted Text\n\n"
-            for i in range(start_idx, end_idx):
-                try:
-                    logger.info(f"Processing page {i+1}")
-                    page = doc[i]
+            for i in page_indices:
+                result = self._extract_page(doc, i)
+                if on_page is not None:
+                    on_page(doc, i, result)
+                yield result
 
-                    # Use plain text format instead of markdown (which isn't directly supported)
-                    # According to docs, we should use PyMuPDF4LLM for proper markdown conversion
-                    try:
-                        page_text = page.get_text("text")
-                        logger.debug("Successfully extracted text with 'text' format")
-                    except Exception as text_error:
-                        logger.error(
-                            f"Error extracting text with 'text' format: {str(text_error)}"
-                        )
-                        # Try alternative formats if 'text' fails
-                        try:
-                            page_text = page.get_text()  # Default format
-                            logger.debug(
-                                "Successfully extracted text with default format"
-                            )
-                        except Exception as default_error:
-                            logger.error(
-                                f"Error extracting text with default format: {str(default_error)}"
-                            )
-                            page_text = "*Could not extract text from this page due to format errors*"
-
-                    # Check if we got any text
-                    if not page_text.strip():
-                        logger.warning(f"No text extracted from page {i+1}")
-                        page_text = "*No text could be extracted from this page.*"
-
-                    # Format as markdown by wrapping in code block for better readability
-                    text += f"### Page {i+1}\n\n```\n{page_text}\n```\n\n"
-                except Exception as e:
-                    detailed_error = traceback.format_exc()
+        except ParserError:
+            raise
+        except Exception as e:
+            detailed_error = traceback.format_exc()
+            logger.error(
+                f"Unexpected error in PyMuPDF parser: {str(e)}\n{detailed_error}"
+            )
+            raise ParserError(
+                f"Failed to extract text with PyMuPDF: {str(e)}", detailed_error
+            )
+
+    @staticmethod
+    def _extract_page(doc, i):
+        """Extract the text and image count of page ``i`` (0-indexed)."""
+        try:
+            logger.info(f"Processing page {i+1}")
+            page = doc[i]
+
+            # Use plain text format instead of markdown (which isn't directly supported)
+            # According to docs, we should use PyMuPDF4LLM for proper markdown conversion
+            try:
+                page_text = page.get_text("text")
+                logger.debug("Successfully extracted text with 'text' format")
+            except Exception as text_error:
+                logger.error(
+                    f"Error extracting text with 'text' format: {str(text_error)}"
+                )
+                # Try alternative formats if 'text' fails
+                try:
+                    page_text = page.get_text()  # Default format
+                    logger.debug("Successfully extracted text with default format")
+                except Exception as default_error:
                     logger.error(
-                        f"Error extracting text from page {i+1}: {str(e)}\n{detailed_error}"
+                        f"Error extracting text with default format: {str(default_error)}"
+                    )
+                    return PageResult(
+                        i + 1, error="Could not extract text from this page due to format errors"
                     )
-                    text += f"### Page {i+1}\n\n*Error extracting text: {str(e)}*\n\n"
 
-            # Try to extract images if possible (not always available)
-            try:
-                image_count = 0
-                for i in range(start_idx, end_idx):
-                    page = doc[i]
-                    image_list = page.get_images()
-                    image_count += len(image_list)
+            # Check if we got any text
+            if not page_text.strip():
+                logger.warning(f"No text extracted from page {i+1}")
 
-                if image_count > 0:
-                    text += "## Images\n\n"
-                    text += f"The document contains approximately {image_count} images in the selected pages.\n\n"
+            # Count images in the same pass as the text
+            try:
+                image_count = len(page.get_images())
             except Exception as e:
                 logger.error(f"Error counting images: {str(e)}")
+                image_count = 0
 
-            doc.close()
-            logger.success("PyMuPDF extraction completed successfully")
-            return text
-
-        except ImportError:
-            logger.error("PyMuPDF (fitz) is not installed")
-            return "# Error\n\nPyMuPDF (fitz) is not installed. Install with: `pip install pymupdf`"
+            return PageResult(i + 1, text=page_text, image_count=image_count)
         except Exception as e:
             detailed_error = traceback.format_exc()
             logger.error(
-                f"Unexpected error in PyMuPDF parser: {str(e)}\n{detailed_error}"
+                f"Error extracting text from page {i+1}: {str(e)}\n{detailed_error}"
             )
-            return f"# Error\n\nFailed to extract text with PyMuPDF: {str(e)}\n\n```\n{detailed_error}\n```"
+            return PageResult(i + 1, error=str(e))
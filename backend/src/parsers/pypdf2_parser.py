@@ -3,6 +3,16 @@ import traceback
 from loguru import logger
 
 from .base_parser import PDFParser
+from .errors import (
+    InvalidDocumentError,
+    PageRangeError,
+    ParserError,
+    ParserUnavailableError,
+)
+from .handles import DocumentHandle
+from .profiling import stage
+from .results import PageResult
+from .source import describe, open_source, source_size
 
 
 class PyPDF2Parser(PDFParser):
@@ -10,6 +20,12 @@ class PyPDF2Parser(PDFParser):
     PDF parser implementation using PyPDF2.
     """
 
+    library = "pypdf"
+    library_modules = ("pypdf",)
+    shardable = True
+    supports_handles = True
+    revision = 2
+
     @property
     def name(self):
         return "PyPDF2"
@@ -25,105 +41,152 @@ class PyPDF2Parser(PDFParser):
     def link(self):
         return "https://pypdf2.readthedocs.io/"
 
-    def parse(self, file_path, start_page, max_pages):
+    def count_pages(self, source):
+        import pypdf as PyPDF2
+
+        try:
+            with open_source(source) as file:
+                return len(PyPDF2.PdfReader(file).pages)
+        except Exception as e:
+            logger.warning(f"Cannot count pages with PyPDF2: {str(e)}")
+            return None
+
+    def open_handle(self, source, info=None):
+        if info is None:
+            info = {}
+
+        try:
+            # Import here to avoid errors if PyPDF2 is not installed
+            import pypdf as PyPDF2
+        except ImportError:
+            logger.error("PyPDF2 is not installed")
+            raise ParserUnavailableError(
+                "PyPDF2 is not installed. Install with: `pip install PyPDF2`"
+            )
+
+        logger.info(f"Opening PDF with PyPDF2: {describe(source)}")
+
+        try:
+            file = open_source(source)
+        except Exception as e:
+            detailed_error = traceback.format_exc()
+            logger.error(f"Error during PyPDF2 processing: {str(e)}\n{detailed_error}")
+            raise ParserError(
+                f"Failed to process PDF with PyPDF2: {str(e)}", detailed_error
+            )
+
+        try:
+            with stage(info, "open"):
+                reader = PyPDF2.PdfReader(file)
+                logger.info(
+                    f"Successfully opened document. Page count: {len(reader.pages)}"
+                )
+            handle_info = {
+                "page_count": len(reader.pages),
+                "encrypted": reader.is_encrypted,
+                "metadata": {
+                    key: str(value)
+                    for key, value in (reader.metadata or {}).items()
+                    if value
+                },
+            }
+        except PyPDF2.errors.PdfReadError as e:
+            file.close()
+            logger.error(f"PyPDF2 read error: {str(e)}")
+            raise InvalidDocumentError(f"PyPDF2 could not read this PDF: {str(e)}")
+        except Exception as e:
+            file.close()
+            detailed_error = traceback.format_exc()
+            logger.error(f"Error during PyPDF2 processing: {str(e)}\n{detailed_error}")
+            raise ParserError(
+                f"Failed to process PDF with PyPDF2: {str(e)}", detailed_error
+            )
+        return DocumentHandle(
+            reader,
+            len(reader.pages),
+            source_size(source),
+            info=handle_info,
+            closers=[file.close],
+        )
+
+    def iter_pages(self, source, start_page, max_pages, info=None):
         """
-        Extract text from a PDF file using PyPDF2.
+        Extract text from a PDF file page by page using PyPDF2.
 
         Args:
-            file_path (str): Path to the PDF file
+            source (str | bytes): Path to the PDF file, or its content as a
+                bytes-like object
             start_page (int): Page to start extraction from (1-indexed)
             max_pages (int): Maximum number of pages to extract
+            info (dict): Optional dict filled in with document details
 
-        Returns:
-            str: Extracted text in markdown format
+        Yields:
+            PageResult: One result per extracted page
         """
+        if info is None:
+            info = {}
+
+        handle = self.open_handle(source, info)
         try:
-            # Import here to avoid errors if PyPDF2 is not installed
-            import pypdf as PyPDF2
+            yield from self.iter_handle_pages(handle, start_page, max_pages, info)
+        finally:
+            handle.close()
 
-            logger.info(f"Opening PDF with PyPDF2: {file_path}")
+        logger.success("PyPDF2 extraction completed successfully")
 
-            with open(file_path, "rb") as file:
-                try:
-                    reader = PyPDF2.PdfReader(file)
-                    logger.info(
-                        f"Successfully opened document. Page count: {len(reader.pages)}"
-                    )
+    def iter_handle_pages(self, handle, start_page, max_pages, info=None):
+        if info is None:
+            info = {}
 
-                    # Calculate page range (convert from 1-indexed to 0-indexed)
-                    start_idx = start_page - 1
-                    end_idx = min(start_idx + max_pages, len(reader.pages))
+        import pypdf as PyPDF2
 
-                    if start_idx >= len(reader.pages):
-                        logger.error(
-                            f"Start page ({start_page}) exceeds document length ({len(reader.pages)} pages)"
-                        )
-                        return f"# Error\n\nStart page ({start_page}) exceeds document length ({len(reader.pages)} pages)."
+        reader = handle.document
+        try:
+            # Calculate page range (convert from 1-indexed to 0-indexed)
+            start_idx = start_page - 1
+            end_idx = min(start_idx + max_pages, len(reader.pages))
+
+            if start_idx >= len(reader.pages):
+                logger.error(
+                    f"Start page ({start_page}) exceeds document length ({len(reader.pages)} pages)"
+                )
+                raise PageRangeError(
+                    f"Start page ({start_page}) exceeds document length ({len(reader.pages)} pages)."
+                )
+
+            logger.info(
+                f"Extracting text from pages {start_page} to {min(start_page + max_pages - 1, len(reader.pages))}"
+            )
 
-                    logger.info(
-                        f"Extracting text from pages {start_page} to {min(start_page + max_pages - 1, len(reader.pages))}"
-                    )
+            info.update(handle.info)
 
-                    text = "# Document Analysis with PyPDF2\n\n"
-                    text += "## Document Information\n\n"
-                    text += f"- **Total Pages**: {len(reader.pages)}\n"
-                    text += (
-                        f"- **Encrypted**: {'Yes' if reader.is_encrypted else 'No'}\n\n"
-                    )
+            # Extract text page by page
+            for i in range(start_idx, end_idx):
+                try:
+                    logger.info(f"Processing page {i+1}")
+                    page = reader.pages[i]
+                    page_text = page.extract_text()
 
-                    # Add document metadata if available
-                    if reader.metadata:
-                        text += "### Metadata\n\n"
-                        for key, value in reader.metadata.items():
-                            if value:  # Only add non-empty values
-                                text += f"- **{key}**: {value}\n"
-                        text += "\n"
-
-                    # Extract text page by page
-                    text += "## Extracted Text\n\n"
-                    for i in range(start_idx, end_idx):
-                        try:
-                            logger.info(f"Processing page {i+1}")
-                            page = reader.pages[i]
-                            page_text = page.extract_text()
-
-                            # Check if we got any text
-                            if not page_text.strip():
-                                logger.warning(f"No text extracted from page {i+1}")
-                                page_text = (
-                                    "*No text could be extracted from this page.*"
-                                )
-
-                            # Convert to markdown-friendly format
-                            text += f"### Page {i+1}\n\n```\n{page_text}\n```\n\n"
-                        except Exception as e:
-                            detailed_error = traceback.format_exc()
-                            logger.error(
-                                f"Error extracting text from page {i+1}: {str(e)}\n{detailed_error}"
-                            )
-                            text += f"### Page {i+1}\n\n*Error extracting text: {str(e)}*\n\n"
-
-                    logger.success("PyPDF2 extraction completed successfully")
-                    return text
-
-                except PyPDF2.errors.PdfReadError as e:
-                    logger.error(f"PyPDF2 read error: {str(e)}")
-                    return f"# Error\n\nPyPDF2 could not read this PDF: {str(e)}"
+                    # Check if we got any text
+                    if not page_text.strip():
+                        logger.warning(f"No text extracted from page {i+1}")
+
+                    yield PageResult(i + 1, text=page_text)
                 except Exception as e:
                     detailed_error = traceback.format_exc()
                     logger.error(
-                        f"Error during PyPDF2 processing: {str(e)}\n{detailed_error}"
+                        f"Error extracting text from page {i+1}: {str(e)}\n{detailed_error}"
                     )
-                    return f"# Error\n\nFailed to process PDF with PyPDF2: {str(e)}\n\n```\n{detailed_error}\n```"
+                    yield PageResult(i + 1, error=str(e))
 
-        except ImportError:
-            logger.error("PyPDF2 is not installed")
-            return (
-                "# Error\n\nPyPDF2 is not installed. Install with: `pip install PyPDF2`"
-            )
+        except ParserError:
+            raise
+        except PyPDF2.errors.PdfReadError as e:
+            logger.error(f"PyPDF2 read error: {str(e)}")
+            raise InvalidDocumentError(f"PyPDF2 could not read this PDF: {str(e)}")
         except Exception as e:
             detailed_error = traceback.format_exc()
-            logger.error(
-                f"Unexpected error in PyPDF2 parser: {str(e)}\n{detailed_error}"
+            logger.error(f"Error during PyPDF2 processing: {str(e)}\n{detailed_error}")
+            raise ParserError(
+                f"Failed to process PDF with PyPDF2: {str(e)}", detailed_error
             )
-            return f"# Error\n\nFailed to extract text with PyPDF2: {str(e)}\n\n```\n{detailed_error}\n```"
@@ -0,0 +1,185 @@
+"""
+Registry of the available parsers.
+
+Parsers are declared by name and the import path of their class, and are only
+imported and instantiated when first used, so a process pays only for the
+parsers it actually runs. Other packages can add parsers by declaring an entry
+point in the ``ppp.parsers`` group, e.g. in their ``pyproject.toml``::
+
+    [project.entry-points."ppp.parsers"]
+    MyParser = "my_package.parser:MyParser"
+
+The entry point name is the parser name; its API ``parser_type`` is the
+lower-cased name.
+"""
+
+import importlib
+import threading
+import time
+from importlib import metadata
+
+from loguru import logger
+
+from .base_parser import PDFParser
+
+ENTRY_POINT_GROUP = "ppp.parsers"
+
+# Parsers shipped with the application, as "module:Class" relative to this package
+BUILTIN_PARSERS = {
+    "PyMuPDF": ".pymupdf_parser:PyMuPDFParser",
+    "PyPDF2": ".pypdf2_parser:PyPDF2Parser",
+    "PDFMiner": ".pdfminer_parser:PDFMinerParser",
+    "Docling": ".docling_parser:DoclingParser",
+}
+
+
+def _load_class(target):
+    """Import the parser class referenced by a "module:Class" string or an entry point."""
+    if isinstance(target, metadata.EntryPoint):
+        return target.load()
+    module_name, class_name = target.split(":")
+    module = importlib.import_module(module_name, package=__package__)
+    return getattr(module, class_name)
+
+
+class ParserRegistry:
+    """
+    Parsers by name, imported and instantiated on first use.
+
+    The registry also keeps what loading each parser cost, for the startup
+    report (`report`).
+    """
+
+    def __init__(self):
+        self._targets = {}
+        self._sources = {}
+        self._parsers = {}
+        self._timings = {}
+        self._errors = {}
+        self._lock = threading.Lock()
+
+    def register(self, name, target, source="builtin"):
+        """
+        Declare a parser without importing it.
+
+        Args:
+            name (str): Parser name, unique case-insensitively
+            target (str | EntryPoint): "module:Class" import path of the parser
+                class, or the entry point declaring it
+            source (str): Where the declaration comes from, for the report
+
+        Returns:
+            bool: False if a parser with the same name was already registered
+        """
+        if any(existing.lower() == name.lower() for existing in self._targets):
+            logger.warning(f"Parser {name} from {source} is already registered, ignoring it")
+            return False
+        self._targets[name] = target
+        self._sources[name] = source
+        return True
+
+    def discover(self):
+        """Register the parsers declared by installed packages as entry points."""
+        try:
+            entry_points = metadata.entry_points(group=ENTRY_POINT_GROUP)
+        except Exception as e:
+            logger.error(f"Cannot list parser entry points: {str(e)}")
+            return
+        for entry_point in entry_points:
+            self.register(entry_point.name, entry_point, source=f"entry point {entry_point.value}")
+
+    def names(self):
+        """Return the names of every registered parser, loaded or not."""
+        return list(self._targets)
+
+    def get(self, name):
+        """
+        Get a parser, importing and instantiating it on first use.
+
+        Args:
+            name (str): Parser name
+
+        Returns:
+            PDFParser: The parser, or None if it is unknown or cannot be loaded
+        """
+        parser = self._parsers.get(name)
+        if parser is not None:
+            return parser
+        if name not in self._targets:
+            return None
+
+        with self._lock:
+            if name in self._parsers:
+                return self._parsers[name]
+            if name in self._errors:
+                return None
+            start_time = time.perf_counter()
+            try:
+                parser_class = _load_class(self._targets[name])
+                if not (isinstance(parser_class, type) and issubclass(parser_class, PDFParser)):
+                    raise TypeError(f"{parser_class!r} is not a PDFParser subclass")
+                parser = parser_class()
+            except Exception as e:
+                logger.error(f"Cannot load parser {name}: {str(e)}")
+                self._errors[name] = str(e)
+                return None
+            self._timings[name] = {"import_ms": (time.perf_counter() - start_time) * 1000}
+            self._parsers[name] = parser
+            logger.info(f"Loaded parser {name} in {self._timings[name]['import_ms']:.1f} ms")
+            return parser
+
+    def preload(self, name):
+        """
+        Load a parser and import its underlying library ahead of the first request.
+
+        Args:
+            name (str): Parser name
+
+        Returns:
+            dict: ``import_ms`` and ``library_ms`` timings, or an ``error``
+        """
+        parser = self.get(name)
+        if parser is None:
+            return {"error": self._errors.get(name, "unknown parser")}
+        start_time = time.perf_counter()
+        try:
+            parser.preload()
+        except ImportError as e:
+            logger.warning(f"Cannot preload the library of {name}: {str(e)}")
+            return {**self._timings[name], "error": str(e)}
+        library_ms = (time.perf_counter() - start_time) * 1000
+        self._timings[name]["library_ms"] = library_ms
+        return dict(self._timings[name])
+
+    def report(self):
+        """
+        Describe the state of every parser.
+
+        Returns:
+            dict: Per parser, its ``source``, its ``state`` ("lazy", "loaded"
+                or "failed") and the timings or error of loading it
+        """
+        report = {}
+        for name in self._targets:
+            entry = {"source": self._sources[name]}
+            if name in self._parsers:
+                entry.update(state="loaded", **self._timings[name])
+            elif name in self._errors:
+                entry.update(state="failed", error=self._errors[name])
+            else:
+                entry["state"] = "lazy"
+            report[name] = entry
+        return report
+
+    def log_report(self):
+        """Log one line per parser with its state and load timings."""
+        for name, entry in self.report().items():
+            if entry["state"] == "loaded":
+                details = f"class {entry['import_ms']:.1f} ms"
+                if "library_ms" in entry:
+                    details += f", library {entry['library_ms']:.1f} ms"
+            elif entry["state"] == "failed":
+                details = entry["error"]
+            else:
+                details = "loaded on first use"
+            logger.info(f"Parser {name} ({entry['source']}): {entry['state']}, {details}")
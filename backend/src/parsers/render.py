@@ -0,0 +1,133 @@
+"""
+Markdown rendering of parser output.
+
+A document is rendered as a header, one section per page and a footer, so the
+pieces can be streamed to the client as soon as each page has been extracted.
+"""
+
+from .tables import table_markdown
+
+# Separates pages in plain text output, as in the output of ``pdftotext``
+PAGE_SEPARATOR = "\f"
+
+NO_TEXT = "*No text could be extracted from this page.*"
+
+
+def markdown_header(parser_name, info):
+    """
+    Render the document information that precedes the pages.
+
+    Args:
+        parser_name (str): Name of the parser that produced the document
+        info (dict): Document details filled in by ``PDFParser.iter_pages``
+
+    Returns:
+        str: Markdown text
+    """
+    text = f"# Document Analysis with {parser_name}\n\n"
+    text += "## Document Information\n\n"
+    if info.get("page_count") is not None:
+        text += f"- **Total Pages**: {info['page_count']}\n"
+    if info.get("encrypted") is not None:
+        text += f"- **Encrypted**: {'Yes' if info['encrypted'] else 'No'}\n"
+    text += "\n"
+
+    metadata = {key: value for key, value in info.get("metadata", {}).items() if value}
+    if metadata:
+        text += "### Metadata\n\n"
+        for key, value in metadata.items():
+            text += f"- **{key}**: {value}\n"
+        text += "\n"
+
+    text += "## Extracted Text\n\n"
+    return text
+
+
+def markdown_page(page, info):
+    """
+    Render one page.
+
+    Args:
+        page (PageResult): The extracted page
+        info (dict): Document details filled in by ``PDFParser.iter_pages``
+
+    Returns:
+        str: Markdown text
+    """
+    text = f"### Page {page.number}\n\n"
+    if page.error:
+        text += f"*Error extracting text: {page.error}*\n\n"
+    elif not page.text.strip():
+        text += f"{NO_TEXT}\n\n"
+    elif (page.format or info.get("page_format")) == "markdown":
+        # Parsers that understand layout already produce markdown paragraphs
+        text += f"{page.text}\n\n"
+    else:
+        text += f"```\n{page.text}\n```\n\n"
+
+    for table in page.tables:
+        text += f"#### Table {table['index']}\n\n"
+        if "error" in table:
+            text += f"*Error processing table {table['index']}: {table['error']}*\n\n"
+        elif "markdown" in table:
+            # Tables of plugins that render their own markdown
+            text += f"{table['markdown']}\n\n"
+        else:
+            text += f"{table_markdown(table)}\n\n"
+    return text
+
+
+def markdown_footer(info, image_count=0):
+    """
+    Render the document summary that follows the pages.
+
+    Args:
+        info (dict): Document details filled in by ``PDFParser.iter_pages``
+        image_count (int): Images counted on the rendered pages
+
+    Returns:
+        str: Markdown text
+    """
+    image_count = info.get("image_count", image_count)
+    if not image_count:
+        return ""
+    return (
+        "## Images\n\n"
+        f"The document contains approximately {image_count} images in the selected pages.\n\n"
+    )
+
+
+def markdown_document(result):
+    """
+    Render a whole `ParseResult`.
+
+    Returns:
+        str: Markdown text
+    """
+    parts = [markdown_header(result.parser, result.info)]
+    parts.extend(markdown_page(page, result.info) for page in result.pages)
+    parts.append(markdown_footer(result.info, result.image_count))
+    return "".join(parts)
+
+
+def text_document(result):
+    """
+    Render a `ParseResult` as plain text, without any markup.
+
+    Returns:
+        str: The text of each page, separated by form feeds
+    """
+    return PAGE_SEPARATOR.join(page.text for page in result.pages)
+
+
+def markdown_error(error):
+    """
+    Render a `ParserError`.
+
+    Returns:
+        str: Markdown text starting with ``# Error``
+    """
+    text = f"# Error\n\n{error.message}"
+    if error.details:
+        text += f"\n\n```\n{error.details}\n```"
+    return text
@@ -0,0 +1,123 @@
+"""
+Lightweight result objects produced by the parsers.
+"""
+
+from dataclasses import dataclass, field
+
+
+@dataclass(slots=True)
+class PageResult:
+    """
+    Content extracted from a single page.
+
+    Attributes:
+        number (int): Page number (1-indexed)
+        text (str): Extracted text, empty if the page has none
+        tables (list): Tables found on the page, as dicts with an ``index``
+            (1-based, document-wide) and either the structured table (see
+            `tables`), pre-rendered ``markdown`` or an ``error``
+        image_count (int): Number of images on the page
+        error (str): Error message if extraction of this page failed
+        format (str): Format of ``text`` when it differs from the document's
+            ``page_format``, as in results that mix parsers
+    """
+
+    number: int
+    text: str = ""
+    tables: list = field(default_factory=list)
+    image_count: int = 0
+    error: str | None = None
+    format: str | None = None
+
+
+@dataclass(slots=True)
+class ParseResult:
+    """
+    Result of parsing a range of pages of a document.
+
+    Rendering it as markdown or plain text is left to `render`, so callers
+    that only need the page text skip it entirely.
+
+    Attributes:
+        parser (str): Name of the parser that produced the result
+        pages (list): One `PageResult` per extracted page
+        info (dict): Document details filled in by ``PDFParser.iter_pages``
+            (``page_count``, ``metadata``, ``encrypted``, ``page_format``, ...)
+        duration_ms (float): Time spent extracting the pages
+        profile (dict): Stage and per-page timings of a profiled parse; not
+            part of `to_dict`, so it is never cached
+    """
+
+    parser: str
+    pages: list = field(default_factory=list)
+    info: dict = field(default_factory=dict)
+    duration_ms: float = 0.0
+    profile: dict | None = None
+
+    @property
+    def page_count(self):
+        """Number of pages in the whole document, or None if unknown."""
+        return self.info.get("page_count")
+
+    @property
+    def pages_processed(self):
+        """Number of pages actually extracted."""
+        return len(self.pages)
+
+    @property
+    def image_count(self):
+        """Number of images on the extracted pages."""
+        return self.info.get("image_count", sum(page.image_count for page in self.pages))
+
+    def to_dict(self):
+        """Return the result as JSON-serialisable data."""
+        data = {
+            "parser": self.parser,
+            "page_count": self.page_count,
+            "pages_processed": self.pages_processed,
+            "image_count": self.image_count,
+            "encrypted": self.info.get("encrypted"),
+            "metadata": self.info.get("metadata", {}),
+            "page_format": self.info.get("page_format", "text"),
+            "duration_ms": self.duration_ms,
+            "pages": [
+                {
+                    "number": page.number,
+                    "text": page.text,
+                    "tables": page.tables,
+                    "image_count": page.image_count,
+                    "error": page.error,
+                    "format": page.format,
+                }
+                for page in self.pages
+            ],
+        }
+        if "routing" in self.info:
+            data["routing"] = self.info["routing"]
+        return data
+
+    @classmethod
+    def from_dict(cls, data):
+        """Rebuild a result from the output of `to_dict`."""
+        info = {
+            "page_count": data["page_count"],
+            "metadata": data["metadata"],
+            "page_format": data["page_format"],
+            "image_count": data["image_count"],
+        }
+        if data["encrypted"] is not None:
+            info["encrypted"] = data["encrypted"]
+        if "routing" in data:
+            info["routing"] = data["routing"]
+        pages = [
+            PageResult(
+                page["number"],
+                text=page["text"],
+                tables=page["tables"],
+                image_count=page["image_count"],
+                error=page["error"],
+                format=page.get("format"),
+            )
+            for page in data["pages"]
+        ]
+        return cls(data["parser"], pages=pages, info=info, duration_ms=data["duration_ms"])
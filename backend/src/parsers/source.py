@@ -0,0 +1,99 @@
+"""
+Helpers for the kinds of PDF sources the parsers accept.
+
+A source is either a path to a PDF file or a bytes-like object (``bytes``,
+``bytearray`` or ``memoryview``) holding the whole document in memory.
+In-memory sources are read in place, without copying them into a file.
+"""
+
+import io
+import os
+
+
+def is_path(source):
+    """Return True if the source is a path rather than an in-memory buffer."""
+    return isinstance(source, (str, os.PathLike))
+
+
+def describe(source):
+    """Return a short description of the source for log messages."""
+    if is_path(source):
+        return str(source)
+    return f"<in-memory PDF, {memoryview(source).nbytes} bytes>"
+
+
+def source_size(source):
+    """Return the size of the source in bytes."""
+    if is_path(source):
+        return os.path.getsize(source)
+    return memoryview(source).nbytes
+
+
+def read_header(source, size=5):
+    """Return the first ``size`` bytes of the source."""
+    if is_path(source):
+        with open(source, "rb") as f:
+            return f.read(size)
+    return bytes(memoryview(source)[:size])
+
+
+class BufferReader(io.RawIOBase):
+    """
+    A read-only, seekable binary file over a bytes-like object.
+
+    Unlike ``io.BytesIO(bytearray_or_memoryview)`` the buffer is not copied.
+    """
+
+    def __init__(self, buffer):
+        super().__init__()
+        self._view = memoryview(buffer).cast("B")
+        self._pos = 0
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def readinto(self, b):
+        data = self._view[self._pos : self._pos + len(b)]
+        n = len(data)
+        b[:n] = data
+        self._pos += n
+        return n
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_SET:
+            position = offset
+        elif whence == io.SEEK_CUR:
+            position = self._pos + offset
+        elif whence == io.SEEK_END:
+            position = len(self._view) + offset
+        else:
+            raise ValueError(f"Invalid whence: {whence}")
+        if position < 0:
+            raise ValueError(f"Negative seek position {position}")
+        self._pos = position
+        return position
+
+    def tell(self):
+        return self._pos
+
+    def close(self):
+        self._view.release()
+        super().close()
+
+
+def open_source(source):
+    """
+    Open the source as a binary file object.
+
+    Args:
+        source (str | bytes | bytearray | memoryview): The PDF source
+
+    Returns:
+        A readable, seekable binary file object; the caller must close it
+    """
+    if is_path(source):
+        return open(source, "rb")
+    return io.BufferedReader(BufferReader(source))
@@ -0,0 +1,160 @@
+"""
+Columnar storage of text spans and their geometry.
+
+Spans (or words) are appended to typed arrays, one per attribute, instead of
+one object per span, and written as an ``.npz`` archive of NumPy arrays:
+
+==================  =======  ================================================
+Array               dtype    Content
+==================  =======  ================================================
+``format_version``  int32    `FORMAT_VERSION`, a single value
+``page_number``     int32    Number (1-indexed) of every extracted page
+``page_width``      float32  Width of every extracted page, in points
+``page_height``     float32  Height of every extracted page, in points
+``page``            int32    Page number of every span
+``x0 y0 x1 y1``     float32  Bounding box of every span, in points
+``size``            float32  Font size of every span (0 for words)
+``flags``           int32    PyMuPDF font flags of every span (0 for words)
+``font``            int32    Index of the font in ``fonts`` (-1 for words)
+``block line``      int32    Block and line number of every span on its page
+``text``            uint8    UTF-8 text of every span, concatenated
+``text_offsets``    int64    Span ``i`` is ``text[text_offsets[i]:text_offsets[i + 1]]``
+``fonts``           uint8    UTF-8 font names, concatenated
+``font_offsets``    int64    Offsets of the font names, as for ``text``
+==================  =======  ================================================
+
+Strings are stored as UTF-8 blobs with offsets, so reading the archive never
+needs pickle (``numpy.load(..., allow_pickle=False)`` works).
+"""
+
+import io
+from array import array
+
+# Bump when the layout of the archive changes
+FORMAT_VERSION = 1
+
+GRANULARITIES = ("spans", "words")
+
+_FLOAT_COLUMNS = ("x0", "y0", "x1", "y1", "size")
+_INT_COLUMNS = ("page", "flags", "font", "block", "line")
+
+
+class SpanColumns:
+    """
+    Spans of a range of pages, one typed array per attribute.
+
+    Attributes:
+        granularity (str): ``"spans"`` (runs of text with one font) or ``"words"``
+    """
+
+    def __init__(self, granularity="spans"):
+        self.granularity = granularity
+        self.page_number = array("i")
+        self.page_width = array("f")
+        self.page_height = array("f")
+        self.columns = {name: array("f") for name in _FLOAT_COLUMNS}
+        self.columns.update({name: array("i") for name in _INT_COLUMNS})
+        self.text = bytearray()
+        self.text_offsets = array("q", [0])
+        self._fonts = {}
+
+    def __len__(self):
+        return len(self.text_offsets) - 1
+
+    def add_page(self, number, width, height):
+        """Record an extracted page, including pages without any span."""
+        self.page_number.append(number)
+        self.page_width.append(width)
+        self.page_height.append(height)
+
+    def add(self, page, bbox, text, block, line, font=None, size=0.0, flags=0):
+        """Append one span."""
+        columns = self.columns
+        columns["page"].append(page)
+        x0, y0, x1, y1 = bbox
+        columns["x0"].append(x0)
+        columns["y0"].append(y0)
+        columns["x1"].append(x1)
+        columns["y1"].append(y1)
+        columns["size"].append(size)
+        columns["flags"].append(flags)
+        columns["font"].append(-1 if font is None else self._fonts.setdefault(font, len(self._fonts)))
+        columns["block"].append(block)
+        columns["line"].append(line)
+        self.text += text.encode("utf-8")
+        self.text_offsets.append(len(self.text))
+
+    def add_page_spans(self, page):
+        """
+        Append every span (or word) of a PyMuPDF page.
+
+        Args:
+            page (fitz.Page): The page
+        """
+        number = page.number + 1
+        self.add_page(number, page.rect.width, page.rect.height)
+        if self.granularity == "words":
+            for x0, y0, x1, y1, word, block, line, _ in page.get_text("words"):
+                self.add(number, (x0, y0, x1, y1), word, block, line)
+            return
+        for block_number, block in enumerate(page.get_text("dict")["blocks"]):
+            if block.get("type") != 0:
+                continue
+            for line_number, line in enumerate(block["lines"]):
+                for span in line["spans"]:
+                    self.add(
+                        number,
+                        span["bbox"],
+                        span["text"],
+                        block_number,
+                        line_number,
+                        font=span["font"],
+                        size=span["size"],
+                        flags=span["flags"],
+                    )
+
+    def to_arrays(self):
+        """
+        Returns:
+            dict: The NumPy arrays of the archive, by name
+        """
+        import numpy as np
+
+        fonts = bytearray()
+        font_offsets = [0]
+        for name in self._fonts:
+            fonts += name.encode("utf-8")
+            font_offsets.append(len(fonts))
+
+        arrays = {
+            "format_version": np.array([FORMAT_VERSION], dtype=np.int32),
+            "page_number": np.frombuffer(self.page_number, dtype=np.int32),
+            "page_width": np.frombuffer(self.page_width, dtype=np.float32),
+            "page_height": np.frombuffer(self.page_height, dtype=np.float32),
+            "text": np.frombuffer(self.text, dtype=np.uint8),
+            "text_offsets": np.frombuffer(self.text_offsets, dtype=np.int64),
+            "fonts": np.frombuffer(fonts, dtype=np.uint8),
+            "font_offsets": np.array(font_offsets, dtype=np.int64),
+        }
+        for name in _FLOAT_COLUMNS:
+            arrays[name] = np.frombuffer(self.columns[name], dtype=np.float32)
+        for name in _INT_COLUMNS:
+            arrays[name] = np.frombuffer(self.columns[name], dtype=np.int32)
+        return arrays
+
+    def to_npz(self, compress=False):
+        """
+        Write the columns as an ``.npz`` archive.
+
+        Args:
+            compress (bool): Deflate the arrays (smaller, slower to write)
+
+        Returns:
+            bytes: The archive
+        """
+        import numpy as np
+
+        buffer = io.BytesIO()
+        save = np.savez_compressed if compress else np.savez
+        save(buffer, **self.to_arrays())
+        return buffer.getvalue()
@@ -0,0 +1,142 @@
+"""
+Tables extracted by the parsers, as structured data, and their renderings.
+
+A table is a dict with its document-wide ``index`` (1-based), the ``page`` it
+starts on, its ``bbox`` on that page (``[x0, y0, x1, y1]`` in points, origin
+at the top left), ``num_rows``, ``num_cols`` and ``cells``. Every cell has its
+``row`` and ``col`` (0-based), ``row_span``, ``col_span``, ``text``,
+``column_header`` and ``row_header`` flags and, when known, a ``bbox``.
+
+Renderings (markdown, CSV, HTML) are only produced when they are asked for.
+"""
+
+import csv
+import html
+import io
+
+# Formats a table can be rendered to, mapped to their media types
+FORMATS = {
+    "markdown": "text/markdown; charset=utf-8",
+    "csv": "text/csv; charset=utf-8",
+    "html": "text/html; charset=utf-8",
+}
+
+
+def table_rows(table):
+    """
+    Lay the cells of a table out on a grid.
+
+    Cells spanning several rows or columns fill every position they cover.
+
+    Returns:
+        list: One list of cell texts per row
+    """
+    rows = [["" for _ in range(table["num_cols"])] for _ in range(table["num_rows"])]
+    for cell in table["cells"]:
+        for row in range(cell["row"], min(cell["row"] + cell["row_span"], table["num_rows"])):
+            for col in range(cell["col"], min(cell["col"] + cell["col_span"], table["num_cols"])):
+                rows[row][col] = cell["text"]
+    return rows
+
+
+def _header_row_count(table):
+    """Number of leading rows made only of column headers."""
+    header_rows = {cell["row"] for cell in table["cells"] if cell["column_header"]}
+    count = 0
+    while count in header_rows:
+        count += 1
+    return count
+
+
+def _markdown_cell(text):
+    return " ".join(text.replace("|", "\\|").split())
+
+
+def table_markdown(table):
+    """
+    Render a table as a markdown (GFM) table.
+
+    The leading column header rows are merged into the header line; tables
+    without headers get an empty one, as markdown requires it.
+
+    Returns:
+        str: Markdown text
+    """
+    rows = table_rows(table)
+    if not rows or not table["num_cols"]:
+        return ""
+    header_count = _header_row_count(table)
+    if header_count:
+        header = [
+            " ".join(dict.fromkeys(row[col] for row in rows[:header_count] if row[col]))
+            for col in range(table["num_cols"])
+        ]
+        body = rows[header_count:]
+    else:
+        header = [""] * table["num_cols"]
+        body = rows
+
+    lines = [
+        "| " + " | ".join(_markdown_cell(text) for text in header) + " |",
+        "|" + "---|" * table["num_cols"],
+    ]
+    lines.extend("| " + " | ".join(_markdown_cell(text) for text in row) + " |" for row in body)
+    return "\n".join(lines)
+
+
+def table_csv(table):
+    """
+    Render a table as CSV, one record per row of the grid.
+
+    Returns:
+        str: CSV text
+    """
+    output = io.StringIO()
+    csv.writer(output).writerows(table_rows(table))
+    return output.getvalue()
+
+
+def table_html(table):
+    """
+    Render a table as an HTML ``<table>``, keeping row and column spans.
+
+    Returns:
+        str: HTML text
+    """
+    cells_by_row = {}
+    for cell in sorted(table["cells"], key=lambda cell: (cell["row"], cell["col"])):
+        cells_by_row.setdefault(cell["row"], []).append(cell)
+
+    lines = ["<table>"]
+    for row in range(table["num_rows"]):
+        parts = []
+        for cell in cells_by_row.get(row, []):
+            tag = "th" if cell["column_header"] or cell["row_header"] else "td"
+            attributes = ""
+            if cell["row_span"] > 1:
+                attributes += f' rowspan="{cell["row_span"]}"'
+            if cell["col_span"] > 1:
+                attributes += f' colspan="{cell["col_span"]}"'
+            parts.append(f"<{tag}{attributes}>{html.escape(cell['text'])}</{tag}>")
+        lines.append(f"<tr>{''.join(parts)}</tr>")
+    lines.append("</table>")
+    return "\n".join(lines)
+
+
+def render_table(table, output_format):
+    """
+    Render a table in one of `FORMATS`.
+
+    Returns:
+        str: The rendered table
+
+    Raises:
+        ValueError: If the format is unknown
+    """
+    if output_format == "markdown":
+        return table_markdown(table)
+    if output_format == "csv":
+        return table_csv(table)
+    if output_format == "html":
+        return table_html(table)
+    raise ValueError(f"Unknown table format: {output_format}")
@@ -0,0 +1,485 @@
+"""
+Worker processes that can be stopped while they run a job.
+
+A job submitted to `concurrent.futures.ProcessPoolExecutor` cannot be stopped
+once it has started: a parser stuck on a pathological document keeps its
+worker busy until it finishes, however long that takes. `ProcessExecutor`
+runs every job on a worker process it tracks, so `ProcessExecutor.kill` can
+stop a job that overran its deadline, or whose client went away, by killing
+that worker. A new worker takes its place on the next job.
+
+Parser libraries (and Docling models) accumulate memory over thousands of
+documents, so workers are also recycled: after ``max_jobs`` jobs, or once
+their resident memory exceeds ``max_rss_bytes``, a worker is retired as soon
+as its current job has finished and a fresh one is started in its place.
+
+Every worker occupies a slot, which its replacement takes over.
+`ProcessExecutor.submit_to` runs a job on the worker of a given slot, so jobs
+that benefit from state kept by a worker (such as an open document) can be
+sent to the same worker every time.
+"""
+
+import multiprocessing
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Executor, Future, ThreadPoolExecutor
+from multiprocessing.connection import wait
+
+from loguru import logger
+
+from src import metrics
+
+
+class WorkerKilledError(Exception):
+    """Raised for a job whose worker was killed to stop it."""
+
+
+class WorkerDiedError(RuntimeError):
+    """Raised for a job whose worker exited unexpectedly, e.g. after a native crash."""
+
+
+# Workers are started one at a time so that, with the fork start method, no
+# worker inherits the pipe of another one being started, which would keep that
+# pipe open after its worker has died
+_spawn_lock = threading.Lock()
+
+
+def process_rss(pid):
+    """
+    Get the resident memory of a process.
+
+    Returns:
+        int: Bytes, or None if it cannot be read (e.g. the process has exited)
+    """
+    try:
+        with open(f"/proc/{pid}/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        pass
+    try:
+        import psutil
+    except ImportError:
+        return None
+    try:
+        return psutil.Process(pid).memory_info().rss
+    except psutil.Error:
+        return None
+
+
+def _send_reply(conn, reply):
+    try:
+        conn.send(reply)
+    except Exception as e:
+        # The result or exception cannot be pickled
+        conn.send((False, RuntimeError(f"Cannot return the result of the job: {str(e)}")))
+
+
+def _worker_main(conn, initializer, initargs):
+    """
+    Run the initializer, reporting its result on ``conn``, then run jobs
+    received on ``conn`` until told to stop or the API process is gone.
+    """
+    # The API process, or the fork server started by it
+    parent_pid = os.getppid()
+    try:
+        reply = (True, initializer(*initargs) if initializer is not None else None)
+    except BaseException as e:
+        reply = (False, e)
+    _send_reply(conn, reply)
+    while True:
+        while not conn.poll(1.0):
+            if os.getppid() != parent_pid:
+                return
+        try:
+            message = conn.recv()
+        except (EOFError, OSError):
+            return
+        if message is None:
+            return
+        fn, args = message
+        try:
+            reply = (True, fn(*args))
+        except BaseException as e:
+            reply = (False, e)
+        _send_reply(conn, reply)
+
+
+class _Worker:
+    """A worker process and the pipe it receives jobs on."""
+
+    def __init__(self, context, slot, initializer, initargs):
+        parent_conn, child_conn = context.Pipe()
+        self.process = context.Process(
+            target=_worker_main,
+            args=(child_conn, initializer, initargs),
+        )
+        with _spawn_lock:
+            self.process.start()
+            child_conn.close()
+        self.conn = parent_conn
+        # Position of the worker in its executor, taken over by its replacement
+        self.slot = slot
+        self.pid = self.process.pid
+        self.started_at = time.time()
+        self.jobs = 0
+        self.killed = False
+        # Reply of the initializer, once received
+        self._initialized = None
+
+    @property
+    def alive(self):
+        return not self.killed and self.process.is_alive()
+
+    @property
+    def rss(self):
+        """Current resident memory of the worker in bytes, or None if unknown."""
+        return process_rss(self.pid)
+
+    def stats(self):
+        return {
+            "slot": self.slot,
+            "pid": self.pid,
+            "jobs": self.jobs,
+            "rss_bytes": self.rss,
+            "uptime_seconds": round(time.time() - self.started_at, 1),
+        }
+
+    def _receive(self):
+        """
+        Wait for the next reply of the worker.
+
+        Raises:
+            WorkerKilledError: If the worker was killed meanwhile
+            WorkerDiedError: If the worker exited without replying
+        """
+        try:
+            wait([self.conn, self.process.sentinel])
+            if not self.conn.poll():
+                raise EOFError
+            return self.conn.recv()
+        except (EOFError, OSError):
+            if self.killed:
+                raise WorkerKilledError(f"Worker {self.pid} was killed")
+            raise WorkerDiedError(f"Worker {self.pid} exited with code {self.process.exitcode}")
+
+    def wait_initialized(self):
+        """
+        Wait until the worker has run its initializer.
+
+        Returns:
+            The result of the initializer
+
+        Raises:
+            WorkerKilledError: If the worker was killed meanwhile
+            WorkerDiedError: If the worker exited while initializing
+            Exception: Raised by the initializer
+        """
+        if self._initialized is None:
+            self._initialized = self._receive()
+        ok, value = self._initialized
+        if not ok:
+            raise value
+        return value
+
+    def call(self, fn, args):
+        """
+        Run ``fn(*args)`` on the worker and wait for its result.
+
+        Raises:
+            WorkerKilledError: If the worker was killed meanwhile
+            WorkerDiedError: If the worker exited without returning a result
+        """
+        if self._initialized is None:
+            self._initialized = self._receive()
+        try:
+            self.conn.send((fn, args))
+        except OSError:
+            # The worker has exited; its exit code is reported by `_receive`
+            pass
+        ok, value = self._receive()
+        self.jobs += 1
+        if not ok:
+            raise value
+        return value
+
+    def kill(self):
+        self.killed = True
+        self.process.kill()
+
+    def stop(self, timeout=1.0):
+        """Ask the worker to exit once idle, killing it if it does not."""
+        try:
+            self.conn.send(None)
+        except (OSError, ValueError):
+            pass
+        self.process.join(timeout)
+        if self.process.is_alive():
+            self.kill()
+            self.process.join()
+        self.conn.close()
+
+
+class ProcessExecutor(Executor):
+    """
+    An executor running jobs on worker processes, any of which can be killed.
+
+    Workers are started on demand, up to ``max_workers``, or all at once by
+    `start_workers`, and every worker runs ``initializer(*initargs)`` once
+    before its first job. Jobs submitted
+    with `submit` run on any idle worker, jobs submitted with `submit_to` on
+    the worker of their slot, waiting for it if it is busy.
+    """
+
+    def __init__(
+        self, max_workers, initializer=None, initargs=(), name="process", max_jobs=0, max_rss_bytes=0
+    ):
+        """
+        Args:
+            max_workers (int): Number of workers
+            initializer (callable): Run in every worker before its first job
+            initargs (tuple): Arguments of ``initializer``
+            name (str): Name of the executor's pool, for logs and metrics
+            max_jobs (int): Jobs after which a worker is recycled (0: never)
+            max_rss_bytes (int): Resident memory above which a worker is
+                recycled after its job (0: no limit)
+        """
+        self.max_workers = max_workers
+        self.name = name
+        self.max_jobs = max_jobs
+        self.max_rss_bytes = max_rss_bytes
+        self._initializer = initializer
+        self._initargs = initargs
+        self._context = multiprocessing.get_context()
+        # One dispatching thread per worker hands jobs over and waits for results
+        self._dispatch = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="process-dispatch"
+        )
+        # Jobs for a slot are dispatched one at a time, in order, by a thread of their own
+        self._slot_dispatch = {}
+        self._lock = threading.Lock()
+        # Notified when a worker becomes idle or a slot is freed
+        self._available = threading.Condition(self._lock)
+        # Slot -> idle worker, from the longest to the most recently idle
+        self._idle = OrderedDict()
+        self._workers = set()
+        self._free_slots = set(range(max_workers))
+        # Running job -> worker running it
+        self._running = {}
+        self._shutdown = False
+
+    def _start_worker(self, slot):
+        """Start a worker in ``slot``, which must have been taken off the free slots."""
+        try:
+            worker = _Worker(self._context, slot, self._initializer, self._initargs)
+        except BaseException:
+            with self._available:
+                self._free_slots.add(slot)
+                self._available.notify_all()
+            raise
+        with self._lock:
+            if not self._shutdown:
+                self._workers.add(worker)
+                return worker
+        # E.g. the replacement of a recycled worker, started while shutting down
+        worker.stop(timeout=0.1)
+        raise RuntimeError("Cannot start a worker after the executor was shut down")
+
+    def _take_locked(self, slot):
+        """
+        Returns:
+            tuple: (idle worker, None), (None, free slot to start a worker in),
+                or (None, None) if the caller has to wait
+        """
+        if slot is None:
+            if self._idle:
+                return self._idle.popitem(last=False)[1], None
+            if self._free_slots:
+                slot = min(self._free_slots)
+                self._free_slots.discard(slot)
+                return None, slot
+        elif slot in self._idle:
+            return self._idle.pop(slot), None
+        elif slot in self._free_slots:
+            self._free_slots.discard(slot)
+            return None, slot
+        return None, None
+
+    def _checkout(self, slot=None):
+        """Take an idle worker, of ``slot`` if given, starting one if needed."""
+        while True:
+            with self._available:
+                while True:
+                    if self._shutdown:
+                        raise RuntimeError("Cannot run a job after the executor was shut down")
+                    worker, free_slot = self._take_locked(slot)
+                    if worker is not None or free_slot is not None:
+                        break
+                    self._available.wait()
+            if worker is None:
+                return self._start_worker(free_slot)
+            if worker.alive:
+                return worker
+            self._discard(worker)
+
+    def _checkin(self, worker):
+        if not worker.alive or self._shutdown:
+            self._discard(worker)
+            return
+        reason = self._recycle_reason(worker)
+        if reason is not None:
+            # The job has finished, so the worker can exit without losing work.
+            # It exits before its replacement starts, so both never hold memory.
+            reason, detail = reason
+            logger.info(f"Recycling worker {worker.pid} of pool '{self.name}': {detail}")
+            metrics.WORKER_RECYCLES.inc(pool=self.name, reason=reason)
+            self._discard(worker, timeout=5.0, release_slot=False)
+            # Started now rather than on the next job, so it is ready by then
+            worker = self._start_worker(worker.slot)
+        with self._available:
+            self._idle[worker.slot] = worker
+            self._available.notify_all()
+
+    def _recycle_reason(self, worker):
+        """
+        Returns:
+            tuple: ("jobs" or "memory", description) if the worker should be
+                recycled, None if it can keep running
+        """
+        if self.max_jobs and worker.jobs >= self.max_jobs:
+            return "jobs", f"ran {worker.jobs} jobs"
+        if self.max_rss_bytes:
+            rss = worker.rss
+            if rss is not None and rss > self.max_rss_bytes:
+                return "memory", f"resident memory of {rss / (1024 * 1024):.0f} MiB"
+        return None
+
+    def _discard(self, worker, timeout=0, release_slot=True):
+        with self._available:
+            self._workers.discard(worker)
+            if release_slot:
+                self._free_slots.add(worker.slot)
+                self._available.notify_all()
+        worker.stop(timeout=timeout)
+
+    def submit(self, fn, /, *args, **kwargs):
+        if kwargs:
+            raise TypeError("ProcessExecutor jobs only take positional arguments")
+        future = Future()
+        self._dispatch.submit(self._run_job, future, None, fn, args)
+        return future
+
+    def submit_to(self, slot, fn, /, *args):
+        """
+        Run ``fn(*args)`` on the worker of ``slot``, after the jobs already submitted to it.
+
+        Args:
+            slot (int): Slot of the worker, from 0 to ``max_workers - 1``
+
+        Returns:
+            Future: The result of the job
+        """
+        if not 0 <= slot < self.max_workers:
+            raise ValueError(f"Slot {slot} out of range for {self.max_workers} workers")
+        future = Future()
+        with self._lock:
+            if self._shutdown:
+                raise RuntimeError("Cannot run a job after the executor was shut down")
+            dispatch = self._slot_dispatch.get(slot)
+            if dispatch is None:
+                dispatch = self._slot_dispatch[slot] = ThreadPoolExecutor(
+                    max_workers=1, thread_name_prefix=f"process-dispatch-{slot}"
+                )
+        dispatch.submit(self._run_job, future, slot, fn, args)
+        return future
+
+    def _run_job(self, future, slot, fn, args):
+        if not future.set_running_or_notify_cancel():
+            return
+        try:
+            worker = self._checkout(slot)
+        except BaseException as e:
+            future.set_exception(e)
+            return
+        with self._lock:
+            self._running[future] = worker
+        try:
+            result = worker.call(fn, args)
+        except BaseException as e:
+            future.set_exception(e)
+        else:
+            future.set_result(result)
+        finally:
+            with self._lock:
+                self._running.pop(future, None)
+            self._checkin(worker)
+
+    def start_workers(self):
+        """
+        Start a worker in every free slot and wait until each has run the initializer.
+
+        Returns:
+            list: Per started worker, the result of the initializer, or
+                ``{"pid": ..., "error": ...}`` if it failed
+        """
+        with self._available:
+            slots = sorted(self._free_slots)
+            self._free_slots.difference_update(slots)
+        workers = []
+        for slot in slots:
+            try:
+                workers.append(self._start_worker(slot))
+            except Exception as e:
+                logger.error(f"Cannot start a worker of pool '{self.name}': {str(e)}")
+        results = []
+        for worker in workers:
+            try:
+                results.append(worker.wait_initialized())
+            except Exception as e:
+                results.append({"pid": worker.pid, "error": str(e)})
+            self._checkin(worker)
+        return results
+
+    def kill(self, future):
+        """
+        Stop a job: cancel it if it has not started, or kill the worker running it.
+
+        Returns:
+            bool: True if the job was stopped, False if it had already finished
+        """
+        if future.cancel():
+            return True
+        with self._lock:
+            worker = self._running.get(future)
+        if worker is None:
+            return False
+        logger.warning(f"Killing worker {worker.pid} to stop its job")
+        worker.kill()
+        return True
+
+    def worker_stats(self):
+        """
+        Report on the live workers.
+
+        Returns:
+            list: Per worker, its ``slot``, ``pid``, number of ``jobs``,
+                current ``rss_bytes`` and ``uptime_seconds``, by slot
+        """
+        with self._lock:
+            workers = [worker for worker in self._workers if worker.alive]
+        return sorted((worker.stats() for worker in workers), key=lambda stats: stats["slot"])
+
+    def shutdown(self, wait=True, *, cancel_futures=False):
+        """Stop the workers; running jobs are stopped unless ``wait`` is True."""
+        with self._available:
+            self._shutdown = True
+            # Jobs waiting for a worker give up
+            self._available.notify_all()
+            dispatchers = [self._dispatch, *self._slot_dispatch.values()]
+        for dispatch in dispatchers:
+            dispatch.shutdown(wait=wait, cancel_futures=cancel_futures)
+        with self._lock:
+            workers, self._workers = list(self._workers), set()
+        for worker in workers:
+            worker.stop(timeout=1.0 if wait else 0.1)
@@ -0,0 +1,227 @@
+"""
+The ``auto`` parser: PyMuPDF for plain pages, Docling where layout matters.
+
+Every page is first extracted by PyMuPDF, which also probes it for signs that
+plain text extraction is not enough: a missing text layer, table rulings or
+large images (see `src.parsers.probe`). Only those pages are then converted
+by Docling, in as few page ranges as possible, and the pages of both parsers
+are merged back in order. The routing decision of every page is reported
+with the result so the thresholds can be tuned.
+"""
+
+import time
+
+from loguru import logger
+
+from src import config
+from src.parsers import get_parser
+from src.parsers.errors import ParserError
+from src.parsers.probe import ROUTE_LAYOUT
+from src.parsers.results import ParseResult
+from src.parsers.source import is_path
+from src.sharding import SharedDocument, call_with_source
+from src.workers import DeadlineExceededError, get_pool, kill_deadline
+
+AUTO_PARSER_TYPE = "auto"
+FAST_PARSER = "PyMuPDF"
+LAYOUT_PARSER = "Docling"
+
+# Up to this many fast pages between two layout pages are converted along with
+# them, so Docling converts fewer and longer page ranges
+MERGE_GAP_PAGES = 2
+
+
+def layout_runs(probes):
+    """
+    Group the pages routed to layout analysis into page ranges.
+
+    Fast pages in short gaps between layout pages are routed to layout
+    analysis too (reason ``merged_gap``).
+
+    Args:
+        probes (list): `PageProbe` of consecutive pages, in order
+
+    Returns:
+        list: ``(start_page, page_count)`` tuples in page order
+    """
+    runs = []
+    for index, probe in enumerate(probes):
+        if probe.route != ROUTE_LAYOUT:
+            continue
+        if runs:
+            start, count = runs[-1]
+            gap = probe.number - (start + count)
+            if gap <= MERGE_GAP_PAGES:
+                for skipped in probes[index - gap : index]:
+                    skipped.route = ROUTE_LAYOUT
+                    skipped.reasons = ["merged_gap"]
+                runs[-1] = (start, count + gap + 1)
+                continue
+        runs.append((probe.number, 1))
+    return runs
+
+
+def merge_pages(fast_result, layout_results):
+    """
+    Replace the pages of the fast result that were converted by Docling.
+
+    Table indices are renumbered across the whole result, since every
+    conversion numbers its tables from 1.
+
+    Returns:
+        list: The merged `PageResult` in page order
+    """
+    layout_pages = {}
+    for result in layout_results:
+        for page in result.pages:
+            page.format = result.info.get("page_format")
+            layout_pages[page.number] = page
+
+    pages = []
+    table_index = 0
+    for fast_page in fast_result.pages:
+        page = layout_pages.get(fast_page.number, fast_page)
+        if page.tables:
+            tables = []
+            for table in page.tables:
+                table_index += 1
+                tables.append({**table, "index": table_index})
+            page.tables = tables
+        pages.append(page)
+    return pages
+
+
+class AutoRouter:
+    """
+    Parses with PyMuPDF and Docling, routing each page to one of them.
+
+    Exposes the ``name`` and ``version`` of a `PDFParser`, but `parse` is a
+    coroutine that runs both parsers on their worker pools.
+    """
+
+    name = "Auto"
+
+    # Bump whenever a change to the routing alters the output
+    revision = 1
+
+    @property
+    def version(self):
+        """The versions of both parsers and the routing thresholds."""
+        thresholds = (
+            config.AUTO_MIN_CHARS,
+            config.AUTO_MIN_RULINGS,
+            config.AUTO_IMAGE_COVERAGE,
+        )
+        return (
+            f"{self.revision}/{get_parser(FAST_PARSER).version}"
+            f"+{get_parser(LAYOUT_PARSER).version}/{thresholds}"
+        )
+
+    async def parse(self, source, start_page, max_pages, deadline=None):
+        """
+        Extract a range of pages, converting only the pages that need it with Docling.
+
+        If Docling is unavailable or fails, the PyMuPDF pages are kept and the
+        reason is reported as ``routing.fallback``. Pages not converted by
+        ``deadline`` also keep their PyMuPDF text, and ``info["deadline_exceeded"]``
+        is set.
+
+        Args:
+            source (str | bytes): Path to the PDF file, or its content
+            start_page (int): Page to start extraction from (1-indexed)
+            max_pages (int): Maximum number of pages to extract
+            deadline (float): Wall-clock time (`time.time`), or None
+
+        Returns:
+            ParseResult: The merged pages, with the routing of every page in
+                ``info["routing"]``
+
+        Raises:
+            ParserError: If PyMuPDF cannot process the document
+            PoolSaturatedError: If a pool rejects a job
+            DeadlineExceededError: If PyMuPDF overran the deadline by more
+                than the grace period
+        """
+        start_time = time.perf_counter()
+        fast_pool = get_pool(FAST_PARSER)
+        layout_pool = get_pool(LAYOUT_PARSER)
+
+        shared = None
+        if not is_path(source) and "process" in (fast_pool.backend, layout_pool.backend):
+            # Both parsers read the upload, so it is shared instead of pickled twice
+            shared = SharedDocument(source)
+            source = shared.handle
+        try:
+            kill_at = kill_deadline(deadline)
+            fast_result, probes = await fast_pool.run(
+                call_with_source, get_parser(FAST_PARSER).probe_pages, source, start_page, max_pages,
+                deadline=kill_at,
+            )
+            probe_ms = (time.perf_counter() - start_time) * 1000
+
+            runs = layout_runs(probes)
+            layout_results = []
+            fallback = None
+            deadline_exceeded = False
+            layout_start = time.perf_counter()
+            for run_start, run_count in runs:
+                if deadline is not None and time.time() >= deadline:
+                    deadline_exceeded = True
+                    break
+                logger.info(
+                    f"Routing pages {run_start}-{run_start + run_count - 1} to {LAYOUT_PARSER}"
+                )
+                try:
+                    layout_results.append(
+                        await layout_pool.run(
+                            call_with_source,
+                            get_parser(LAYOUT_PARSER).parse,
+                            source,
+                            run_start,
+                            run_count,
+                            None,
+                            deadline,
+                            deadline=kill_at,
+                        )
+                    )
+                except DeadlineExceededError as e:
+                    logger.warning(f"Keeping {FAST_PARSER} pages, {str(e)}")
+                    deadline_exceeded = True
+                    break
+                except ParserError as e:
+                    logger.warning(f"Keeping {FAST_PARSER} pages, {LAYOUT_PARSER} failed: {e.message}")
+                    fallback = e.message
+                    layout_results = []
+                    break
+                if layout_results[-1].info.get("deadline_exceeded"):
+                    deadline_exceeded = True
+                    break
+            layout_ms = (time.perf_counter() - layout_start) * 1000
+        finally:
+            if shared is not None:
+                shared.close()
+
+        layout_count = sum(len(result.pages) for result in layout_results)
+        info = dict(fast_result.info)
+        info["image_count"] = fast_result.image_count
+        if deadline_exceeded:
+            info["deadline_exceeded"] = True
+        info["routing"] = {
+            "fast_parser": FAST_PARSER,
+            "layout_parser": LAYOUT_PARSER,
+            "fast_pages": len(probes) - layout_count,
+            "layout_pages": layout_count,
+            "fallback": fallback,
+            "probe_ms": probe_ms,
+            "layout_ms": layout_ms,
+            "pages": [probe.to_dict() for probe in probes],
+        }
+        return ParseResult(
+            self.name,
+            pages=merge_pages(fast_result, layout_results),
+            info=info,
+            duration_ms=(time.perf_counter() - start_time) * 1000,
+        )
+
+
+auto_router = AutoRouter()
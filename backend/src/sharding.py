@@ -0,0 +1,234 @@
+"""
+Page-sharded extraction of large page ranges.
+
+A large range of pages is split into contiguous shards that the idle workers
+of the parser's pool extract in parallel, each opening the document on its
+own; the pages are then merged back in order. In-memory uploads are copied
+once into a shared memory block that every worker process maps, instead of
+each worker receiving its own pickled copy of the document.
+"""
+
+import asyncio
+import math
+import time
+from dataclasses import dataclass
+from multiprocessing import resource_tracker, shared_memory
+
+from loguru import logger
+
+from src import config
+from src.parsers.results import ParseResult
+from src.parsers.source import is_path
+from src.workers import kill_deadline
+
+
+@dataclass(frozen=True)
+class SharedHandle:
+    """Picklable reference to a `SharedDocument`, passed to the workers."""
+
+    name: str
+    size: int
+
+
+class SharedDocument:
+    """
+    An in-memory document copied into a shared memory block.
+
+    The creator owns the block and must `close` it once no worker needs it.
+    """
+
+    def __init__(self, data):
+        view = memoryview(data).cast("B")
+        self.size = view.nbytes
+        self._block = shared_memory.SharedMemory(create=True, size=max(self.size, 1))
+        self._block.buf[: self.size] = view
+        self.handle = SharedHandle(self._block.name, self.size)
+
+    def close(self):
+        """Unmap and remove the block; workers still using it keep their mapping."""
+        self._block.close()
+        self._block.unlink()
+
+
+def _attach(name):
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        # Before Python 3.13 attaching registers the block with the resource
+        # tracker, which would remove it when this worker exits
+        block = shared_memory.SharedMemory(name=name)
+        resource_tracker.unregister(block._name, "shared_memory")
+        return block
+
+
+def attach_source(source):
+    """
+    Map a `SharedHandle` in a worker.
+
+    Args:
+        source (SharedHandle | str | bytes): The source passed to the worker
+
+    Returns:
+        tuple: (the source to read, with a `SharedHandle` replaced by a
+            zero-copy view of the shared document, and a function releasing it)
+    """
+    if not isinstance(source, SharedHandle):
+        return source, lambda: None
+
+    block = _attach(source.name)
+    view = block.buf[: source.size]
+
+    def release():
+        try:
+            view.release()
+            block.close()
+        except BufferError as e:
+            # Something still references the buffer; the mapping goes away with it
+            logger.warning(f"Shared document {source.name} is still in use: {str(e)}")
+
+    return view, release
+
+
+def call_with_source(fn, source, *args):
+    """
+    Run ``fn(source, *args)`` on a worker.
+
+    A `SharedHandle` is replaced by a zero-copy view of the shared document,
+    which is released again before returning.
+    """
+    source, release = attach_source(source)
+    try:
+        return fn(source, *args)
+    finally:
+        release()
+
+
+def plan_shards(first_page, max_pages, page_count, workers):
+    """
+    Split a page range into contiguous shards of similar size.
+
+    Args:
+        first_page (int): First page to extract (1-indexed)
+        max_pages (int): Maximum number of pages to extract
+        page_count (int): Pages in the document
+        workers (int): Workers available to extract shards
+
+    Returns:
+        list: ``(start_page, page_count)`` tuples in page order; empty if the
+            range starts past the end of the document
+    """
+    last_page = min(first_page + max_pages - 1, page_count)
+    pages = last_page - first_page + 1
+    if pages <= 0:
+        return []
+    shard_count = max(1, min(workers, pages // max(1, config.SHARD_MIN_PAGES)))
+    size = math.ceil(pages / shard_count)
+    return [
+        (start, min(size, last_page - start + 1))
+        for start in range(first_page, last_page + 1, size)
+    ]
+
+
+def merge_results(parser_name, results, duration_ms):
+    """
+    Merge the results of consecutive shards into one result.
+
+    A shard stopped at its deadline leaves the pages after it out of the
+    merge, even if later shards extracted them, so a partial result is
+    always the pages from the start of the range up to where it stopped.
+
+    Returns:
+        ParseResult: The pages of the shards in order, with the document
+            details of the shards combined
+    """
+    for i, result in enumerate(results):
+        if result.info.get("deadline_exceeded"):
+            results = results[: i + 1]
+            break
+    info = {}
+    for result in results:
+        info.update(result.info)
+    if any("image_count" in result.info for result in results):
+        info["image_count"] = sum(result.image_count for result in results)
+    pages = [page for result in results for page in result.pages]
+    return ParseResult(parser_name, pages=pages, info=info, duration_ms=duration_ms)
+
+
+def should_shard(parser, pool, max_pages):
+    """Return True if a page range is worth splitting across the pool's workers."""
+    return (
+        parser.shardable
+        and pool.backend == "process"
+        and config.SHARD_MIN_PAGES > 0
+        and max_pages >= 2 * config.SHARD_MIN_PAGES
+        and pool.size - pool.active >= 2
+    )
+
+
+async def parse_sharded(pool, parser, source, first_page, max_pages, deadline=None):
+    """
+    Extract a page range as parallel shards on a pool.
+
+    The document is counted first so that shards stop at its end. If it
+    cannot be counted, or the range is too short to split over the idle
+    workers, it is extracted as a single job.
+
+    Args:
+        pool (WorkerPool): The pool of the parser
+        parser (PDFParser): A parser whose ``shardable`` is True
+        source (str | bytes): Path to the PDF file, or its content
+        first_page (int): First page to extract (1-indexed)
+        max_pages (int): Maximum number of pages to extract
+        deadline (float): Deadline of every shard (see `PDFParser.parse`)
+
+    Returns:
+        ParseResult: The extracted pages, in order
+
+    Raises:
+        ParserError: If the document cannot be processed
+        PoolSaturatedError: If the pool rejects a job
+        DeadlineExceededError: If a shard overran the deadline by more than
+            the grace period
+    """
+    shared = None
+    if not is_path(source):
+        shared = SharedDocument(source)
+        source = shared.handle
+    try:
+        kill_at = kill_deadline(deadline)
+        page_count = await pool.run(call_with_source, parser.count_pages, source, deadline=kill_at)
+        workers = pool.size - pool.active
+        shards = plan_shards(first_page, max_pages, page_count or 0, workers)
+        if page_count is None or len(shards) < 2:
+            return await pool.run(
+                call_with_source, parser.parse, source, first_page, max_pages, None, deadline,
+                deadline=kill_at,
+            )
+
+        logger.info(
+            f"Extracting pages {first_page}-{shards[-1][0] + shards[-1][1] - 1} "
+            f"with {parser.name} in {len(shards)} shards"
+        )
+        start_time = time.perf_counter()
+        tasks = [
+            asyncio.ensure_future(
+                pool.run(
+                    call_with_source, parser.parse, source, start, count, None, deadline,
+                    deadline=kill_at,
+                )
+            )
+            for start, count in shards
+        ]
+        try:
+            results = await asyncio.gather(*tasks)
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            raise
+        return merge_results(
+            parser.name, results, (time.perf_counter() - start_time) * 1000
+        )
+    finally:
+        if shared is not None:
+            shared.close()
@@ -0,0 +1,110 @@
+"""
+Receiving uploaded PDFs.
+
+Uploads are read in chunks, hashed on the fly and kept in memory so parsers can
+open them without a temporary file. Only uploads above a size threshold are
+spilled to a temporary file, and uploads above a hard limit are rejected.
+"""
+
+import hashlib
+import os
+import tempfile
+
+from fastapi.concurrency import run_in_threadpool
+from loguru import logger
+
+from src import config
+
+
+class UploadTooLargeError(Exception):
+    """Raised when an upload exceeds the configured size limit."""
+
+    def __init__(self, limit):
+        super().__init__(f"Uploaded file exceeds the limit of {limit} bytes")
+        self.limit = limit
+
+
+class ReceivedUpload:
+    """
+    An uploaded PDF, held in memory or spilled to a temporary file.
+
+    Attributes:
+        filename (str): Name of the file given by the client
+        size (int): Size in bytes
+        digest (str): SHA-256 hex digest of the content
+        path (str): Path of the spill file, or None if the upload is in memory
+    """
+
+    def __init__(self, filename, size, digest, data=None, path=None):
+        self.filename = filename
+        self.size = size
+        self.digest = digest
+        self.path = path
+        self._data = data
+
+    @property
+    def source(self):
+        """The PDF source to hand to a parser: the in-memory buffer or the spill file path."""
+        return self.path if self.path is not None else self._data
+
+    def close(self):
+        """Release the buffer and delete the spill file, if any."""
+        self._data = None
+        if self.path is not None and os.path.exists(self.path):
+            try:
+                os.unlink(self.path)
+                logger.info(f"Deleted temp file {self.path}")
+            except Exception as e:
+                logger.warning(f"Failed to delete temp file {self.path}: {str(e)}")
+
+
+async def receive_upload(file):
+    """
+    Read an uploaded file in chunks.
+
+    Args:
+        file (UploadFile): The uploaded file
+
+    Returns:
+        ReceivedUpload: The received upload; the caller must close it
+
+    Raises:
+        UploadTooLargeError: If the upload exceeds ``config.UPLOAD_MAX_BYTES``
+    """
+    max_bytes = config.UPLOAD_MAX_BYTES
+    hasher = hashlib.sha256()
+    buffer = bytearray()
+    spill = None
+    size = 0
+
+    try:
+        while True:
+            chunk = await file.read(config.UPLOAD_CHUNK_BYTES)
+            if not chunk:
+                break
+            size += len(chunk)
+            if max_bytes and size > max_bytes:
+                raise UploadTooLargeError(max_bytes)
+            hasher.update(chunk)
+
+            if spill is None and len(buffer) + len(chunk) > config.UPLOAD_MEMORY_THRESHOLD:
+                # Too large to keep in memory; continue on disk
+                spill = tempfile.NamedTemporaryFile(delete=False, suffix=".pdf")
+                logger.info(f"Spilling large upload to {spill.name}")
+                await run_in_threadpool(spill.write, buffer)
+                buffer = bytearray()
+
+            if spill is not None:
+                await run_in_threadpool(spill.write, chunk)
+            else:
+                buffer += chunk
+    except BaseException:
+        if spill is not None:
+            spill.close()
+            os.unlink(spill.name)
+        raise
+
+    if spill is not None:
+        spill.close()
+        return ReceivedUpload(file.filename, size, hasher.hexdigest(), path=spill.name)
+    return ReceivedUpload(file.filename, size, hasher.hexdigest(), data=buffer)
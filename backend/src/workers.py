@@ -0,0 +1,560 @@
+"""
+Worker pools for running parsers off the event loop.
+
+Each parser gets its own pool so cheap PyMuPDF jobs are never queued behind slow
+Docling conversions. A pool accepts at most ``size + queue_limit`` jobs at a time;
+further submissions are rejected with `PoolSaturatedError` so the API can answer
+with 503 and a ``Retry-After`` estimate instead of letting requests pile up.
+
+Jobs can be given a deadline. With the process backend a job still running at
+its deadline, or whose request was cancelled, is stopped by killing its worker
+(see `src.processes`); threads cannot be killed, so the thread backend can only
+stop waiting for such a job. Worker processes are also recycled after a number
+of jobs or once their memory grows past a watermark.
+"""
+
+import asyncio
+import functools
+import math
+import os
+import sys
+import threading
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+
+from loguru import logger
+
+from src import config, metrics
+from src.parsers import get_available_parsers, get_parser, registry
+from src.processes import ProcessExecutor, WorkerDiedError
+
+
+class PoolSaturatedError(Exception):
+    """Raised when a pool has no free worker and its queue is full."""
+
+    def __init__(self, pool_name, retry_after):
+        super().__init__(f"Worker pool '{pool_name}' is saturated")
+        self.pool_name = pool_name
+        self.retry_after = retry_after
+
+
+class DeadlineExceededError(Exception):
+    """Raised when a job has not finished by its deadline and was stopped."""
+
+    def __init__(self, pool_name, seconds):
+        super().__init__(f"{pool_name} did not finish within {seconds:.1f} s")
+        self.pool_name = pool_name
+        self.seconds = seconds
+
+
+def _run_initializer(fn):
+    """
+    Run a worker initializer without letting a failure break the pool.
+
+    Returns:
+        The result of the initializer, or ``{"pid": ..., "error": ...}`` if it failed
+    """
+    try:
+        return fn()
+    except Exception as e:
+        logger.error(f"Worker initializer failed: {str(e)}")
+        return {"pid": os.getpid(), "error": str(e)}
+
+
+def _initialize_worker(parser_name, warm):
+    """
+    Prepare a worker of a parser before it accepts jobs.
+
+    Parsers configured for warm-up load their models; other preloaded parsers
+    import their library, so that cost is not charged to the first request.
+
+    Returns:
+        dict: Timings of the preparation, reported by ``/ready``
+    """
+    if warm:
+        return get_parser(parser_name).warm_up()
+    timings = registry.preload(parser_name)
+    if "library_ms" in timings:
+        logger.info(
+            f"Preloaded {parser_name} in worker {os.getpid()}: "
+            f"library imported in {timings['library_ms']:.1f} ms"
+        )
+    return {"pid": os.getpid(), **timings}
+
+
+def _timed_call(fn, *args):
+    """Run ``fn`` on a worker, also returning when it started (to measure queue wait)."""
+    return time.time(), fn(*args)
+
+
+class WorkerPool:
+    """
+    A bounded pool of worker processes (or threads) dedicated to one parser.
+    """
+
+    def __init__(
+        self,
+        name,
+        size,
+        queue_limit,
+        backend="process",
+        initializer=None,
+        max_jobs=0,
+        max_rss_bytes=0,
+    ):
+        """
+        Args:
+            name (str): Name of the pool, usually the parser name
+            size (int): Number of workers
+            queue_limit (int): Number of jobs allowed to wait for a free worker
+            backend (str): "process" for worker processes, "thread" for threads
+            initializer (callable): Run in every worker before it accepts jobs
+            max_jobs (int): Jobs after which a worker process is recycled (0: never)
+            max_rss_bytes (int): Resident memory above which a worker process
+                is recycled once its job has finished (0: no limit)
+        """
+        self.name = name
+        self.size = max(1, size)
+        self.queue_limit = max(0, queue_limit)
+        self.backend = backend
+        self.initializer = initializer
+        self.max_jobs = max_jobs
+        self.max_rss_bytes = max_rss_bytes
+        # Pools with an initializer become ready once `warm_up` has completed
+        self.ready = initializer is None
+        self.warmup_results = []
+        self._executor = self._create_executor()
+        # Jobs currently running or waiting. Only touched from the event loop.
+        self.active = 0
+        # Exponentially weighted moving average of job durations, in seconds
+        self._average_duration = None
+
+    def _create_executor(self):
+        if self.backend == "thread":
+            # Worker threads share the API process, which `warm_up` prepares once
+            return ThreadPoolExecutor(
+                max_workers=self.size, thread_name_prefix=f"{self.name}-worker"
+            )
+        initargs = ()
+        initializer = None
+        if self.initializer is not None:
+            initializer, initargs = _run_initializer, (self.initializer,)
+        return ProcessExecutor(
+            max_workers=self.size,
+            initializer=initializer,
+            initargs=initargs,
+            name=self.name,
+            max_jobs=self.max_jobs,
+            max_rss_bytes=self.max_rss_bytes,
+        )
+
+    @property
+    def waiting(self):
+        """Number of accepted jobs that are waiting for a free worker."""
+        return max(0, self.active - self.size)
+
+    def worker_stats(self):
+        """
+        Report on the worker processes (see `ProcessExecutor.worker_stats`).
+
+        Returns:
+            list: Per live worker, its slot, pid, jobs, memory and uptime;
+                empty for the thread backend, whose workers share the API process
+        """
+        if isinstance(self._executor, ProcessExecutor):
+            return self._executor.worker_stats()
+        return []
+
+    def retry_after(self):
+        """
+        Estimate how long a rejected client should wait before retrying.
+
+        Returns:
+            int: Whole seconds, at least 1
+        """
+        average = self._average_duration or 1.0
+        backlog = self.waiting + 1
+        return max(1, math.ceil(average * backlog / self.size))
+
+    async def run(self, fn, *args, deadline=None, affinity=None):
+        """
+        Run ``fn(*args)`` on a worker and wait for its result.
+
+        ``fn`` and its arguments must be picklable when the process backend is used.
+        A job that has not finished by ``deadline``, or whose caller is
+        cancelled (e.g. because the client disconnected), is stopped.
+
+        Args:
+            deadline (float): Wall-clock time (`time.time`) by which the job,
+                including its wait for a worker, must have finished
+            affinity (str): Jobs with the same key run on the same worker
+                process, waiting for it if it is busy, so they can reuse what
+                it keeps in memory (e.g. an open document). Ignored by the
+                thread backend, whose workers share everything.
+
+        Raises:
+            PoolSaturatedError: If every worker is busy and the queue is full
+            DeadlineExceededError: If the job did not finish by ``deadline``
+        """
+        if self.active >= self.size + self.queue_limit:
+            metrics.POOL_REJECTIONS.inc(pool=self.name)
+            raise PoolSaturatedError(self.name, self.retry_after())
+
+        self.active += 1
+        start_time = time.perf_counter()
+        submitted_at = time.time()
+        future = self._submit(affinity, _timed_call, fn, *args)
+        try:
+            timeout = None if deadline is None else max(0.0, deadline - submitted_at)
+            started_at, result = await asyncio.wait_for(asyncio.wrap_future(future), timeout)
+            metrics.QUEUE_WAIT.observe(max(0.0, started_at - submitted_at), pool=self.name)
+            return result
+        except asyncio.TimeoutError:
+            self._stop(future, "deadline")
+            raise DeadlineExceededError(self.name, time.time() - submitted_at)
+        except asyncio.CancelledError:
+            self._stop(future, "cancelled")
+            raise
+        except WorkerDiedError as e:
+            # E.g. a native crash in the PDF library; the next job gets a new worker
+            logger.error(f"Worker of pool '{self.name}' died: {str(e)}")
+            raise RuntimeError(f"{self.name} worker process terminated unexpectedly")
+        finally:
+            self.active -= 1
+            self._record_duration(time.perf_counter() - start_time)
+
+    def _submit(self, affinity, fn, *args):
+        """Submit ``fn(*args)``, to the worker slot of ``affinity`` if it has one."""
+        if affinity is not None and isinstance(self._executor, ProcessExecutor):
+            slot = zlib.crc32(str(affinity).encode()) % self.size
+            return self._executor.submit_to(slot, fn, *args)
+        return self._executor.submit(fn, *args)
+
+    def run_detached(self, fn, *args, affinity=None):
+        """
+        Run ``fn(*args)`` on a worker without waiting for its result.
+
+        Meant for housekeeping, such as releasing what a worker keeps in
+        memory. Such jobs are not held to the queue limit, can be submitted
+        from any thread, and only have their failures logged.
+
+        Args:
+            affinity (str): As for `run`
+        """
+        def log_failure(future):
+            if not future.cancelled() and future.exception() is not None:
+                logger.warning(
+                    f"Job of pool '{self.name}' failed: {str(future.exception())}"
+                )
+
+        try:
+            future = self._submit(affinity, fn, *args)
+        except RuntimeError as e:
+            # The pool is shutting down, and its workers with it
+            logger.debug(f"Not running job on pool '{self.name}': {str(e)}")
+            return
+        future.add_done_callback(log_failure)
+
+    def _stop(self, future, reason):
+        """Stop a job that is no longer waited for, killing its worker process if needed."""
+        metrics.JOBS_STOPPED.inc(pool=self.name, reason=reason)
+        if isinstance(self._executor, ProcessExecutor):
+            self._executor.kill(future)
+        elif not future.cancel():
+            logger.warning(
+                f"Abandoning a job of pool '{self.name}' ({reason}); "
+                "worker threads cannot be stopped, so it runs to completion"
+            )
+
+    async def warm_up(self):
+        """
+        Start every worker and wait until each has run the initializer.
+
+        Worker processes run the initializer as they start and report its
+        results (e.g. model load timings), which are kept for reporting. With
+        the thread backend, the initializer is run once, as the workers share
+        the API process.
+        """
+        if self.initializer is None:
+            self.ready = True
+            return
+
+        start_time = time.perf_counter()
+        try:
+            if isinstance(self._executor, ProcessExecutor):
+                results = await asyncio.to_thread(self._executor.start_workers)
+            else:
+                loop = asyncio.get_running_loop()
+                results = [
+                    await loop.run_in_executor(self._executor, _run_initializer, self.initializer)
+                ]
+        except Exception as e:
+            logger.error(f"Warm-up of worker pool '{self.name}' failed: {str(e)}")
+            self.warmup_results = [{"error": str(e)}]
+            return
+        self.warmup_results = results
+        errors = [
+            result["error"] for result in results if isinstance(result, dict) and "error" in result
+        ]
+        if errors:
+            logger.error(f"Warm-up of worker pool '{self.name}' failed: {errors[0]}")
+            return
+        self.ready = True
+        logger.info(
+            f"Worker pool '{self.name}' ready after "
+            f"{(time.perf_counter() - start_time) * 1000:.0f} ms"
+        )
+
+    def _record_duration(self, duration):
+        if self._average_duration is None:
+            self._average_duration = duration
+        else:
+            self._average_duration = 0.8 * self._average_duration + 0.2 * duration
+
+    def shutdown(self):
+        """Stop the workers, cancelling jobs that have not started yet."""
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+def _default_pool_size(parser_name):
+    if parser_name == "Docling":
+        # Docling models are large and already multi-threaded
+        return 1
+    return max(1, (os.cpu_count() or 1) // 2)
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def _get_or_create_pool(key, parser_name, size, queue_limit):
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            initializer = None
+            warm = parser_name.lower() in config.WARMUP_PARSERS
+            if warm or parser_name.lower() in config.PRELOAD_PARSERS:
+                initializer = functools.partial(_initialize_worker, parser_name, warm)
+            max_rss_mb = config.WORKER_MAX_RSS_MB_PER_PARSER.get(
+                parser_name.lower(), config.WORKER_MAX_RSS_MB
+            )
+            pool = WorkerPool(
+                key,
+                size=size,
+                queue_limit=queue_limit,
+                backend=config.WORKER_BACKEND,
+                initializer=initializer,
+                max_jobs=config.WORKER_MAX_JOBS,
+                max_rss_bytes=max_rss_mb * 1024 * 1024,
+            )
+            _pools[key] = pool
+            logger.info(
+                f"Started {config.WORKER_BACKEND} pool {key}: "
+                f"{pool.size} workers, queue limit {pool.queue_limit}"
+            )
+        return pool
+
+
+def get_pool(parser_name):
+    """
+    Get the worker pool of a parser, creating it on first use.
+
+    Args:
+        parser_name (str): Internal parser name
+
+    Returns:
+        WorkerPool: The pool dedicated to the parser
+    """
+    size = config.POOL_SIZES.get(parser_name.lower()) or _default_pool_size(parser_name)
+    return _get_or_create_pool(parser_name, parser_name, size, config.POOL_QUEUE_LIMIT)
+
+
+def find_pool(parser_name):
+    """
+    Get the worker pool of a parser if it has been started.
+
+    Returns:
+        WorkerPool: The pool, or None
+    """
+    with _pools_lock:
+        return _pools.get(parser_name)
+
+
+def get_job_pool(parser_name):
+    """
+    Get the worker pool that runs background jobs for a parser.
+
+    Background jobs get their own workers so that long documents never hold up
+    interactive requests. Each running job has at most one batch of pages on
+    the pool at a time, so the queue is sized to never reject them.
+
+    Args:
+        parser_name (str): Internal parser name
+
+    Returns:
+        WorkerPool: The job pool of the parser
+    """
+    return _get_or_create_pool(
+        f"{parser_name}:jobs", parser_name, config.JOB_POOL_SIZE, config.JOB_CONCURRENCY
+    )
+
+
+def parse_timeout(parser_name, timeout=None):
+    """
+    Work out how long a parse may run.
+
+    A parse is given the parser's time limit (``config.PARSE_TIMEOUTS``, or
+    ``config.PARSE_TIMEOUT_SECONDS``), shortened to ``timeout`` if the
+    request asks for less.
+
+    Args:
+        parser_name (str): Internal parser name
+        timeout (float): Seconds the request allows, or None
+
+    Returns:
+        float: Seconds, or None if the parse is not limited
+    """
+    seconds = config.PARSE_TIMEOUTS.get(parser_name.lower(), config.PARSE_TIMEOUT_SECONDS)
+    if timeout:
+        seconds = min(seconds, timeout) if seconds else timeout
+    return seconds or None
+
+
+def parse_deadline(parser_name, timeout=None):
+    """
+    Work out when a parse starting now must stop (see `parse_timeout`).
+
+    Returns:
+        float: Wall-clock time (`time.time`) after which no further page is
+            started, or None if the parse is not limited
+    """
+    seconds = parse_timeout(parser_name, timeout)
+    return time.time() + seconds if seconds else None
+
+
+def kill_deadline(deadline):
+    """
+    Returns:
+        float: When a job past ``deadline`` is stopped: the page being extracted
+            at the deadline is given ``config.PARSE_TIMEOUT_GRACE_SECONDS`` to
+            finish, or None if there is no deadline
+    """
+    if deadline is None:
+        return None
+    return deadline + config.PARSE_TIMEOUT_GRACE_SECONDS
+
+
+async def iter_page_batches(pool, parser, source, first_page, max_pages, deadline=None):
+    """
+    Extract a range of pages as a series of jobs on a pool.
+
+    The first job extracts a single page so that it can be shown quickly. Later
+    jobs start at ``config.STREAM_BATCH_PAGES`` pages and double in size, which
+    amortises reopening the document per job while keeping the pages held in
+    memory bounded. Extraction stops at ``deadline`` (see `PDFParser.parse`),
+    the info of the last batch then having ``deadline_exceeded`` set.
+
+    Args:
+        pool (WorkerPool): Pool to run the jobs on
+        parser (PDFParser): The parser
+        source (str | bytes): Path to the PDF file, or its content
+        first_page (int): First page to extract (1-indexed)
+        max_pages (int): Maximum number of pages to extract, or None for all
+        deadline (float): Wall-clock time (`time.time`), or None
+
+    Yields:
+        tuple: (document info dict, list of PageResult) per job
+
+    Raises:
+        PoolSaturatedError: If the pool rejects a job
+        ParserError: If the document cannot be processed
+        DeadlineExceededError: If a page overran the deadline by more than
+            the grace period
+    """
+    end_page = first_page + max_pages if max_pages is not None else sys.maxsize
+    next_page = first_page
+    batch_size = 1
+    while next_page < end_page:
+        count = min(batch_size, end_page - next_page)
+        info, pages = await pool.run(
+            parser.extract_pages, source, next_page, count, deadline,
+            deadline=kill_deadline(deadline),
+        )
+        next_page += count
+        page_count = info.get("page_count")
+        if (
+            deadline is not None
+            and time.time() >= deadline
+            and not info.get("deadline_exceeded")
+            and len(pages) == count
+            and next_page < end_page
+            and (page_count is None or next_page <= page_count)
+        ):
+            # The batch ended right at the deadline, with pages still to extract
+            info["deadline_exceeded"] = True
+        yield info, pages
+
+        if info.get("deadline_exceeded"):
+            break
+        if len(pages) < count or (page_count is not None and next_page > page_count):
+            break
+        if batch_size == 1:
+            batch_size = config.STREAM_BATCH_PAGES
+        else:
+            batch_size = min(batch_size * 2, config.STREAM_BATCH_PAGES * 8)
+
+
+async def warm_up_pools():
+    """Start and warm up the pools of every parser configured for warm-up or preloading."""
+    preloaded = set(config.WARMUP_PARSERS) | set(config.PRELOAD_PARSERS)
+    names = [name for name in get_available_parsers() if name.lower() in preloaded]
+    await asyncio.gather(*(get_pool(name).warm_up() for name in names))
+
+
+def readiness():
+    """
+    Report whether the pools configured for warm-up are ready to serve requests.
+
+    Returns:
+        tuple: (True if every such pool is ready, per-pool details)
+    """
+    details = {}
+    for name in get_available_parsers():
+        if name.lower() not in config.WARMUP_PARSERS:
+            continue
+        with _pools_lock:
+            pool = _pools.get(name)
+        details[name] = {
+            "ready": pool is not None and pool.ready,
+            "workers": pool.warmup_results if pool is not None else [],
+        }
+    return all(d["ready"] for d in details.values()), details
+
+
+def _collect_pool_metrics():
+    with _pools_lock:
+        pools = list(_pools.values())
+    for pool in pools:
+        metrics.POOL_WORKERS.set(pool.size, pool=pool.name)
+        metrics.POOL_ACTIVE.set(pool.active, pool=pool.name)
+        metrics.POOL_WAITING.set(pool.waiting, pool=pool.name)
+        if pool.backend != "process":
+            continue
+        workers = {stats["slot"]: stats for stats in pool.worker_stats()}
+        for slot in range(pool.size):
+            # Slots without a live worker (not started yet, or being replaced) report 0
+            stats = workers.get(slot, {})
+            metrics.POOL_WORKER_RSS.set(stats.get("rss_bytes") or 0, pool=pool.name, worker=slot)
+            metrics.POOL_WORKER_JOBS.set(stats.get("jobs", 0), pool=pool.name, worker=slot)
+
+
+metrics.REGISTRY.add_collector(_collect_pool_metrics)
+
+
+def shutdown_pools():
+    """Shut down every pool that has been started."""
+    with _pools_lock:
+        for pool in _pools.values():
+            pool.shutdown()
+        _pools.clear()
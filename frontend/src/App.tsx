@@ -1,6 +1,7 @@
 import { FileUpload, ErrorMessage, FileReview, ParserSelector, ResultGrid } from './components';
 import { useApp } from './context/AppContext';
 import * as api from './api/client';
+import type { ParserType } from './types';
 
 function App() {
   const { 
@@ -24,28 +25,41 @@ function App() {
         updateResult(p, { status: 'pending' });
     });
 
-    // Create a promise for each parser
-    const promises = selectedParsers.map(async (parserId) => {
-        const startTime = Date.now();
-        try {
-            const data = await api.uploadPdf(file, parserId);
-            updateResult(parserId, { 
-                status: 'success', 
-                data, 
-                durationMs: data.metadata.duration_ms
-            });
-        } catch (err: any) {
-            const durationMs = Date.now() - startTime;
-             updateResult(parserId, { 
-                status: 'error', 
+    // Upload once; each parser's result arrives as soon as it is done
+    const startTime = Date.now();
+    const received = new Set<ParserType>();
+    try {
+        await api.compareParsers(file, selectedParsers, (record) => {
+            received.add(record.parser);
+            if (record.status === 'success') {
+                updateResult(record.parser, {
+                    status: 'success',
+                    data: {
+                        status: record.status,
+                        metadata: record.metadata,
+                        content: record.content ?? '',
+                    },
+                    durationMs: record.metadata.duration_ms
+                });
+            } else {
+                updateResult(record.parser, {
+                    status: 'error',
+                    error: record.error || 'Unknown error',
+                    durationMs: record.metadata?.duration_ms
+                });
+            }
+        });
+    } catch (err: any) {
+        const durationMs = Date.now() - startTime;
+        selectedParsers.filter(p => !received.has(p)).forEach(p => {
+            updateResult(p, {
+                status: 'error',
                 error: err.message || 'Unknown error',
                 durationMs
             });
-        }
-    });
+        });
+    }
 
-    // Wait for all to finish
-    await Promise.all(promises);
     setIsGlobalProcessing(false);
   };
 
@@ -1,4 +1,4 @@
-import type { ParseResponse } from '../types';
+import type { CompareRecord, ParseResponse, ParserType } from '../types';
 
 const BASE_URL = 'http://localhost:8000';
 
@@ -19,3 +19,47 @@ export async function uploadPdf(file: File, parser: string): Promise<ParseRespon
 
   return response.json();
 }
+
+/**
+ * Uploads the file once and parses it with every given parser.
+ * `onResult` is called for each parser as soon as its result is streamed back.
+ */
+export async function compareParsers(
+  file: File,
+  parsers: ParserType[],
+  onResult: (record: CompareRecord) => void,
+): Promise<void> {
+  const formData = new FormData();
+  formData.append('file', file);
+  parsers.forEach(parser => formData.append('parser_types', parser));
+
+  const response = await fetch(`${BASE_URL}/api/v1/parse/compare`, {
+    method: 'POST',
+    body: formData,
+  });
+
+  if (!response.ok || !response.body) {
+    const errorData = await response.json().catch(() => ({}));
+    throw new Error(errorData.detail || `Failed to process PDF: ${response.statusText}`);
+  }
+
+  const reader = response.body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = '';
+
+  for (;;) {
+    const { done, value } = await reader.read();
+    if (done) break;
+    buffer += decoder.decode(value, { stream: true });
+
+    let newline = buffer.indexOf('\n');
+    while (newline >= 0) {
+      const line = buffer.slice(0, newline).trim();
+      buffer = buffer.slice(newline + 1);
+      if (line) onResult(JSON.parse(line));
+      newline = buffer.indexOf('\n');
+    }
+  }
+
+  if (buffer.trim()) onResult(JSON.parse(buffer));
+}
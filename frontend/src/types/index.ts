@@ -1,10 +1,20 @@
 export type ParserType = 'docling' | 'pdfminer' | 'pymupdf' | 'pypdf2';
 
+export interface CacheMetadata {
+  hit: boolean;
+  hits: number;
+  misses: number;
+}
+
 export interface ParseMetadata {
   parser: string;
   pages_processed: number;
+  page_count?: number | null;
   filename: string;
+  format?: 'markdown' | 'text' | 'json';
   duration_ms: number;
+  parse_ms?: number;
+  cache?: CacheMetadata;
 }
 
 export interface ParseResponse {
@@ -13,6 +23,16 @@ export interface ParseResponse {
   content: string;
 }
 
+// One line of the NDJSON stream returned by /api/v1/parse/compare
+export interface CompareRecord {
+  parser: ParserType;
+  status: 'success' | 'error';
+  metadata: ParseMetadata;
+  content?: string;
+  error?: string;
+  retry_after?: number;
+}
+
 export type ProcessingStatus = 'idle' | 'pending' | 'success' | 'error';
 
 export interface ParserResult {
@@ -0,0 +1,41 @@
+import copy
+
+import pytest
+
+from benchmarks.compare import find_regressions
+from benchmarks.corpus import build_corpus
+from benchmarks.runner import percentile
+
+pytest.importorskip("fitz")
+
+def test_percentile_interpolates():
+    assert percentile([4, 1, 3, 2], 50) == 2.5
+    assert percentile([1, 2, 3, 4, 5], 95) == pytest.approx(4.8)
+    assert percentile([], 50) is None
+
+def test_corpus_is_reproducible(tmp_path):
+    first = build_corpus(tmp_path / "a", seed=3, scale=0.05)
+    second = build_corpus(tmp_path / "b", seed=3, scale=0.05)
+    other_seed = build_corpus(tmp_path / "c", seed=4, scale=0.05)
+
+    digests = [d["sha256"] for d in first["documents"]]
+    assert digests == [d["sha256"] for d in second["documents"]]
+    assert digests != [d["sha256"] for d in other_seed["documents"]]
+    assert {d["name"] for d in first["documents"]} >= {"two-column", "tables", "images"}
+
+def test_find_regressions_respects_direction_and_tolerance():
+    baseline = {
+        "parsers": {
+            "PyMuPDF": {"pages_per_sec": 100.0, "p50_ms": 2.0, "p95_ms": 5.0, "peak_rss_mb": 60.0},
+            "Docling": {"error": "not installed"},
+        }
+    }
+    results = copy.deepcopy(baseline)
+    results["parsers"]["PyMuPDF"].update(pages_per_sec=80.0, p50_ms=1.0, p95_ms=5.5)
+    results["parsers"]["Docling"] = {"pages_per_sec": 1.0}
+
+    regressions = find_regressions(results, baseline, tolerance=0.15)
+
+    # Throughput fell by 20%; latency improved or stayed within tolerance
+    assert [(r["parser"], r["metric"]) for r in regressions] == [("PyMuPDF", "pages_per_sec")]
+    assert regressions[0]["change"] == pytest.approx(-0.2)
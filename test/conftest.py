@@ -1,5 +1,6 @@
 import os
 import sys
+import tempfile
 import pytest
 from fastapi.testclient import TestClient
 
@@ -7,8 +8,25 @@ from fastapi.testclient import TestClient
 # This assumes the test folder is at the root level, peer to backend
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../backend")))
 
+# Keep the on-disk result cache out of the working tree
+os.environ.setdefault("PPP_CACHE_DIR", tempfile.mkdtemp(prefix="ppp-cache-"))
+os.environ.setdefault(
+    "PPP_JOBS_DB", os.path.join(tempfile.mkdtemp(prefix="ppp-jobs-"), "jobs.sqlite3")
+)
+# Run parsers in threads so tests can patch them with (unpicklable) mocks
+os.environ.setdefault("PPP_WORKER_BACKEND", "thread")
+
+from src.cache import get_cache
 from src.main import app
 
+@pytest.fixture(autouse=True)
+def clear_result_cache():
+    # Results cached by one test must not satisfy requests made by the next
+    cache = get_cache()
+    if cache is not None:
+        cache.clear()
+    yield
+
 @pytest.fixture
 def client():
     return TestClient(app)
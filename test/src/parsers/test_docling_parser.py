@@ -1,7 +1,13 @@
 import sys
 from unittest.mock import MagicMock
 import pytest
-from src.parsers.docling_parser import DoclingParser
+from src.parsers import render
+from src.parsers.docling_parser import DoclingParser, _ConverterPool
+
+@pytest.fixture(autouse=True)
+def fresh_converters(mocker):
+    # Converters are kept per profile for the whole process; start from none
+    mocker.patch("src.parsers.docling_parser._converters", _ConverterPool())
 
 def test_docling_parser_success(mocker):
     # Mock the module that will be imported locally in the function
@@ -37,7 +43,7 @@ def test_docling_parser_success(mocker):
     mocker.patch.dict(sys.modules, {"docling.document_converter": mock_docling_module})
     
     parser = DoclingParser()
-    result = parser.parse("dummy.pdf", 1, 5)
+    result = render.markdown_document(parser.parse("dummy.pdf", 1, 5))
     
     assert "# Document Analysis" in result
     assert "Test Author" in result
@@ -49,3 +55,72 @@ def test_docling_parser_success(mocker):
     args, kwargs = mock_converter_instance.convert.call_args
     assert args[0] == "dummy.pdf"
     assert kwargs["page_range"] == (1, 5)
+
+def test_docling_parser_reuses_converter(mocker):
+    mock_docling_module = MagicMock()
+    mock_converter_cls = MagicMock()
+    mock_docling_module.DocumentConverter = mock_converter_cls
+    mock_result = mock_converter_cls.return_value.convert.return_value
+    mock_result.document.pages = []
+    mock_result.document.metadata = {}
+    mock_result.document.tables = []
+    mock_result.document.images = []
+    mocker.patch.dict(sys.modules, {"docling.document_converter": mock_docling_module})
+
+    parser = DoclingParser()
+    parser.parse("first.pdf", 1, 5)
+    parser.parse("second.pdf", 1, 5)
+
+    # The converter (and its models) is created once and kept for later requests
+    mock_converter_cls.assert_called_once()
+    assert mock_converter_cls.return_value.convert.call_count == 2
+
+def test_docling_parser_profiles(mocker):
+    mocker.patch("src.config.DOCLING_PROFILE", "accurate")
+
+    parser = DoclingParser()
+    fast = parser.with_profile("fast")
+
+    assert parser.profile == "accurate"
+    assert fast.profile == "fast"
+    # Results of different profiles are cached separately
+    assert fast.version != parser.version
+    with pytest.raises(ValueError):
+        parser.with_profile("thorough")
+
+def test_docling_parser_returns_structured_tables(mocker):
+    from types import SimpleNamespace
+
+    mock_docling_module = MagicMock()
+    mock_result = mock_docling_module.DocumentConverter.return_value.convert.return_value
+    mock_page = MagicMock()
+    mock_page.text_blocks = []
+    mock_result.document.pages = [mock_page]
+    mock_result.document.metadata = {}
+    mock_result.document.images = []
+    table = MagicMock()
+    table.prov = [
+        SimpleNamespace(page_no=1, bbox=SimpleNamespace(l=10, t=20, r=200, b=80, coord_origin="TOPLEFT"))
+    ]
+    table.data.num_rows = 1
+    table.data.num_cols = 2
+    table.data.table_cells = [
+        SimpleNamespace(
+            start_row_offset_idx=0, start_col_offset_idx=col, row_span=1, col_span=1,
+            text=text, column_header=True, row_header=False, bbox=None,
+        )
+        for col, text in enumerate(["Year", "Revenue"])
+    ]
+    mock_result.document.tables = [table]
+    mocker.patch.dict(sys.modules, {"docling.document_converter": mock_docling_module})
+
+    result = DoclingParser().parse("report.pdf", 1, 1)
+
+    [extracted] = result.pages[0].tables
+    assert extracted["page"] == 1
+    assert extracted["bbox"] == [10, 20, 200, 80]
+    assert [cell["text"] for cell in extracted["cells"]] == ["Year", "Revenue"]
+    # Renderings are produced on request only
+    table.export_to_dataframe.assert_not_called()
+    table.export_to_html.assert_not_called()
+    assert "| Year | Revenue |" in render.markdown_document(result)
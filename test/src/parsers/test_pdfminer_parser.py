@@ -0,0 +1,59 @@
+import pytest
+
+from src.parsers import render
+from src.parsers.errors import PageRangeError
+from src.parsers.pdfminer_parser import PDFMinerParser
+
+fitz = pytest.importorskip("fitz")
+pytest.importorskip("pdfminer")
+
+@pytest.fixture
+def long_pdf(tmp_path):
+    # Build a small multi-page PDF whose pages are easy to tell apart
+    doc = fitz.open()
+    for i in range(30):
+        page = doc.new_page()
+        page.insert_text((72, 72), f"Content of page {i + 1}")
+    path = tmp_path / "long.pdf"
+    doc.save(str(path))
+    doc.close()
+    return str(path)
+
+def test_pdfminer_parser_extracts_requested_range(long_pdf):
+    result = render.markdown_document(PDFMinerParser().parse(long_pdf, 21, 3))
+
+    assert "- **Total Pages**: 30" in result
+    assert "### Page 21" in result
+    assert "Content of page 23" in result
+    assert "### Page 20" not in result
+    assert "### Page 24" not in result
+    # The shared output buffer is reset between pages
+    assert result.count("Content of page") == 3
+
+def test_pdfminer_parser_clamps_to_document_end(long_pdf):
+    result = PDFMinerParser().parse(long_pdf, 29, 10)
+
+    assert result.pages_processed == 2
+    result = render.markdown_document(result)
+    assert "### Page 29" in result
+    assert "### Page 30" in result
+    assert "### Page 31" not in result
+
+def test_pdfminer_parser_start_page_out_of_range(long_pdf):
+    with pytest.raises(PageRangeError) as exc_info:
+        PDFMinerParser().parse(long_pdf, 31, 5)
+
+    assert "exceeds document length (30 pages)" in exc_info.value.message
+
+def test_pdfminer_parser_stops_at_the_deadline(long_pdf):
+    import time
+
+    # A deadline already past still lets the page being extracted finish
+    result = PDFMinerParser().parse(long_pdf, 1, 10, deadline=time.time() - 1)
+    assert result.pages_processed == 1
+    assert result.info["deadline_exceeded"]
+
+    # Nothing was cut short when the last page of the range is done
+    result = PDFMinerParser().parse(long_pdf, 30, 10, deadline=time.time() - 1)
+    assert result.pages_processed == 1
+    assert "deadline_exceeded" not in result.info
@@ -0,0 +1,49 @@
+from importlib import metadata
+
+from src.parsers.registry import ENTRY_POINT_GROUP, ParserRegistry
+
+
+def test_parsers_are_loaded_on_first_use():
+    registry = ParserRegistry()
+    registry.register("PyPDF2", ".pypdf2_parser:PyPDF2Parser")
+    registry.register("Broken", ".missing_module:Parser")
+
+    assert registry.report()["PyPDF2"]["state"] == "lazy"
+
+    parser = registry.get("PyPDF2")
+    assert parser.name == "PyPDF2"
+    assert registry.get("PyPDF2") is parser
+    assert registry.get("Broken") is None
+    assert registry.get("Unknown") is None
+
+    report = registry.report()
+    assert report["PyPDF2"]["state"] == "loaded"
+    assert report["PyPDF2"]["import_ms"] >= 0
+    assert report["Broken"]["state"] == "failed"
+
+    timings = registry.preload("PyPDF2")
+    assert timings["library_ms"] >= 0
+
+
+def test_entry_points_register_parsers(mocker):
+    entry_point = metadata.EntryPoint(
+        name="Plugin",
+        value="src.parsers.pymupdf_parser:PyMuPDFParser",
+        group=ENTRY_POINT_GROUP,
+    )
+    duplicate = metadata.EntryPoint(
+        name="pymupdf",
+        value="src.parsers.pymupdf_parser:PyMuPDFParser",
+        group=ENTRY_POINT_GROUP,
+    )
+    mocker.patch(
+        "src.parsers.registry.metadata.entry_points", return_value=[entry_point, duplicate]
+    )
+    registry = ParserRegistry()
+    registry.register("PyMuPDF", ".pymupdf_parser:PyMuPDFParser")
+    registry.discover()
+
+    # Built-in parsers win over entry points of the same name
+    assert registry.names() == ["PyMuPDF", "Plugin"]
+    assert registry.report()["Plugin"]["source"].startswith("entry point")
+    assert registry.get("Plugin").name == "PyMuPDF"
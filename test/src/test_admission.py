@@ -0,0 +1,99 @@
+import asyncio
+from unittest.mock import MagicMock
+
+import pytest
+
+from src.admission import (
+    AdmissionController,
+    AdmissionRejectedError,
+    CostBudgetExceededError,
+    estimate_request_costs,
+)
+from src.parsers.base_parser import PDFParser
+from src.parsers.results import PageResult, ParseResult
+
+def test_requests_wait_for_the_global_budget():
+    async def scenario():
+        controller = AdmissionController(
+            request_budget_ms=1000, global_budget_ms=1000, max_wait_seconds=5
+        )
+        first = await controller.admit(800)
+        waiting = asyncio.create_task(controller.admit(400))
+        await asyncio.sleep(0)
+        assert not waiting.done()
+        assert controller.stats()["waiting"] == 1
+
+        first.release()
+        second = await waiting
+        assert controller.cost_ms == 400
+        assert second.wait_ms > 0
+        second.release()
+        assert controller.cost_ms == 0
+
+    asyncio.run(scenario())
+
+def test_requests_over_budget_are_rejected():
+    async def scenario():
+        controller = AdmissionController(
+            request_budget_ms=1000, global_budget_ms=1000, max_wait_seconds=1
+        )
+        with pytest.raises(CostBudgetExceededError):
+            await controller.admit(1500)
+
+        # The admitted request is expected to run for a minute
+        running = await controller.admit(60_000, check_request_budget=False)
+        with pytest.raises(AdmissionRejectedError) as e:
+            await controller.admit(500)
+        assert e.value.retry_after >= 59
+        running.release()
+
+    asyncio.run(scenario())
+
+def test_parse_endpoint_rejects_costly_requests(client, mocker, sample_pdf_content):
+    import fitz
+
+    mocker.patch(
+        "src.admission._controller",
+        AdmissionController(request_budget_ms=5000, global_budget_ms=0, max_wait_seconds=1),
+    )
+    mocker.patch("src.config.COST_PAGE_MS", {"docling": 1000})
+    mocker.patch("src.config.COST_MB_MS", 0)
+    parser = MagicMock(spec=PDFParser)
+    parser.parse.return_value = ParseResult("Docling", pages=[PageResult(1, text="Text")])
+    parser.version = "1/test"
+    mocker.patch("src.main.get_parser", return_value=parser)
+    document = fitz.open()
+    for _ in range(20):
+        document.new_page()
+
+    data = {"parser_type": "docling", "max_pages": 500}
+    files = {"file": ("long.pdf", document.tobytes(), "application/pdf")}
+    response = client.post("/api/v1/parse", files=files, data=data)
+
+    assert response.status_code == 413
+    assert "limit of 5000 ms" in response.json()["detail"]
+    parser.parse.assert_not_called()
+
+    # The estimate is capped by the pages the document actually has
+    files = {"file": ("short.pdf", sample_pdf_content, "application/pdf")}
+    response = client.post("/api/v1/parse", files=files, data=data)
+    assert response.status_code == 200
+    assert response.json()["metadata"]["admission"]["cost_ms"] == 1000
+
+def test_cost_estimate_is_kept_when_pages_cannot_be_counted_in_time(mocker, sample_pdf_content):
+    from src.workers import DeadlineExceededError
+
+    mocker.patch(
+        "src.admission._controller",
+        AdmissionController(request_budget_ms=5000, global_budget_ms=0, max_wait_seconds=1),
+    )
+    mocker.patch("src.config.COST_PAGE_MS", {"docling": 1000})
+    mocker.patch("src.config.COST_MB_MS", 0)
+    pool = MagicMock()
+    pool.run = mocker.AsyncMock(side_effect=DeadlineExceededError("PyMuPDF", 2.0))
+    mocker.patch("src.admission.get_pool", return_value=pool)
+
+    costs = asyncio.run(estimate_request_costs(["Docling"], 500, 1000, sample_pdf_content))
+
+    assert costs == {"Docling": 500_000}
+    assert pool.run.call_args.kwargs["deadline"] is not None
@@ -0,0 +1,40 @@
+from src.cache import ResultCache, make_cache_key
+
+def test_cache_key_depends_on_every_component():
+    base = make_cache_key("abc", "PyMuPDF", 1, 10, "1/pymupdf==1.0")
+    assert base == make_cache_key("abc", "PyMuPDF", 1, 10, "1/pymupdf==1.0")
+    assert base != make_cache_key("abd", "PyMuPDF", 1, 10, "1/pymupdf==1.0")
+    assert base != make_cache_key("abc", "PDFMiner", 1, 10, "1/pymupdf==1.0")
+    assert base != make_cache_key("abc", "PyMuPDF", 2, 10, "1/pymupdf==1.0")
+    assert base != make_cache_key("abc", "PyMuPDF", 1, 5, "1/pymupdf==1.0")
+    assert base != make_cache_key("abc", "PyMuPDF", 1, 10, "2/pymupdf==1.0")
+
+def test_memory_tier_evicts_least_recently_used():
+    cache = ResultCache(memory_max_bytes=60)
+    cache.put("a", {"content": "x" * 10})
+    cache.put("b", {"content": "y" * 10})
+    cache.get("a")  # "a" becomes the most recently used entry
+    cache.put("c", {"content": "z" * 10})
+
+    assert cache.get("a") is not None
+    assert cache.get("b") is None
+    assert cache.get("c") is not None
+    assert cache.stats()["hits"] == 3
+    assert cache.stats()["misses"] == 1
+
+def test_disk_tier_survives_restart(tmp_path):
+    cache = ResultCache(tmp_path, memory_max_bytes=1024, disk_max_bytes=1024)
+    cache.put("key1", {"content": "hello"})
+
+    reopened = ResultCache(tmp_path, memory_max_bytes=1024, disk_max_bytes=1024)
+    assert reopened.get("key1") == {"content": "hello"}
+    assert reopened.stats()["disk_entries"] == 1
+
+def test_disk_tier_respects_size_budget(tmp_path):
+    cache = ResultCache(tmp_path, memory_max_bytes=0, disk_max_bytes=50)
+    cache.put("key1", {"content": "a" * 20})
+    cache.put("key2", {"content": "b" * 20})
+
+    assert cache.get("key1") is None
+    assert cache.get("key2") == {"content": "b" * 20}
+    assert len(list(tmp_path.glob("*/*.json"))) == 1
@@ -0,0 +1,83 @@
+import time
+
+import fitz
+
+from src.documents import DocumentStore, HandleCache, get_handle_cache
+from src.parsers.handles import DocumentHandle
+from src.uploads import ReceivedUpload
+
+def make_document(pages):
+    document = fitz.open()
+    for number in range(1, pages + 1):
+        document.new_page().insert_text((72, 72), f"Page {number} of the session")
+    return document.tobytes()
+
+def test_document_pages_reuse_open_handles(client):
+    response = client.post(
+        "/api/v1/documents", files={"file": ("long.pdf", make_document(6), "application/pdf")}
+    )
+    assert response.status_code == 201
+    document_id = response.json()["document_id"]
+    url = f"/api/v1/documents/{document_id}/pages"
+
+    first = client.get(url, params={"parser": "pymupdf", "start": 0, "count": 2, "format": "text"})
+    second = client.get(url, params={"parser": "pymupdf", "start": 2, "count": 2, "format": "text"})
+    repeated = client.get(url, params={"parser": "pymupdf", "start": 2, "count": 2, "format": "text"})
+    miner = client.get(url, params={"parser": "pdfminer", "start": 4, "count": 5, "format": "json"})
+
+    assert first.json()["metadata"]["handle"] == "opened"
+    assert second.json()["metadata"]["handle"] == "reused"
+    assert repeated.json()["metadata"]["handle"] == "cached"
+    assert "Page 3 of the session" in second.json()["content"]
+    assert miner.json()["metadata"]["handle"] == "opened"
+    assert [page["number"] for page in miner.json()["content"]["pages"]] == [5, 6]
+
+    out_of_range = client.get(url, params={"parser": "pymupdf", "start": 10})
+    assert out_of_range.status_code == 400
+
+    assert client.delete(f"/api/v1/documents/{document_id}").status_code == 200
+    assert client.get(url, params={"parser": "pymupdf"}).status_code == 404
+
+def test_deleting_a_document_closes_worker_handles(client):
+    response = client.post(
+        "/api/v1/documents", files={"file": ("long.pdf", make_document(2), "application/pdf")}
+    )
+    document_id = response.json()["document_id"]
+    url = f"/api/v1/documents/{document_id}/pages"
+    assert client.get(url, params={"parser": "pymupdf", "count": 1}).status_code == 200
+
+    cache = get_handle_cache()
+    (key,) = [key for key in cache._handles if key[1] == document_id]
+    closed = []
+    cache._handles[key][0].on_close(lambda: closed.append(key))
+
+    assert client.delete(f"/api/v1/documents/{document_id}").status_code == 200
+    deadline = time.monotonic() + 5
+    while not closed and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert closed == [key]
+    assert key not in cache._handles
+
+def test_stores_evict_least_recently_used():
+    store = DocumentStore(max_documents=2, max_bytes=0, ttl_seconds=0)
+    ids = [
+        store.add(ReceivedUpload(f"{name}.pdf", 10, name, data=b"%PDF-")).id
+        for name in ("a", "b")
+    ]
+    with store.lease(ids[0]) as leased:
+        store.get(ids[0])
+        store.add(ReceivedUpload("c.pdf", 10, "c", data=b"%PDF-"))
+        # Evicted while in use, so kept open until the lease ends
+        assert store.get(ids[1]) is None
+        store.add(ReceivedUpload("d.pdf", 10, "d", data=b"%PDF-"))
+        assert store.get(ids[0]) is None
+        assert bytes(leased.source) == b"%PDF-"
+    assert leased.source is None
+
+    closed = []
+    cache = HandleCache(max_handles=3, max_bytes=25, ttl_seconds=0)
+    for key in ("a", "b", "c"):
+        cache.checkin(key, DocumentHandle(None, 1, 10, closers=[lambda key=key: closed.append(key)]))
+    assert closed == ["a"]
+    assert cache.checkout("a") is None
+    assert cache.checkout("b") is not None
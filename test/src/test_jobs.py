@@ -0,0 +1,207 @@
+import asyncio
+import threading
+import time
+from unittest.mock import MagicMock
+
+import pytest
+from fastapi.testclient import TestClient
+
+from src.jobs import JobManager, JobQueueFullError, JobStore
+from src.main import app
+from src.parsers.base_parser import PDFParser
+from src.parsers.results import PageResult
+
+@pytest.fixture
+def jobs_client(mocker):
+    mocker.patch("src.config.WARMUP_PARSERS", [])
+    # Jobs run in the background of the app's event loop, which only lives
+    # as long as the client context
+    with TestClient(app) as client:
+        yield client
+
+@pytest.fixture
+def mock_parser(mocker):
+    parser = MagicMock(spec=PDFParser)
+    parser.name = "PyMuPDF"
+
+    def extract_pages(source, start_page, max_pages, deadline=None):
+        # A twenty page document
+        numbers = range(start_page, min(start_page + max_pages, 21))
+        return {"page_count": 20}, [PageResult(n, text=f"Text {n}") for n in numbers]
+
+    parser.extract_pages.side_effect = extract_pages
+    mocker.patch("src.main.get_parser", return_value=parser)
+    return parser
+
+def _wait_for(client, job_id, statuses, timeout=5):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = client.get(f"/api/v1/jobs/{job_id}").json()
+        if job["status"] in statuses:
+            return job
+        time.sleep(0.01)
+    raise AssertionError(f"Job {job_id} did not reach {statuses}")
+
+def test_job_runs_in_background(jobs_client, mock_parser, sample_pdf_content):
+    files = {"file": ("test.pdf", sample_pdf_content, "application/pdf")}
+    response = jobs_client.post("/api/v1/jobs", files=files, data={"parser_type": "pymupdf"})
+
+    assert response.status_code == 202
+    job_id = response.json()["id"]
+    assert response.headers["Location"] == f"/api/v1/jobs/{job_id}"
+
+    job = _wait_for(jobs_client, job_id, ["succeeded"])
+    assert job["progress"] == {"pages_done": 20, "pages_total": 20}
+    assert [p["page"] for p in job["pages"]] == list(range(1, 21))
+    assert "Total Pages**: 20" in job["header"]
+    assert "Text 7" in job["pages"][6]["content"]
+    assert job["metadata"]["pages_processed"] == 20
+    assert job["expires_at"] > job["finished_at"]
+
+    # Pages already received can be skipped when polling
+    later = jobs_client.get(f"/api/v1/jobs/{job_id}", params={"since": 18}).json()
+    assert [p["page"] for p in later["pages"]] == [19, 20]
+
+def test_job_tables_are_served_on_request(jobs_client, mocker, sample_pdf_content):
+    table = {
+        "index": 1,
+        "page": 2,
+        "bbox": [10.0, 20.0, 200.0, 80.0],
+        "num_rows": 2,
+        "num_cols": 2,
+        "cells": [
+            {"row": 0, "col": 0, "row_span": 1, "col_span": 2, "text": "Revenue",
+             "column_header": True, "row_header": False, "bbox": None},
+            {"row": 1, "col": 0, "row_span": 1, "col_span": 1, "text": "2024",
+             "column_header": False, "row_header": False, "bbox": None},
+            {"row": 1, "col": 1, "row_span": 1, "col_span": 1, "text": "1,200",
+             "column_header": False, "row_header": False, "bbox": None},
+        ],
+    }
+    parser = MagicMock(spec=PDFParser)
+    parser.name = "Docling"
+    parser.extract_pages.return_value = (
+        {"page_count": 2},
+        [PageResult(1, text="Intro"), PageResult(2, text="Results", tables=[table])],
+    )
+    mocker.patch("src.main.get_parser", return_value=parser)
+
+    files = {"file": ("test.pdf", sample_pdf_content, "application/pdf")}
+    job_id = jobs_client.post("/api/v1/jobs", files=files, data={"parser_type": "docling"}).json()["id"]
+    job = _wait_for(jobs_client, job_id, ["succeeded"])
+
+    assert [p["tables"] for p in job["pages"]] == [[], [1]]
+    assert "| Revenue | Revenue |" in job["pages"][1]["content"]
+
+    url = f"/api/v1/jobs/{job_id}/tables/1"
+    assert jobs_client.get(url).json() == table
+    response = jobs_client.get(url, params={"format": "csv"})
+    assert response.headers["content-type"].startswith("text/csv")
+    assert response.text.splitlines() == ["Revenue,Revenue", '2024,"1,200"']
+    assert '<th colspan="2">Revenue</th>' in jobs_client.get(url, params={"format": "html"}).text
+    assert jobs_client.get(url, params={"format": "pdf"}).status_code == 400
+    assert jobs_client.get(f"/api/v1/jobs/{job_id}/tables/2").status_code == 404
+
+def test_job_can_be_cancelled(jobs_client, mock_parser, sample_pdf_content):
+    release = threading.Event()
+    extract_pages = mock_parser.extract_pages.side_effect
+
+    def blocking_extract_pages(source, start_page, max_pages, deadline=None):
+        if start_page > 1:
+            release.wait(5)
+        return extract_pages(source, start_page, max_pages)
+
+    mock_parser.extract_pages.side_effect = blocking_extract_pages
+
+    files = {"file": ("test.pdf", sample_pdf_content, "application/pdf")}
+    job_id = jobs_client.post(
+        "/api/v1/jobs", files=files, data={"parser_type": "pymupdf"}
+    ).json()["id"]
+
+    # The first page is stored while the next batch is still running
+    deadline = time.monotonic() + 5
+    while jobs_client.get(f"/api/v1/jobs/{job_id}").json()["progress"]["pages_done"] < 1:
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+
+    response = jobs_client.delete(f"/api/v1/jobs/{job_id}")
+    release.set()
+
+    assert response.json() == {"id": job_id, "status": "cancelled"}
+    job = jobs_client.get(f"/api/v1/jobs/{job_id}").json()
+    assert job["status"] == "cancelled"
+    assert [p["page"] for p in job["pages"]] == [1]
+
+    # Deleting a finished job removes it
+    assert jobs_client.delete(f"/api/v1/jobs/{job_id}").json()["status"] == "deleted"
+    assert jobs_client.get(f"/api/v1/jobs/{job_id}").status_code == 404
+
+def test_jobs_are_rejected_when_the_queue_is_full(jobs_client, mocker, mock_parser, sample_pdf_content):
+    mocker.patch("src.main.get_job_manager").return_value = manager = MagicMock()
+    manager.check_capacity.side_effect = JobQueueFullError(3)
+
+    files = {"file": ("test.pdf", sample_pdf_content, "application/pdf")}
+    response = jobs_client.post("/api/v1/jobs", files=files, data={"parser_type": "pymupdf"})
+
+    assert response.status_code == 503
+    assert "3 jobs waiting" in response.json()["detail"]
+    manager.submit.assert_not_called()
+
+def test_job_manager_limits_queued_jobs(mocker, tmp_path):
+    store = JobStore(str(tmp_path / "jobs.sqlite3"))
+    manager = JobManager(store, concurrency=1, queue_limit=1)
+    release = asyncio.Event()
+
+    async def blocked_run(*args):
+        await release.wait()
+
+    mocker.patch.object(manager, "_run", side_effect=blocked_run)
+
+    async def scenario():
+        for _ in range(2):
+            await manager.submit(MagicMock(filename="a.pdf"), "pymupdf", "PyMuPDF", None, 1, None)
+        assert manager.queued == 1
+        upload = MagicMock()
+        with pytest.raises(JobQueueFullError):
+            await manager.submit(upload, "pymupdf", "PyMuPDF", None, 1, None)
+        upload.close.assert_called_once()
+        release.set()
+
+    asyncio.run(scenario())
+    store.close()
+
+def test_job_store_expires_and_interrupts_jobs(tmp_path):
+    store = JobStore(str(tmp_path / "jobs.sqlite3"))
+    store.create("done", "pymupdf", "a.pdf", 1, None, "first")
+    store.finish("done", "succeeded", ttl=-1)
+    store.create("running", "pymupdf", "b.pdf", 1, None, "first")
+    store.mark_running("running")
+    store.create("other", "pymupdf", "c.pdf", 1, None, "second")
+
+    # Expired jobs are hidden, then purged
+    assert store.get("done") is None
+    assert store.purge_expired() == 1
+
+    # A stopping manager only fails its own jobs
+    assert store.interrupt_active(ttl=60, owner="first") == 1
+    assert store.get("running")["status"] == "failed"
+    assert store.get("other")["status"] == "queued"
+    store.close()
+
+def test_job_store_interrupts_jobs_of_stopped_managers(tmp_path, mocker):
+    store = JobStore(str(tmp_path / "jobs.sqlite3"))
+    store.heartbeat("alive")
+    store.heartbeat("gone")
+    store.create("kept", "pymupdf", "a.pdf", 1, None, "alive")
+    store.create("orphaned", "pymupdf", "b.pdf", 1, None, "gone")
+    store.create("legacy", "pymupdf", "c.pdf", 1, None)
+
+    now = time.time()
+    mocker.patch("src.jobs.time.time", return_value=now + 100)
+    store.heartbeat("alive")
+    assert store.interrupt_orphaned(ttl=60, stale_after=50) == 2
+
+    assert store.get("kept")["status"] == "queued"
+    assert store.get("orphaned")["status"] == "failed"
+    assert store.get("legacy")["status"] == "failed"
+    store.close()
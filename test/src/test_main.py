@@ -1,7 +1,15 @@
+import asyncio
+import os
+import time
 from unittest.mock import MagicMock
 from src.parsers.base_parser import PDFParser
+from src.parsers.results import PageResult, ParseResult
 import pytest
 
+def make_result(parser_name, *texts, page_count=None):
+    pages = [PageResult(i + 1, text=text) for i, text in enumerate(texts)]
+    return ParseResult(parser_name, pages=pages, info={"page_count": page_count or len(pages)})
+
 def test_read_root(client):
     response = client.get("/")
     assert response.status_code == 200
@@ -15,8 +23,7 @@ def test_health_check(client):
 def test_parse_endpoint_success(client, mocker, sample_pdf_content):
     # Mock the parser instance
     mock_parser_instance = MagicMock(spec=PDFParser)
-    expected_content = "# Parsed Content\n\nSome text."
-    mock_parser_instance.parse.return_value = expected_content
+    mock_parser_instance.parse.return_value = make_result("Docling", "Some text.", page_count=12)
     
     # Mock get_parser to return our mock instance
     # Note: 'src.main.get_parser' or 'main.get_parser' depends on how it's imported in the test vs app
@@ -32,18 +39,50 @@ def test_parse_endpoint_success(client, mocker, sample_pdf_content):
     assert response.status_code == 200
     json_response = response.json()
     assert json_response["status"] == "success"
-    assert json_response["content"] == expected_content
+    assert json_response["content"].startswith("# Document Analysis with Docling")
+    assert "Some text." in json_response["content"]
     assert json_response["metadata"]["parser"] == "docling"
+    # Page counts are reported as extracted, not as requested
+    assert json_response["metadata"]["pages_processed"] == 1
+    assert json_response["metadata"]["page_count"] == 12
     assert "duration_ms" in json_response["metadata"]
     assert isinstance(json_response["metadata"]["duration_ms"], float)
     
     # Verify parser was called correctly (start_page + 1)
     mock_parser_instance.parse.assert_called_once()
-    # args: (filepath, start_page, max_pages)
+    # args: (source, start_page, max_pages); small uploads are passed in memory
     call_args = mock_parser_instance.parse.call_args
+    assert bytes(call_args[0][0]) == sample_pdf_content
     assert call_args[0][1] == 1 # 0 + 1
     assert call_args[0][2] == 5
 
+def test_parse_endpoint_rejects_oversized_upload(client, mocker, sample_pdf_content):
+    mock_parser_instance = MagicMock(spec=PDFParser)
+    mocker.patch("src.main.get_parser", return_value=mock_parser_instance)
+    mocker.patch("src.config.UPLOAD_MAX_BYTES", len(sample_pdf_content) - 1)
+
+    files = {"file": ("test.pdf", sample_pdf_content, "application/pdf")}
+    response = client.post("/api/v1/parse", files=files, data={"parser_type": "pymupdf"})
+
+    assert response.status_code == 413
+    mock_parser_instance.parse.assert_not_called()
+
+def test_parse_endpoint_formats(client, mocker, sample_pdf_content):
+    mock_parser_instance = MagicMock(spec=PDFParser)
+    mock_parser_instance.parse.return_value = make_result("PyMuPDF", "First", "Second")
+    mocker.patch("src.main.get_parser", return_value=mock_parser_instance)
+
+    files = {"file": ("test.pdf", sample_pdf_content, "application/pdf")}
+
+    def parse(output_format):
+        data = {"parser_type": "pymupdf", "format": output_format}
+        return client.post("/api/v1/parse", files=files, data=data)
+
+    assert parse("text").json()["content"] == "First\fSecond"
+    pages = parse("json").json()["content"]["pages"]
+    assert [(p["number"], p["text"]) for p in pages] == [(1, "First"), (2, "Second")]
+    assert parse("html").status_code == 400
+
 def test_parse_endpoint_invalid_parser(client, sample_pdf_content):
     files = {"file": ("test.pdf", sample_pdf_content, "application/pdf")}
     data = {"parser_type": "invalid_parser_type"}
@@ -53,6 +92,29 @@ def test_parse_endpoint_invalid_parser(client, sample_pdf_content):
     assert response.status_code == 400
     assert "Invalid parser type" in response.json()["detail"]
 
+def test_parse_endpoint_docling_profile(client, mocker, sample_pdf_content):
+    from src.parsers.docling_parser import DoclingParser
+
+    mock_parser_instance = MagicMock(spec=DoclingParser)
+    profiled = mock_parser_instance.with_profile.return_value
+    profiled.parse.return_value = make_result("Docling", "Parsed text")
+    profiled.version = "2/docling==1.0/fast"
+    mocker.patch("src.main.get_parser", return_value=mock_parser_instance)
+
+    files = {"file": ("test.pdf", sample_pdf_content, "application/pdf")}
+    data = {"parser_type": "docling", "docling_profile": "Fast"}
+
+    response = client.post("/api/v1/parse", files=files, data=data)
+
+    assert response.status_code == 200
+    mock_parser_instance.with_profile.assert_called_once_with("fast")
+    profiled.parse.assert_called_once()
+
+    data["docling_profile"] = "thorough"
+    response = client.post("/api/v1/parse", files=files, data=data)
+    assert response.status_code == 400
+    assert "Invalid Docling profile" in response.json()["detail"]
+
 def test_parse_endpoint_parser_failure(client, mocker, sample_pdf_content):
     mock_parser_instance = MagicMock(spec=PDFParser)
     mock_parser_instance.parse.side_effect = Exception("Parsing crashed")
@@ -65,3 +127,466 @@ def test_parse_endpoint_parser_failure(client, mocker, sample_pdf_content):
 
     assert response.status_code == 500
     assert "Parsing failed" in response.json()["detail"]
+
+def test_parse_endpoint_cache_hit(client, mocker, sample_pdf_content):
+    mock_parser_instance = MagicMock(spec=PDFParser)
+    mock_parser_instance.parse.return_value = make_result("PyMuPDF", "Parsed text")
+    mock_parser_instance.version = "1/test==1.0"
+    mocker.patch("src.main.get_parser", return_value=mock_parser_instance)
+
+    files = {"file": ("test.pdf", sample_pdf_content, "application/pdf")}
+    data = {"parser_type": "pymupdf", "start_page": 0, "max_pages": 5}
+
+    first = client.post("/api/v1/parse", files=files, data=data).json()
+    second = client.post("/api/v1/parse", files=files, data=data).json()
+
+    # The second request is served from the cache without running the parser
+    mock_parser_instance.parse.assert_called_once()
+    assert first["metadata"]["cache"]["hit"] is False
+    assert second["metadata"]["cache"]["hit"] is True
+    assert second["metadata"]["cache"]["hits"] == 1
+    assert second["content"] == first["content"]
+    assert second["metadata"]["pages_processed"] == 1
+
+def test_parse_endpoint_returns_partial_results(client, mocker, sample_pdf_content):
+    import time
+
+    result = make_result("PyMuPDF", "Page one", "Page two", page_count=5)
+    result.info["deadline_exceeded"] = True
+    mock_parser_instance = MagicMock(spec=PDFParser)
+    mock_parser_instance.parse.return_value = result
+    mock_parser_instance.version = "1/test==1.0"
+    mocker.patch("src.main.get_parser", return_value=mock_parser_instance)
+
+    files = {"file": ("test.pdf", sample_pdf_content, "application/pdf")}
+    data = {"parser_type": "pymupdf", "max_pages": 5, "timeout": 2}
+
+    start = time.time()
+    first = client.post("/api/v1/parse", files=files, data=data).json()
+    client.post("/api/v1/parse", files=files, data=data)
+
+    assert first["metadata"]["partial"] is True
+    assert first["metadata"]["pages_processed"] == 2
+    # The request's timeout is shorter than the parser's deadline
+    deadline = mock_parser_instance.parse.call_args[0][4]
+    assert start < deadline <= time.time() + 2
+    # Partial results are not cached
+    assert mock_parser_instance.parse.call_count == 2
+
+def test_parse_endpoint_does_not_cache_errors(client, mocker, sample_pdf_content):
+    from src.parsers.errors import InvalidDocumentError
+
+    mock_parser_instance = MagicMock(spec=PDFParser)
+    mock_parser_instance.parse.side_effect = InvalidDocumentError("Not a PDF")
+    mock_parser_instance.version = "1/test==1.0"
+    mocker.patch("src.main.get_parser", return_value=mock_parser_instance)
+
+    files = {"file": ("test.pdf", sample_pdf_content, "application/pdf")}
+    data = {"parser_type": "pymupdf"}
+
+    first = client.post("/api/v1/parse", files=files, data=data)
+    client.post("/api/v1/parse", files=files, data=data)
+
+    # Typed parser errors map to client errors
+    assert first.status_code == 422
+    assert first.json()["detail"] == "Not a PDF"
+    assert mock_parser_instance.parse.call_count == 2
+
+def test_parse_endpoint_pool_saturated(client, mocker, sample_pdf_content):
+    from src.workers import PoolSaturatedError
+
+    mock_parser_instance = MagicMock(spec=PDFParser)
+    mocker.patch("src.main.get_parser", return_value=mock_parser_instance)
+    mock_pool = MagicMock()
+    mock_pool.run = mocker.AsyncMock(side_effect=PoolSaturatedError("PyMuPDF", 7))
+    mocker.patch("src.main.get_pool", return_value=mock_pool)
+
+    files = {"file": ("test.pdf", sample_pdf_content, "application/pdf")}
+    data = {"parser_type": "pymupdf"}
+
+    response = client.post("/api/v1/parse", files=files, data=data)
+
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "7"
+
+def test_parse_endpoint_profile(client, mocker, sample_pdf_content):
+    files = {"file": ("test.pdf", sample_pdf_content, "application/pdf")}
+    data = {"parser_type": "pymupdf", "profile": "cprofile"}
+
+    # Profiling is opt-in on the server
+    assert client.post("/api/v1/parse", files=files, data=data).status_code == 403
+
+    mocker.patch("src.config.PROFILING_ENABLED", True)
+    response = client.post("/api/v1/parse", files=files, data=data)
+
+    assert response.status_code == 200
+    metadata = response.json()["metadata"]
+    # Profiled parses bypass the cache
+    assert "cache" not in metadata
+    profile = metadata["profile"]
+    assert list(profile["stages_ms"]) == [
+        "upload", "queue_and_transfer", "open", "extract_pages", "other", "render"
+    ]
+    assert [page["number"] for page in profile["pages"]] == [1]
+    assert "cumulative" in profile["cprofile"]
+    assert profile["total_ms"] >= sum(profile["stages_ms"].values())
+
+def test_readiness_waits_for_warm_up(mocker):
+    import time
+    from fastapi.testclient import TestClient
+    from src.main import app
+    from src.workers import shutdown_pools
+
+    mocker.patch(
+        "src.parsers.docling_parser.DoclingParser.warm_up",
+        return_value={"pid": 1, "load_ms": 5.0},
+    )
+    shutdown_pools()
+    try:
+        # Without the startup warm-up the Docling workers are not ready yet
+        assert TestClient(app).get("/ready").status_code == 503
+
+        with TestClient(app) as client:
+            for _ in range(100):
+                response = client.get("/ready")
+                if response.status_code == 200:
+                    break
+                time.sleep(0.01)
+
+        assert response.status_code == 200
+        assert response.json()["pools"]["Docling"]["workers"][0]["load_ms"] == 5.0
+    finally:
+        shutdown_pools()
+
+def test_compare_endpoint_streams_one_record_per_parser(client, mocker, sample_pdf_content):
+    import json
+
+    parsers = {}
+    for name in ("PyMuPDF", "PDFMiner"):
+        parsers[name] = MagicMock(spec=PDFParser)
+        parsers[name].parse.return_value = make_result(name, f"Parsed by {name}")
+        parsers[name].version = f"1/{name}"
+    mocker.patch("src.main.get_parser", side_effect=parsers.get)
+
+    files = {"file": ("test.pdf", sample_pdf_content, "application/pdf")}
+    data = {"parser_types": ["pymupdf", "pdfminer"], "max_pages": 3}
+
+    response = client.post("/api/v1/parse/compare", files=files, data=data)
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    records = {r["parser"]: r for r in map(json.loads, response.text.splitlines())}
+    assert set(records) == {"pymupdf", "pdfminer"}
+    assert "Parsed by PyMuPDF" in records["pymupdf"]["content"]
+    assert records["pymupdf"]["metadata"]["pages_processed"] == 1
+    assert records["pdfminer"]["status"] == "success"
+    assert "duration_ms" in records["pdfminer"]["metadata"]
+    # Both parsers read the same uploaded copy of the file
+    pymupdf_path = parsers["PyMuPDF"].parse.call_args[0][0]
+    assert pymupdf_path == parsers["PDFMiner"].parse.call_args[0][0]
+
+def test_compare_endpoint_reports_parser_errors(client, mocker, sample_pdf_content):
+    import json
+
+    failing = MagicMock(spec=PDFParser)
+    failing.parse.side_effect = Exception("Parsing crashed")
+    mocker.patch("src.main.get_parser", return_value=failing)
+
+    files = {"file": ("test.pdf", sample_pdf_content, "application/pdf")}
+    data = {"parser_types": "pypdf2"}
+
+    response = client.post("/api/v1/parse/compare", files=files, data=data)
+
+    record = json.loads(response.text.splitlines()[0])
+    assert record["status"] == "error"
+    assert "Parsing crashed" in record["error"]
+
+def test_compare_endpoint_invalid_parser(client, sample_pdf_content):
+    files = {"file": ("test.pdf", sample_pdf_content, "application/pdf")}
+    data = {"parser_types": "pymupdf,invalid_parser_type"}
+
+    response = client.post("/api/v1/parse/compare", files=files, data=data)
+
+    assert response.status_code == 400
+
+def test_stream_endpoint_yields_pages_as_extracted(client, mocker, sample_pdf_content):
+    import json
+    from src.parsers.results import PageResult
+
+    def extract_pages(file_path, start_page, max_pages, deadline=None):
+        # A three page document
+        numbers = range(start_page, min(start_page + max_pages, 4))
+        return {"page_count": 3}, [PageResult(n, text=f"Text {n}") for n in numbers]
+
+    mock_parser_instance = MagicMock(spec=PDFParser)
+    mock_parser_instance.name = "PyMuPDF"
+    mock_parser_instance.extract_pages.side_effect = extract_pages
+    mocker.patch("src.main.get_parser", return_value=mock_parser_instance)
+
+    files = {"file": ("test.pdf", sample_pdf_content, "application/pdf")}
+    data = {"parser_type": "pymupdf", "start_page": 0, "max_pages": 10}
+
+    response = client.post("/api/v1/parse/stream", files=files, data=data)
+
+    records = [json.loads(line) for line in response.text.splitlines()]
+    assert [r["event"] for r in records] == ["start", "page", "page", "page", "end"]
+    assert "Total Pages**: 3" in records[0]["content"]
+    assert [r["page"] for r in records[1:4]] == [1, 2, 3]
+    assert "Text 2" in records[2]["content"]
+    assert records[-1]["metadata"]["pages_processed"] == 3
+    # The first page is extracted on its own, the rest in one batch
+    calls = [c.args[1:3] for c in mock_parser_instance.extract_pages.call_args_list]
+    assert calls == [(1, 1), (2, 8)]
+
+def test_stream_endpoint_reports_parser_errors(client, mocker, sample_pdf_content):
+    import json
+    from src.parsers.errors import ParserError
+
+    mock_parser_instance = MagicMock(spec=PDFParser)
+    mock_parser_instance.extract_pages.side_effect = ParserError("Start page (50) exceeds document length (3 pages).")
+    mocker.patch("src.main.get_parser", return_value=mock_parser_instance)
+
+    files = {"file": ("test.pdf", sample_pdf_content, "application/pdf")}
+    data = {"parser_type": "pymupdf", "start_page": 49}
+
+    response = client.post("/api/v1/parse/stream", files=files, data=data)
+
+    records = [json.loads(line) for line in response.text.splitlines()]
+    assert records == [{
+        "event": "error",
+        "error": "Start page (50) exceeds document length (3 pages).",
+        "content": "# Error\n\nStart page (50) exceeds document length (3 pages).",
+    }]
+
+def test_spans_endpoint_returns_columns(client):
+    import io
+
+    import fitz
+    import numpy as np
+
+    document = fitz.open()
+    for number in (1, 2):
+        document.new_page().insert_text((72, 72), f"Hello page {number}", fontsize=12)
+    files = {"file": ("layout.pdf", document.tobytes(), "application/pdf")}
+
+    response = client.post("/api/v1/parse/spans", files=files, data={"max_pages": 5})
+
+    assert response.status_code == 200
+    assert response.headers["content-disposition"] == 'attachment; filename="layout.npz"'
+    arrays = np.load(io.BytesIO(response.content), allow_pickle=False)
+    assert arrays["page_number"].tolist() == [1, 2]
+    assert arrays["page"].tolist() == [1, 2]
+    offsets = arrays["text_offsets"]
+    texts = [bytes(arrays["text"][offsets[i]:offsets[i + 1]]).decode() for i in range(2)]
+    assert texts == ["Hello page 1", "Hello page 2"]
+    assert np.allclose(arrays["size"], 12)
+    assert (arrays["x0"] >= 72 - 1).all() and (arrays["x1"] > arrays["x0"]).all()
+
+    words = client.post("/api/v1/parse/spans", files=files, data={"granularity": "words"})
+    arrays = np.load(io.BytesIO(words.content), allow_pickle=False)
+    assert len(arrays["page"]) == 6
+    assert (arrays["font"] == -1).all()
+
+def test_spans_endpoint_stops_at_the_deadline(client, mocker, sample_pdf_content):
+    from src.workers import DeadlineExceededError
+
+    mocker.patch("src.config.PARSE_TIMEOUT_GRACE_SECONDS", 5)
+    mock_pool = MagicMock()
+    mock_pool.run = mocker.AsyncMock(side_effect=DeadlineExceededError("PyMuPDF", 7.0))
+    mocker.patch("src.main.get_pool", return_value=mock_pool)
+    files = {"file": ("test.pdf", sample_pdf_content, "application/pdf")}
+
+    response = client.post("/api/v1/parse/spans", files=files, data={"timeout": 2})
+
+    assert response.status_code == 504
+    deadline = mock_pool.run.call_args.kwargs["deadline"]
+    assert 0 < deadline - time.time() <= 2 + 5
+
+def test_analyze_endpoint_reports_pages_and_costs(client, mocker):
+    import fitz
+
+    mocker.patch("src.config.AUTO_MIN_RULINGS", 8)
+    document = fitz.open()
+    document.new_page().insert_text((72, 72), "Plain text page", fontsize=12)
+    table_page = document.new_page()
+    for i in range(5):
+        table_page.draw_line((72, 100 + 30 * i), (372, 100 + 30 * i))
+        table_page.draw_line((72 + 75 * i, 100), (72 + 75 * i, 220))
+    files = {"file": ("report.pdf", document.tobytes(), "application/pdf")}
+
+    first = client.post("/api/v1/analyze", files=files).json()
+    second = client.post("/api/v1/analyze", files=files).json()
+
+    assert first["page_count"] == 2
+    assert first["encrypted"] is False
+    assert [page["text_layer"] for page in first["pages"]] == [True, False]
+    assert first["table_candidates"] == 1
+    assert [page["route"] for page in first["pages"]] == ["fast", "layout"]
+    costs = first["estimated_cost_ms"]
+    assert costs["pymupdf"] < costs["auto"] < costs["docling"]
+    assert first["cache"]["hit"] is False
+    assert second["cache"]["hit"] is True
+    assert second["pages"] == first["pages"]
+
+def test_images_endpoint_extracts_each_image_once(client):
+    import io
+    import json
+    import zipfile
+
+    import fitz
+
+    logo = fitz.Pixmap(fitz.csRGB, fitz.IRect(0, 0, 64, 32), False)
+    logo.clear_with(200)
+    logo = logo.tobytes("png")
+    document = fitz.open()
+    for number in (1, 2, 3):
+        page = document.new_page()
+        page.insert_text((72, 72), f"Page {number}")
+        page.insert_image(fitz.Rect(72, 100, 136, 132), stream=logo)
+    document.new_page().insert_text((72, 72), "No images")
+    files = {"file": ("report.pdf", document.tobytes(), "application/pdf")}
+
+    response = client.post("/api/v1/parse/images", files=files, data={"thumbnail_size": 16})
+
+    assert response.status_code == 200
+    assert response.headers["x-image-count"] == "1"
+    assert response.headers["x-image-placements"] == "3"
+    archive = zipfile.ZipFile(io.BytesIO(response.content))
+    manifest = json.loads(archive.read("manifest.json"))
+    (image_id, image), = manifest["images"].items()
+    assert image["pages"] == [1, 2, 3]
+    assert (image["width"], image["height"]) == (64, 32)
+    assert [len(page["images"]) for page in manifest["pages"]] == [1, 1, 1, 0]
+    assert manifest["pages"][0]["images"][0]["id"] == image_id
+    assert fitz.Pixmap(archive.read(image["thumbnail"])).width == 16
+    assert sum(name.startswith("images/") for name in archive.namelist()) == 1
+    assert "Page 3" in archive.read("content.md").decode()
+
+def test_batch_endpoint_limits_zip_archives_before_decompressing(client, mocker):
+    import io
+    import zipfile
+
+    read = mocker.spy(zipfile.ZipFile, "read")
+    archive = io.BytesIO()
+    with zipfile.ZipFile(archive, "w", zipfile.ZIP_DEFLATED) as zipped:
+        for i in range(3):
+            zipped.writestr(f"{i}.pdf", b"%PDF-1.4" + b"0" * 100_000)
+    files = [("files", ("many.zip", archive.getvalue(), "application/zip"))]
+    data = {"parser_type": "pymupdf"}
+
+    mocker.patch("src.config.BATCH_MAX_FILES", 2)
+    response = client.post("/api/v1/parse/batch", files=files, data=data)
+    assert response.status_code == 413
+    assert "2 documents" in response.json()["detail"]
+
+    mocker.patch("src.config.BATCH_MAX_FILES", 10)
+    mocker.patch("src.config.BATCH_MAX_BYTES", 150_000)
+    response = client.post("/api/v1/parse/batch", files=files, data=data)
+    assert response.status_code == 413
+    assert "150000 bytes" in response.json()["detail"]
+    # Only the member within the byte limit was decompressed
+    assert read.call_count == 1
+
+def test_batch_endpoint_streams_one_record_per_document(client, mocker):
+    import io
+    import json
+    import zipfile
+
+    import fitz
+
+    mocker.patch("src.config.BATCH_CHUNK_FILES", 2)
+
+    def make_pdf(text):
+        document = fitz.open()
+        document.new_page().insert_text((72, 72), text)
+        return document.tobytes()
+
+    archive = io.BytesIO()
+    with zipfile.ZipFile(archive, "w") as zipped:
+        zipped.writestr("inner/c.pdf", make_pdf("Document C"))
+        zipped.writestr("notes.txt", "skipped")
+    files = [
+        ("files", ("a.pdf", make_pdf("Document A"), "application/pdf")),
+        ("files", ("broken.pdf", b"not a pdf", "application/pdf")),
+        ("files", ("more.zip", archive.getvalue(), "application/zip")),
+        ("files", ("b.pdf", make_pdf("Document B"), "application/pdf")),
+    ]
+
+    response = client.post(
+        "/api/v1/parse/batch", files=files, data={"parser_type": "pymupdf", "format": "text"}
+    )
+
+    assert response.status_code == 200
+    records = sorted(
+        (json.loads(line) for line in response.text.splitlines()), key=lambda r: r["index"]
+    )
+    assert [record["filename"] for record in records] == [
+        "a.pdf", "broken.pdf", "more.zip/inner/c.pdf", "b.pdf"
+    ]
+    assert [record["status"] for record in records] == ["success", "error", "success", "success"]
+    assert records[1]["status_code"] == 422
+    assert [records[i]["content"].strip() for i in (0, 2, 3)] == [
+        "Document A", "Document C", "Document B"
+    ]
+
+def _post_with_connection_reset(path, files, data):
+    """Send a request to the app from a client that resets the connection as the response starts."""
+    import httpx
+    from starlette.requests import ClientDisconnect
+    from src.main import app
+
+    request = httpx.Request("POST", f"http://testserver{path}", files=files, data=data)
+    messages = [{"type": "http.request", "body": request.read(), "more_body": False}]
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0", "spec_version": "2.4"},
+        "http_version": "1.1",
+        "method": "POST",
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": b"",
+        "root_path": "",
+        "headers": [(k.lower().encode(), v.encode()) for k, v in request.headers.items()],
+        "client": ("testclient", 50000),
+        "server": ("testserver", 80),
+    }
+
+    async def receive():
+        if messages:
+            return messages.pop(0)
+        await asyncio.sleep(3600)
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            raise OSError("Connection reset by peer")
+
+    with pytest.raises(ClientDisconnect):
+        asyncio.run(app(scope, receive, send))
+
+@pytest.mark.parametrize(
+    "path, data",
+    [
+        ("/api/v1/parse/stream", {"parser_type": "pymupdf"}),
+        ("/api/v1/parse/compare", {"parser_types": "pymupdf,pypdf2"}),
+        ("/api/v1/parse/batch", {"parser_type": "pymupdf"}),
+    ],
+)
+def test_streams_release_resources_when_the_client_resets(mocker, sample_pdf_content, path, data):
+    from src.admission import AdmissionController
+    from src.uploads import ReceivedUpload
+
+    controller = AdmissionController(request_budget_ms=0, global_budget_ms=60_000, max_wait_seconds=1)
+    mocker.patch("src.admission._controller", controller)
+    # Uploads are spilled to temporary files
+    mocker.patch("src.config.UPLOAD_MEMORY_THRESHOLD", 0)
+    close = mocker.spy(ReceivedUpload, "close")
+    field = "files" if path.endswith("batch") else "file"
+    files = {field: ("test.pdf", sample_pdf_content, "application/pdf")}
+
+    _post_with_connection_reset(path, files, data)
+
+    assert controller.stats()["admitted"] == 0
+    assert close.call_count == 1
+    spilled = close.call_args.args[0].path
+    assert spilled is not None and not os.path.exists(spilled)
@@ -0,0 +1,54 @@
+from unittest.mock import MagicMock
+
+import pytest
+
+from src import metrics
+from src.parsers.base_parser import PDFParser
+from src.parsers.errors import InvalidDocumentError
+from src.parsers.results import PageResult, ParseResult
+
+@pytest.fixture(autouse=True)
+def clear_metrics():
+    metrics.REGISTRY.clear()
+    yield
+
+def test_histogram_renders_cumulative_buckets():
+    registry = metrics.Registry()
+    histogram = registry.histogram("test_seconds", "Test.", (0.1, 1), labels=("parser",))
+    for value in (0.05, 0.1, 0.5, 3):
+        histogram.observe(value, parser="PyMuPDF")
+
+    lines = registry.render().splitlines()
+
+    assert "# TYPE test_seconds histogram" in lines
+    assert 'test_seconds_bucket{parser="PyMuPDF",le="0.1"} 2' in lines
+    assert 'test_seconds_bucket{parser="PyMuPDF",le="1"} 3' in lines
+    assert 'test_seconds_bucket{parser="PyMuPDF",le="+Inf"} 4' in lines
+    assert 'test_seconds_sum{parser="PyMuPDF"} 3.65' in lines
+    assert 'test_seconds_count{parser="PyMuPDF"} 4' in lines
+
+def test_metrics_endpoint_reports_parses_and_errors(client, mocker, sample_pdf_content):
+    parser = MagicMock(spec=PDFParser)
+    parser.parse.side_effect = [
+        ParseResult("PyMuPDF", pages=[PageResult(1), PageResult(2)]),
+        InvalidDocumentError("Not a PDF"),
+    ]
+    mocker.patch("src.main.get_parser", return_value=parser)
+    mocker.patch("src.main.get_cache", return_value=None)
+
+    files = {"file": ("test.pdf", sample_pdf_content, "application/pdf")}
+    client.post("/api/v1/parse", files=files, data={"parser_type": "pymupdf"})
+    client.post("/api/v1/parse", files=files, data={"parser_type": "pymupdf"})
+
+    response = client.get("/metrics")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    body = response.text
+    assert 'ppp_parse_duration_seconds_count{parser="PyMuPDF",endpoint="parse"} 1' in body
+    assert 'ppp_parse_pages_sum{parser="PyMuPDF",endpoint="parse"} 2' in body
+    assert 'ppp_parse_errors_total{parser="PyMuPDF",type="InvalidDocumentError"} 1' in body
+    assert 'ppp_upload_bytes_count{endpoint="parse"} 2' in body
+    assert 'ppp_queue_wait_seconds_count{pool="PyMuPDF"} 1' in body
+    assert 'ppp_pool_workers{pool="PyMuPDF"}' in body
+    assert 'ppp_requests_total{route="/api/v1/parse",method="POST",status="422"} 1' in body
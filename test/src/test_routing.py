@@ -0,0 +1,69 @@
+import fitz
+
+from src.parsers.probe import ROUTE_LAYOUT, PageProbe
+from src.parsers.results import PageResult, ParseResult
+from src.routing import layout_runs
+
+def make_document():
+    document = fitz.open()
+    prose = document.new_page()
+    prose.insert_text((72, 72), "Plain prose that PyMuPDF extracts well. " * 3)
+    table = document.new_page()
+    table.insert_text((72, 60), "Quarterly results")
+    for row in range(5):
+        table.draw_line((72, 100 + row * 20), (372, 100 + row * 20))
+    for column in range(4):
+        table.draw_line((72 + column * 100, 100), (72 + column * 100, 180))
+    document.new_page().insert_text((72, 72), "More prose. " * 10)
+    return document.tobytes()
+
+def test_layout_runs_merge_short_gaps():
+    probes = [PageProbe(number) for number in range(1, 11)]
+    for number in (2, 4, 9):
+        probes[number - 1].route = ROUTE_LAYOUT
+
+    assert layout_runs(probes) == [(2, 3), (9, 1)]
+    assert probes[2].route == ROUTE_LAYOUT
+    assert probes[2].reasons == ["merged_gap"]
+
+def test_auto_parser_routes_table_pages_to_docling(client, mocker):
+    docling_parse = mocker.patch(
+        "src.parsers.docling_parser.DoclingParser.parse",
+        return_value=ParseResult(
+            "Docling",
+            pages=[PageResult(2, text="Quarterly results", tables=[{"index": 1, "markdown": "| a |"}])],
+            info={"page_format": "markdown"},
+        ),
+    )
+
+    files = {"file": ("test.pdf", make_document(), "application/pdf")}
+    response = client.post("/api/v1/parse", files=files, data={"parser_type": "auto", "format": "json"})
+
+    assert response.status_code == 200
+    docling_parse.assert_called_once()
+    assert docling_parse.call_args[0][1:3] == (2, 1)
+
+    routing = response.json()["metadata"]["routing"]
+    assert [page["route"] for page in routing["pages"]] == ["fast", "layout", "fast"]
+    assert routing["pages"][1]["reasons"] == ["table_rulings"]
+    assert (routing["fast_pages"], routing["layout_pages"]) == (2, 1)
+
+    pages = response.json()["content"]["pages"]
+    assert [page["format"] for page in pages] == [None, "markdown", None]
+    assert pages[1]["tables"] == [{"index": 1, "markdown": "| a |"}]
+    assert "Plain prose" in pages[0]["text"]
+
+def test_auto_parser_falls_back_without_docling(client, mocker):
+    from src.parsers.errors import ParserUnavailableError
+
+    mocker.patch(
+        "src.parsers.docling_parser.DoclingParser.parse",
+        side_effect=ParserUnavailableError("Docling is not installed"),
+    )
+
+    files = {"file": ("test.pdf", make_document(), "application/pdf")}
+    response = client.post("/api/v1/parse", files=files, data={"parser_type": "auto"})
+
+    assert response.status_code == 200
+    assert response.json()["metadata"]["routing"]["fallback"] == "Docling is not installed"
+    assert "Quarterly results" in response.json()["content"]
@@ -0,0 +1,53 @@
+import asyncio
+
+import fitz
+
+from src.parsers import get_parser
+from src.parsers.results import PageResult, ParseResult
+from src.sharding import merge_results, parse_sharded, plan_shards
+from src.workers import WorkerPool
+
+def test_plan_shards(mocker):
+    mocker.patch("src.config.SHARD_MIN_PAGES", 10)
+
+    assert plan_shards(1, 100, 45, workers=4) == [(1, 12), (13, 12), (25, 12), (37, 9)]
+    # Shards never get smaller than the minimum
+    assert plan_shards(1, 100, 25, workers=4) == [(1, 13), (14, 12)]
+    assert plan_shards(5, 8, 100, workers=4) == [(5, 8)]
+    assert plan_shards(50, 10, 45, workers=4) == []
+
+def test_parse_sharded_merges_pages_in_order(mocker):
+    mocker.patch("src.config.SHARD_MIN_PAGES", 10)
+    document = fitz.open()
+    for number in range(1, 61):
+        document.new_page().insert_text((72, 72), f"Page {number}")
+    content = bytearray(document.tobytes())
+
+    parser = get_parser("PyMuPDF")
+    pool = WorkerPool("shards", size=3, queue_limit=0, backend="process")
+    try:
+        result = asyncio.run(parse_sharded(pool, parser, content, 6, 100))
+    finally:
+        pool.shutdown()
+
+    # The in-memory document reaches the workers through shared memory
+    assert [page.number for page in result.pages] == list(range(6, 61))
+    assert all(page.text.strip() == f"Page {page.number}" for page in result.pages)
+    assert result.page_count == 60
+
+def test_merge_results_stops_at_a_shard_past_its_deadline():
+    def shard(first, count, **info):
+        pages = [PageResult(number, text=f"Page {number}") for number in range(first, first + count)]
+        return ParseResult("PyMuPDF", pages=pages, info={"page_count": 30, **info})
+
+    results = [
+        shard(1, 10),
+        # Stopped at its deadline after 4 of its 10 pages
+        shard(11, 4, deadline_exceeded=True),
+        shard(21, 10),
+    ]
+
+    merged = merge_results("PyMuPDF", results, 12.0)
+
+    assert [page.number for page in merged.pages] == list(range(1, 15))
+    assert merged.info["deadline_exceeded"] is True
@@ -0,0 +1,48 @@
+import asyncio
+import hashlib
+import io
+import os
+
+import pytest
+from fastapi import UploadFile
+
+from src.parsers.source import open_source
+from src.uploads import UploadTooLargeError, receive_upload
+
+def _upload(data):
+    return UploadFile(io.BytesIO(data), filename="test.pdf")
+
+def test_small_upload_stays_in_memory(mocker):
+    mocker.patch("src.config.UPLOAD_CHUNK_BYTES", 4)
+    data = b"%PDF-1.4 in memory"
+
+    upload = asyncio.run(receive_upload(_upload(data)))
+
+    assert upload.path is None
+    assert bytes(upload.source) == data
+    assert upload.size == len(data)
+    assert upload.digest == hashlib.sha256(data).hexdigest()
+    with open_source(upload.source) as f:
+        f.seek(5)
+        assert f.read(3) == b"1.4"
+
+def test_large_upload_spills_to_disk(mocker):
+    mocker.patch("src.config.UPLOAD_CHUNK_BYTES", 4)
+    mocker.patch("src.config.UPLOAD_MEMORY_THRESHOLD", 10)
+    data = b"%PDF-1.4 spilled to a temporary file"
+
+    upload = asyncio.run(receive_upload(_upload(data)))
+
+    assert upload.source == upload.path
+    with open(upload.path, "rb") as f:
+        assert f.read() == data
+    assert upload.digest == hashlib.sha256(data).hexdigest()
+    upload.close()
+    assert not os.path.exists(upload.path)
+
+def test_oversized_upload_is_rejected(mocker):
+    mocker.patch("src.config.UPLOAD_CHUNK_BYTES", 4)
+    mocker.patch("src.config.UPLOAD_MAX_BYTES", 8)
+
+    with pytest.raises(UploadTooLargeError):
+        asyncio.run(receive_upload(_upload(b"%PDF-1.4 too large")))
@@ -0,0 +1,107 @@
+import asyncio
+import os
+import threading
+import time
+
+import pytest
+
+from src.workers import DeadlineExceededError, PoolSaturatedError, WorkerPool
+
+def test_pool_runs_jobs():
+    pool = WorkerPool("test", size=2, queue_limit=0, backend="thread")
+    try:
+        assert asyncio.run(pool.run(sum, [1, 2, 3])) == 6
+        assert pool.active == 0
+    finally:
+        pool.shutdown()
+
+def test_pool_rejects_jobs_when_saturated():
+    pool = WorkerPool("test", size=1, queue_limit=1, backend="thread")
+    release = threading.Event()
+
+    async def scenario():
+        running = [asyncio.ensure_future(pool.run(release.wait)) for _ in range(2)]
+        await asyncio.sleep(0.05)
+        # One job is running and one is queued, so a third must be rejected
+        with pytest.raises(PoolSaturatedError) as exc_info:
+            await pool.run(release.wait)
+        assert exc_info.value.retry_after >= 1
+        release.set()
+        await asyncio.gather(*running)
+
+    try:
+        asyncio.run(scenario())
+        assert pool.active == 0
+    finally:
+        release.set()
+        pool.shutdown()
+
+def test_process_pool_runs_jobs():
+    pool = WorkerPool("test", size=1, queue_limit=0, backend="process")
+    try:
+        assert asyncio.run(pool.run(pow, 2, 10)) == 1024
+    finally:
+        pool.shutdown()
+
+def test_process_pool_reports_the_initializer_run_by_each_worker():
+    pool = WorkerPool("test", size=2, queue_limit=0, backend="process", initializer=os.getpid)
+    try:
+        asyncio.run(pool.warm_up())
+        stats = pool.worker_stats()
+    finally:
+        pool.shutdown()
+    assert pool.ready
+    # The initializer ran as each worker started, not as jobs
+    assert sorted(pool.warmup_results) == sorted(worker["pid"] for worker in stats)
+    assert [worker["jobs"] for worker in stats] == [0, 0]
+
+def test_process_pool_kills_jobs_past_their_deadline():
+    pool = WorkerPool("test", size=1, queue_limit=0, backend="process")
+
+    async def scenario():
+        first_pid = await pool.run(os.getpid)
+        with pytest.raises(DeadlineExceededError):
+            await pool.run(time.sleep, 60, deadline=time.time() + 0.5)
+        # The killed worker is replaced by a new one
+        assert await pool.run(os.getpid) != first_pid
+        assert pool.active == 0
+
+    start_time = time.monotonic()
+    try:
+        asyncio.run(scenario())
+    finally:
+        pool.shutdown()
+    assert time.monotonic() - start_time < 10
+
+def test_process_pool_runs_jobs_with_the_same_affinity_on_one_worker():
+    pool = WorkerPool("test", size=3, queue_limit=10, backend="process")
+
+    async def scenario():
+        return await asyncio.gather(
+            *(pool.run(os.getpid, affinity=key) for key in ["a", "b", "c"] * 4)
+        )
+
+    try:
+        pids = asyncio.run(scenario())
+    finally:
+        pool.shutdown()
+    for i, key in enumerate("abc"):
+        assert len(set(pids[i::3])) == 1, key
+    assert len(set(pids)) > 1
+
+def test_process_pool_recycles_workers():
+    pool = WorkerPool("test", size=1, queue_limit=0, backend="process", max_jobs=2)
+
+    async def scenario():
+        return [await pool.run(os.getpid) for _ in range(5)]
+
+    try:
+        pids = asyncio.run(scenario())
+        [stats] = pool.worker_stats()
+    finally:
+        pool.shutdown()
+    # Every worker is replaced after its second job, once that job has finished
+    assert pids[0] == pids[1] != pids[2] == pids[3] != pids[4]
+    assert stats["pid"] == pids[4]
+    assert stats["jobs"] == 1
+    assert stats["rss_bytes"] > 0